@@ -0,0 +1,201 @@
+"""
+Analytique d'entraînement vectorisée (NumPy).
+
+L'historique d'entraînement est chargé une fois en tableaux colonnaires (une
+case par ligne d'`Entrainement`), puis chaque indicateur est calculé en
+quelques opérations groupées sur ces tableaux, sans boucle Python par série :
+volume hebdomadaire par exercice, 1RM estimé (Epley, Brzycki ou corrigé par
+le RPE), tonnage et répartition des séries par intensité et par RPE.
+Quelques dizaines de milliers de lignes se traitent en quelques millisecondes.
+
+NumPy est listé dans requirements.txt ; sur une installation qui ne l'a pas,
+les endpoints répondent 501.
+"""
+
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from exercices import noms_saisis
+from models import Entrainement
+from un_rm import FORMULES as FORMULES_1RM, REPS_MAX_BRZYCKI, brzycki, epley, reps_possibles
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    np = None
+
+# Bornes (en % du meilleur 1RM estimé de l'exercice) des zones d'intensité
+ZONES_INTENSITE = [0, 60, 70, 80, 90, float("inf")]
+LIBELLES_INTENSITE = ["<60", "60-70", "70-80", "80-90", ">=90"]
+ZONES_RPE = [0, 7, 8, 9, 10, float("inf")]
+LIBELLES_RPE = ["<7", "7", "8", "9", "10"]
+
+
+class HistoriqueEntrainement:
+    """Lignes d'entraînement en tableaux NumPy alignés, triées par date."""
+
+    def __init__(self, jours, exercices, series, reps, charges, rpe):
+        self.jours = np.asarray(jours, dtype=np.int64)  # ordinal de la date
+        # Exercices encodés en entiers, dans l'ordre de première apparition
+        codes = {}
+        self.exercices = np.fromiter((codes.setdefault(nom, len(codes)) for nom in exercices), dtype=np.int64, count=len(self.jours))
+        self.noms_exercices = list(codes)
+        self.series = np.asarray(series, dtype=np.float64)
+        self.reps = np.asarray(reps, dtype=np.float64)
+        self.charges = np.asarray(charges, dtype=np.float64)  # NaN : poids du corps ou non renseigné
+        self.rpe = np.asarray(rpe, dtype=np.float64)          # NaN : non renseigné
+        # Le 1er janvier de l'an 1 (ordinal 1) est un lundi
+        self.semaines = self.jours - (self.jours - 1) % 7
+
+    @classmethod
+    def depuis_lignes(cls, lignes) -> "HistoriqueEntrainement":
+        """Construit l'historique depuis des lignes (date, exercice, series, reps, charge, rpe)."""
+        colonnes = list(zip(*lignes)) or [()] * 6
+        jours, exercices, series, reps, charges, rpe = colonnes
+        return cls(
+            [jour.toordinal() for jour in jours], exercices, series, reps,
+            [np.nan if c is None else c for c in charges],
+            [np.nan if r is None else r for r in rpe],
+        )
+
+    def __len__(self) -> int:
+        return len(self.jours)
+
+    @property
+    def tonnage(self):
+        """Tonnage de chaque ligne : séries × répétitions × charge (0 sans charge)."""
+        return self.series * self.reps * np.nan_to_num(self.charges)
+
+    def un_rm(self, formule: str = "epley"):
+        """1RM estimé de chaque ligne (NaN sans charge, ou sans RPE pour la formule « rpe »)."""
+        charges, reps = self.charges, self.reps
+        if formule == "rpe":
+            # Répétitions effectuées et en réserve, puis Epley
+            reps = reps_possibles(reps, self.rpe)
+        if formule in ("epley", "rpe"):
+            estime = epley(charges, reps)
+        elif formule == "brzycki":
+            with np.errstate(divide="ignore", invalid="ignore"):
+                estime = np.where(reps <= REPS_MAX_BRZYCKI, brzycki(charges, reps), np.nan)
+        else:
+            raise ValueError(f"Formule de 1RM inconnue : {formule}")
+        return estime
+
+
+def _maximum_par_groupe(groupes, valeurs, nombre_groupes: int):
+    """Maximum de `valeurs` par groupe, en ignorant les NaN (NaN si le groupe n'a aucune valeur)."""
+    maximum = np.full(nombre_groupes, -np.inf)
+    valides = ~np.isnan(valeurs)
+    np.maximum.at(maximum, groupes[valides], valeurs[valides])
+    return np.where(np.isneginf(maximum), np.nan, maximum)
+
+
+def _arrondi(valeur, decimales: int = 1) -> Optional[float]:
+    return None if np.isnan(valeur) else round(float(valeur), decimales)
+
+
+def volume_hebdomadaire(historique: HistoriqueEntrainement, formule: str = "epley") -> dict:
+    """Séries, répétitions, tonnage et meilleur 1RM estimé par semaine et par exercice, et tonnage total par semaine."""
+    if not len(historique):
+        return {"par_exercice": [], "total": []}
+    # Une clé entière par couple (semaine, exercice)
+    nombre_exercices = len(historique.noms_exercices)
+    cles, groupes = np.unique(historique.semaines * nombre_exercices + historique.exercices, return_inverse=True)
+    nombre = len(cles)
+    series = np.bincount(groupes, weights=historique.series, minlength=nombre)
+    reps = np.bincount(groupes, weights=historique.series * historique.reps, minlength=nombre)
+    tonnage = np.bincount(groupes, weights=historique.tonnage, minlength=nombre)
+    un_rm = _maximum_par_groupe(groupes, historique.un_rm(formule), nombre)
+
+    semaines, par_semaine = np.unique(historique.semaines, return_inverse=True)
+    tonnage_semaine = np.bincount(par_semaine, weights=historique.tonnage, minlength=len(semaines))
+    series_semaine = np.bincount(par_semaine, weights=historique.series, minlength=len(semaines))
+    return {
+        "par_exercice": [
+            {
+                "semaine": date.fromordinal(int(semaine)).isoformat(),
+                "exercice": historique.noms_exercices[exercice],
+                "series": int(series[i]),
+                "reps": int(reps[i]),
+                "tonnage_kg": round(float(tonnage[i]), 1),
+                "un_rm_max": _arrondi(un_rm[i]),
+            }
+            for i, (semaine, exercice) in enumerate(zip(*np.divmod(cles, nombre_exercices)))
+        ],
+        "total": [
+            {"semaine": date.fromordinal(int(semaine)).isoformat(), "series": int(series_semaine[i]), "tonnage_kg": round(float(tonnage_semaine[i]), 1)}
+            for i, semaine in enumerate(semaines)
+        ],
+    }
+
+
+def meilleurs_un_rm(historique: HistoriqueEntrainement, formule: str = "epley") -> list:
+    """Meilleur 1RM estimé de chaque exercice, avec la date et la ligne qui l'ont établi, du plus lourd au plus léger."""
+    if not len(historique):
+        return []
+    estimes = historique.un_rm(formule)
+    valides = np.flatnonzero(~np.isnan(estimes))
+    if not len(valides):
+        return []
+    # Tri par (exercice, 1RM estimé) : la dernière ligne de chaque exercice porte son maximum
+    ordre = valides[np.lexsort((estimes[valides], historique.exercices[valides]))]
+    derniers = np.flatnonzero(np.diff(historique.exercices[ordre], append=-1) != 0)
+    meilleurs = ordre[derniers]
+    meilleurs = meilleurs[np.argsort(-estimes[meilleurs], kind="stable")]
+    return [
+        {
+            "exercice": historique.noms_exercices[historique.exercices[i]],
+            "un_rm": round(float(estimes[i]), 1),
+            "date": date.fromordinal(int(historique.jours[i])).isoformat(),
+            "charge": float(historique.charges[i]),
+            "reps": int(historique.reps[i]),
+            "rpe": _arrondi(historique.rpe[i]),
+        }
+        for i in meilleurs
+    ]
+
+
+def distributions_intensite(historique: HistoriqueEntrainement, formule: str = "epley") -> dict:
+    """
+    Répartition des séries par zone d'intensité et par RPE.
+
+    L'intensité d'une ligne est sa charge rapportée au meilleur 1RM estimé de
+    l'exercice sur la période ; chaque ligne compte pour son nombre de séries.
+    """
+    zones = dict.fromkeys(LIBELLES_INTENSITE, 0)
+    zones_rpe = dict.fromkeys(LIBELLES_RPE, 0)
+    if len(historique):
+        meilleur = _maximum_par_groupe(historique.exercices, historique.un_rm(formule), len(historique.noms_exercices))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            intensite = 100 * historique.charges / meilleur[historique.exercices]
+        avec_intensite = ~np.isnan(intensite)
+        comptes, _ = np.histogram(intensite[avec_intensite], bins=ZONES_INTENSITE, weights=historique.series[avec_intensite])
+        zones = {libelle: int(n) for libelle, n in zip(LIBELLES_INTENSITE, comptes)}
+
+        avec_rpe = ~np.isnan(historique.rpe)
+        comptes, _ = np.histogram(historique.rpe[avec_rpe], bins=ZONES_RPE, weights=historique.series[avec_rpe])
+        zones_rpe = {libelle: int(n) for libelle, n in zip(LIBELLES_RPE, comptes)}
+    return {"intensite_pct_1rm": zones, "rpe": zones_rpe, "series_total": int(historique.series.sum()) if len(historique) else 0}
+
+
+async def charger(db: AsyncSession, user_id: int, debut: Optional[date] = None, exercice_id: Optional[int] = None) -> HistoriqueEntrainement:
+    """
+    Charge l'historique d'entraînement d'un utilisateur en une requête, colonnes utiles seulement.
+
+    Les lignes sont regroupées par exercice du dictionnaire, sous la dernière
+    orthographe de l'utilisateur : les variantes comptent pour le même exercice.
+    """
+    noms = noms_saisis(user_id)
+    stmt = select(
+        Entrainement.date, noms.c.nom, Entrainement.series,
+        Entrainement.reps, Entrainement.charge, Entrainement.rpe,
+    ).join(noms, noms.c.exercice_id == Entrainement.exercice_id).where(Entrainement.user_id == user_id, Entrainement.date.isnot(None))
+    if debut is not None:
+        stmt = stmt.where(Entrainement.date >= debut)
+    if exercice_id is not None:
+        stmt = stmt.where(Entrainement.exercice_id == exercice_id)
+    lignes = (await db.execute(stmt.order_by(Entrainement.date, Entrainement.id))).all()
+    return HistoriqueEntrainement.depuis_lignes(lignes)
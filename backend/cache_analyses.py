@@ -0,0 +1,114 @@
+"""
+Cache persistant des réponses de `/analyse/`, adressé par contenu.
+
+La clé est l'empreinte SHA-256 de l'utilisateur et de la requête envoyée à
+Mistral (modèle, paramètres, prompt — qui contient l'instantané des données) :
+tant que rien n'a changé, une nouvelle demande identique est servie depuis la
+base en quelques millisecondes au lieu d'un aller-retour de plusieurs secondes.
+Toute modification des données change le prompt, donc la clé : il n'y a rien
+à invalider.
+
+Les entrées expirent après un TTL ; au-delà d'un nombre d'entrées ou d'une
+taille totale, les moins récemment lues sont supprimées (LRU).
+"""
+
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import insert_upsert
+from models import AnalyseEnCache
+
+
+def _maintenant() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class CacheAnalyses:
+    def __init__(self, duree_vie: float = 7 * 24 * 3600, max_entrees: int = 500, max_octets: int = 5 * 1024 * 1024):
+        self.duree_vie = duree_vie
+        self.max_entrees = max_entrees
+        self.max_octets = max_octets
+        self.succes = 0
+        self.echecs = 0
+        self.evictions = 0
+
+    @staticmethod
+    def cle(user_id: int, requete_modele: dict) -> str:
+        contenu = json.dumps({"user_id": user_id, "requete": requete_modele}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(contenu.encode()).hexdigest()
+
+    async def obtenir(self, db: AsyncSession, cle: str) -> Optional[dict]:
+        entree = await db.scalar(select(AnalyseEnCache).where(AnalyseEnCache.cle == cle))
+        if entree is None or entree.cree_le < _maintenant() - timedelta(seconds=self.duree_vie):
+            if entree is not None:
+                await db.delete(entree)
+                await db.commit()
+            self.echecs += 1
+            return None
+        entree.dernier_acces = _maintenant()
+        entree.nombre_acces += 1
+        await db.commit()
+        self.succes += 1
+        return json.loads(entree.reponse)
+
+    async def enregistrer(self, db: AsyncSession, cle: str, user_id: int, modele: str, reponse: dict) -> None:
+        contenu = json.dumps(reponse, ensure_ascii=False)
+        taille = len(contenu.encode())
+        if taille > self.max_octets:
+            return
+        maintenant = _maintenant()
+        stmt = insert_upsert(db, AnalyseEnCache).values(
+            cle=cle, user_id=user_id, modele=modele[:50], reponse=contenu, taille=taille,
+            cree_le=maintenant, dernier_acces=maintenant, nombre_acces=0,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[AnalyseEnCache.cle],
+            set_={"reponse": stmt.excluded.reponse, "taille": stmt.excluded.taille,
+                  "cree_le": stmt.excluded.cree_le, "dernier_acces": stmt.excluded.dernier_acces},
+        )
+        await db.execute(stmt)
+        await self._evincer(db)
+        await db.commit()
+
+    async def _evincer(self, db: AsyncSession) -> None:
+        """Supprime les entrées expirées, puis les moins récemment lues au-delà des limites."""
+        resultat = await db.execute(
+            delete(AnalyseEnCache).where(AnalyseEnCache.cree_le < _maintenant() - timedelta(seconds=self.duree_vie))
+        )
+        self.evictions += resultat.rowcount or 0
+
+        a_supprimer = []
+        nombre, octets = 0, 0
+        entrees = await db.execute(
+            select(AnalyseEnCache.id, AnalyseEnCache.taille).order_by(AnalyseEnCache.dernier_acces.desc())
+        )
+        for identifiant, taille in entrees:
+            nombre += 1
+            octets += taille
+            if nombre > self.max_entrees or octets > self.max_octets:
+                a_supprimer.append(identifiant)
+        if a_supprimer:
+            await db.execute(delete(AnalyseEnCache).where(AnalyseEnCache.id.in_(a_supprimer)))
+            self.evictions += len(a_supprimer)
+
+    async def metriques(self, db: AsyncSession) -> dict:
+        nombre, octets = (await db.execute(
+            select(func.count(AnalyseEnCache.id), func.coalesce(func.sum(AnalyseEnCache.taille), 0))
+        )).one()
+        total = self.succes + self.echecs
+        return {
+            "succes": self.succes,
+            "echecs": self.echecs,
+            "taux_succes": round(self.succes / total, 3) if total else None,
+            "evictions": self.evictions,
+            "entrees": nombre,
+            "octets": octets,
+            "max_entrees": self.max_entrees,
+            "max_octets": self.max_octets,
+            "duree_vie_secondes": self.duree_vie,
+        }
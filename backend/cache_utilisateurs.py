@@ -0,0 +1,63 @@
+"""
+Cache en mémoire des utilisateurs authentifiés.
+
+`get_current_user` est appelé par chaque endpoint protégé : une fois le JWT
+validé, l'utilisateur est retrouvé ici par le sujet du token au lieu d'une
+requête SQL. Le cache est borné (LRU) et chaque entrée expire après un TTL ;
+les modifications d'un utilisateur l'invalident.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy import event
+
+from models import User
+
+
+class CacheUtilisateurs:
+    def __init__(self, taille_max: int = 1024, duree_vie: float = 300.0):
+        self.taille_max = taille_max
+        self.duree_vie = duree_vie
+        self._entrees = OrderedDict()
+        self._verrou = threading.Lock()
+        self.succes = 0
+        self.echecs = 0
+
+    def obtenir(self, username: str) -> Optional[User]:
+        with self._verrou:
+            entree = self._entrees.get(username)
+            if entree is None or entree[0] < time.monotonic():
+                if entree is not None:
+                    del self._entrees[username]
+                self.echecs += 1
+                return None
+            self._entrees.move_to_end(username)
+            self.succes += 1
+            return entree[1]
+
+    def enregistrer(self, user: User) -> User:
+        """Met en cache une copie détachée (sans le hash du mot de passe) et la renvoie."""
+        copie = User(id=user.id, username=user.username)
+        with self._verrou:
+            self._entrees[user.username] = (time.monotonic() + self.duree_vie, copie)
+            self._entrees.move_to_end(user.username)
+            while len(self._entrees) > self.taille_max:
+                self._entrees.popitem(last=False)
+        return copie
+
+    def invalider(self, username: Optional[str] = None) -> None:
+        with self._verrou:
+            if username is None:
+                self._entrees.clear()
+            else:
+                self._entrees.pop(username, None)
+
+    def surveiller(self) -> None:
+        """Invalide automatiquement l'entrée d'un utilisateur modifié ou supprimé via l'ORM."""
+        def _invalider(mapper, connection, cible):
+            self.invalider()  # le username a pu changer : on vide tout, c'est rare
+        event.listen(User, "after_update", _invalider)
+        event.listen(User, "after_delete", _invalider)
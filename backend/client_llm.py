@@ -0,0 +1,219 @@
+"""
+Client HTTP partagé vers l'API du modèle de langage (Mistral).
+
+Un seul `httpx.AsyncClient` vit aussi longtemps que l'application : les
+connexions restent ouvertes (keep-alive, HTTP/2) au lieu d'une poignée de main
+TCP + TLS par analyse. Les erreurs passagères (429, 5xx, coupure réseau) sont
+réessayées avec un délai exponentiel aléatoire (« full jitter ») qui respecte
+`Retry-After`. Un disjoncteur coupe les appels pendant quelques secondes
+après une série d'échecs, pour répondre immédiatement plutôt que d'empiler
+des requêtes vouées à l'échec.
+"""
+
+import asyncio
+import os
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import httpx
+
+STATUTS_A_REESSAYER = {429, 500, 502, 503, 504}
+
+
+class DisjoncteurOuvert(Exception):
+    """L'amont est considéré indisponible : l'appel est refusé sans être tenté."""
+
+    def __init__(self, reessayer_dans: float):
+        super().__init__(f"Disjoncteur ouvert, réessayer dans {reessayer_dans:.0f} s")
+        self.reessayer_dans = reessayer_dans
+
+
+class Disjoncteur:
+    """Fermé -> ouvert après `seuil` échecs consécutifs -> semi-ouvert (un essai) après `duree_ouverture`."""
+
+    def __init__(self, seuil: int = 5, duree_ouverture: float = 30.0):
+        self.seuil = seuil
+        self.duree_ouverture = duree_ouverture
+        self.echecs_consecutifs = 0
+        self.ouvert_depuis: Optional[float] = None
+        self.essai_en_cours = False
+        self.ouvertures = 0
+
+    @property
+    def etat(self) -> str:
+        if self.ouvert_depuis is None:
+            return "ferme"
+        if time.monotonic() - self.ouvert_depuis >= self.duree_ouverture:
+            return "semi_ouvert"
+        return "ouvert"
+
+    def autoriser(self) -> bool:
+        """Lève `DisjoncteurOuvert` si l'appel est refusé ; renvoie True si c'est l'essai du semi-ouvert."""
+        etat = self.etat
+        if etat == "ouvert" or (etat == "semi_ouvert" and self.essai_en_cours):
+            reste = self.duree_ouverture - (time.monotonic() - self.ouvert_depuis)
+            raise DisjoncteurOuvert(max(reste, 1.0))
+        if etat == "semi_ouvert":
+            self.essai_en_cours = True
+            return True
+        return False
+
+    def abandonner_essai(self) -> None:
+        """Essai interrompu sans verdict (annulation) : le prochain appel pourra le retenter."""
+        self.essai_en_cours = False
+
+    def succes(self) -> None:
+        self.echecs_consecutifs = 0
+        self.ouvert_depuis = None
+        self.essai_en_cours = False
+
+    def echec(self) -> None:
+        self.echecs_consecutifs += 1
+        if self.essai_en_cours or self.echecs_consecutifs >= self.seuil:
+            if self.ouvert_depuis is None or self.essai_en_cours:
+                self.ouvertures += 1
+            self.ouvert_depuis = time.monotonic()
+        self.essai_en_cours = False
+
+
+def delai_retry_after(reponse: httpx.Response) -> Optional[float]:
+    """Délai demandé par l'en-tête Retry-After (secondes ou date HTTP), s'il y en a un."""
+    valeur = reponse.headers.get("retry-after")
+    if not valeur:
+        return None
+    try:
+        return max(0.0, float(valeur))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(valeur) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class ClientLLM:
+    def __init__(
+        self,
+        max_connexions: int = 20,
+        max_keepalive: int = 10,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 60.0,
+        http2: bool = True,
+        max_tentatives: int = 3,
+        delai_base: float = 0.5,
+        delai_max: float = 20.0,
+        disjoncteur: Optional[Disjoncteur] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.limites = httpx.Limits(
+            max_connections=max_connexions,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = timeout
+        self.http2 = http2
+        self.max_tentatives = max_tentatives
+        self.delai_base = delai_base
+        self.delai_max = delai_max
+        self.disjoncteur = disjoncteur or Disjoncteur()
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self.requetes = 0
+        self.reessais = 0
+        self.refus_disjoncteur = 0
+
+    def _obtenir_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=self.http2, limits=self.limites, timeout=self.timeout, transport=self.transport,
+            )
+        return self._client
+
+    def _delai(self, tentative: int, reponse: Optional[httpx.Response]) -> float:
+        demande = delai_retry_after(reponse) if reponse is not None else None
+        if demande is not None:
+            return min(demande, self.delai_max)
+        return random.uniform(0, min(self.delai_max, self.delai_base * 2 ** tentative))
+
+    async def envoyer(self, methode: str, url: str, stream: bool = False, **kwargs) -> httpx.Response:
+        """
+        Envoie une requête avec reprises et disjoncteur.
+
+        Renvoie la dernière réponse reçue, même en erreur (à l'appelant de vérifier
+        le statut) ; lève `httpx.RequestError` si l'amont est resté injoignable et
+        `DisjoncteurOuvert` si l'appel n'a pas été tenté. Avec `stream=True`, le
+        corps n'est pas lu : l'appelant ferme la réponse.
+        """
+        try:
+            essai = self.disjoncteur.autoriser()
+        except DisjoncteurOuvert:
+            self.refus_disjoncteur += 1
+            raise
+        client = self._obtenir_client()
+        requete = client.build_request(methode, url, **kwargs)
+
+        verdict = False
+        try:
+            for tentative in range(self.max_tentatives + 1):
+                self.requetes += 1
+                derniere = tentative == self.max_tentatives
+                try:
+                    reponse = await client.send(requete, stream=stream)
+                except httpx.RequestError:
+                    if derniere:
+                        verdict = True
+                        self.disjoncteur.echec()
+                        raise
+                    reponse = None
+                else:
+                    if reponse.status_code not in STATUTS_A_REESSAYER or derniere:
+                        verdict = True
+                        # 429 encore après les reprises : limitation persistante, comptée comme un échec
+                        if reponse.status_code >= 500 or reponse.status_code in STATUTS_A_REESSAYER:
+                            self.disjoncteur.echec()
+                        else:
+                            self.disjoncteur.succes()
+                        return reponse
+                    await reponse.aclose()
+                self.reessais += 1
+                await asyncio.sleep(self._delai(tentative, reponse))
+        finally:
+            # Annulation (client déconnecté, arrêt) pendant l'essai : sans cela, le
+            # semi-ouvert refuserait tous les appels suivants
+            if essai and not verdict:
+                self.disjoncteur.abandonner_essai()
+
+    def metriques(self) -> dict:
+        return {
+            "etat_disjoncteur": self.disjoncteur.etat,
+            "echecs_consecutifs": self.disjoncteur.echecs_consecutifs,
+            "ouvertures_disjoncteur": self.disjoncteur.ouvertures,
+            "refus_disjoncteur": self.refus_disjoncteur,
+            "requetes": self.requetes,
+            "reessais": self.reessais,
+        }
+
+    async def arreter(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def depuis_environnement() -> ClientLLM:
+    return ClientLLM(
+        max_connexions=int(os.getenv("LLM_MAX_CONNECTIONS", "20")),
+        max_keepalive=int(os.getenv("LLM_MAX_KEEPALIVE", "10")),
+        keepalive_expiry=float(os.getenv("LLM_KEEPALIVE_EXPIRY_SECONDS", "30")),
+        timeout=float(os.getenv("LLM_TIMEOUT_SECONDS", "60")),
+        http2=os.getenv("LLM_HTTP2", "true").lower() in ("1", "true", "yes"),
+        max_tentatives=int(os.getenv("LLM_MAX_RETRIES", "3")),
+        delai_base=float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.5")),
+        delai_max=float(os.getenv("LLM_RETRY_MAX_SECONDS", "20")),
+        disjoncteur=Disjoncteur(
+            seuil=int(os.getenv("LLM_CIRCUIT_FAILURES", "5")),
+            duree_ouverture=float(os.getenv("LLM_CIRCUIT_RESET_SECONDS", "30")),
+        ),
+    )
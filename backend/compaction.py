@@ -0,0 +1,222 @@
+"""
+Compaction des données envoyées à l'analyse IA.
+
+Au lieu de l'historique brut, le modèle reçoit des résumés statistiques :
+agrégats hebdomadaires, tendances, meilleures performances par exercice et
+détail brut des derniers jours. Seules les tables utiles au type d'analyse
+sont incluses, et le niveau de détail est réduit jusqu'à tenir dans un budget
+de tokens (`ANALYSE_TOKEN_BUDGET`).
+"""
+
+import json
+import math
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import List, Optional, Tuple
+
+from models import COLONNES_MENSURATION
+from un_rm import estimer as estimer_un_rm
+
+# Tables résumées pour chaque type d'analyse proposé par l'interface
+TYPES_ANALYSE = {
+    "poids": ["poids", "mensurations"],
+    "entrainement": ["entrainements", "journal"],
+    "general": ["poids", "mensurations", "entrainements", "journal"],
+}
+
+# Niveaux de détail, du plus riche au plus sobre : le premier qui tient dans le budget est retenu
+NIVEAUX = [
+    {"jours_recents": 14, "semaines": 26, "exercices": 15, "texte_journal": 200},
+    {"jours_recents": 7, "semaines": 12, "exercices": 10, "texte_journal": 80},
+    {"jours_recents": 3, "semaines": 8, "exercices": 6, "texte_journal": 0},
+    {"jours_recents": 0, "semaines": 4, "exercices": 3, "texte_journal": 0},
+    {"jours_recents": 0, "semaines": 0, "exercices": 0, "texte_journal": 0},
+]
+
+# Approximation prudente pour du JSON en français : ~3,5 caractères par token
+CARACTERES_PAR_TOKEN = 3.5
+
+
+def estimer_tokens(texte: str) -> int:
+    return math.ceil(len(texte) / CARACTERES_PAR_TOKEN)
+
+
+def serialiser(donnees: dict) -> str:
+    return json.dumps(donnees, ensure_ascii=False, separators=(",", ":"))
+
+
+def _lundi(jour: date) -> date:
+    return jour - timedelta(days=jour.weekday())
+
+
+def _arrondi(valeur: Optional[float], decimales: int = 1) -> Optional[float]:
+    return round(valeur, decimales) if valeur is not None else None
+
+
+def pente_par_semaine(points: List[Tuple[date, float]]) -> Optional[float]:
+    """Pente de la régression linéaire des valeurs sur le temps, en unités par semaine."""
+    if len(points) < 2:
+        return None
+    xs = [p[0].toordinal() for p in points]
+    ys = [p[1] for p in points]
+    moyenne_x = sum(xs) / len(xs)
+    moyenne_y = sum(ys) / len(ys)
+    variance = sum((x - moyenne_x) ** 2 for x in xs)
+    if variance == 0:
+        return None
+    covariance = sum((x - moyenne_x) * (y - moyenne_y) for x, y in zip(xs, ys))
+    return round(7 * covariance / variance, 2)
+
+
+def _par_semaine(points: List[Tuple[date, float]], nombre_semaines: int) -> List[dict]:
+    semaines = defaultdict(list)
+    for jour, valeur in points:
+        semaines[_lundi(jour)].append(valeur)
+    return [
+        {"semaine": lundi.isoformat(), "moy": _arrondi(sum(v) / len(v)), "min": min(v), "max": max(v), "n": len(v)}
+        for lundi, v in sorted(semaines.items())[-nombre_semaines:]
+    ] if nombre_semaines else []
+
+
+def resumer_poids(poids, niveau: dict, aujourd_hui: date) -> dict:
+    points = [(p.date, p.valeur) for p in poids]
+    if not points:
+        return {"nombre_mesures": 0}
+    valeurs = [v for _, v in points]
+    resume = {
+        "nombre_mesures": len(points),
+        "premiere": {"date": points[0][0].isoformat(), "kg": points[0][1]},
+        "derniere": {"date": points[-1][0].isoformat(), "kg": points[-1][1]},
+        "min_kg": min(valeurs),
+        "max_kg": max(valeurs),
+        "tendance_kg_par_semaine": {
+            "4_semaines": pente_par_semaine([p for p in points if p[0] >= aujourd_hui - timedelta(weeks=4)]),
+            "12_semaines": pente_par_semaine([p for p in points if p[0] >= aujourd_hui - timedelta(weeks=12)]),
+            "total": pente_par_semaine(points),
+        },
+        "hebdomadaire": _par_semaine(points, niveau["semaines"]),
+    }
+    if niveau["jours_recents"]:
+        debut = aujourd_hui - timedelta(days=niveau["jours_recents"])
+        resume["recent"] = [[jour.isoformat(), valeur] for jour, valeur in points if jour >= debut]
+    return resume
+
+
+def resumer_mensurations(mensurations, niveau: dict, aujourd_hui: date) -> dict:
+    if not mensurations:
+        return {"nombre_mesures": 0}
+    evolution = {}
+    for colonne in COLONNES_MENSURATION:
+        points = [(m.date, getattr(m, colonne)) for m in mensurations if getattr(m, colonne) is not None]
+        if points:
+            evolution[colonne] = {
+                "premiere": points[0][1],
+                "derniere": points[-1][1],
+                "variation_cm": _arrondi(points[-1][1] - points[0][1]),
+                "depuis": points[0][0].isoformat(),
+            }
+    resume = {"nombre_mesures": len(mensurations), "derniere_date": mensurations[-1].date.isoformat(), "evolution": evolution}
+    if niveau["jours_recents"]:
+        # Les mensurations sont espacées : on garde les deux dernières prises complètes
+        resume["recent"] = [
+            {"date": m.date.isoformat(), **{c: getattr(m, c) for c in COLONNES_MENSURATION if getattr(m, c) is not None}}
+            for m in mensurations[-2:]
+        ]
+    return resume
+
+
+def resumer_entrainements(entrainements, niveau: dict, aujourd_hui: date) -> dict:
+    if not entrainements:
+        return {"nombre_lignes": 0}
+    exercices = {}
+    semaines = defaultdict(lambda: {"seances": set(), "series": 0, "tonnage_kg": 0.0})
+    for e in entrainements:
+        semaine = semaines[_lundi(e.date)]
+        semaine["seances"].add(e.date)
+        semaine["series"] += e.series
+        semaine["tonnage_kg"] += e.series * e.reps * (e.charge or 0)
+
+        # Regroupé par exercice du dictionnaire, sous la dernière orthographe saisie (lignes triées par date)
+        stats = exercices.setdefault(e.exercice_id, {"exercice": None, "seances": set(), "series": 0, "meilleure_charge": None, "meilleur_1rm": None})
+        stats["exercice"] = e.exercice
+        stats["seances"].add(e.date)
+        stats["series"] += e.series
+        stats["derniere"] = {"date": e.date.isoformat(), "series": e.series, "reps": e.reps, "charge": e.charge}
+        if e.charge:
+            stats["meilleure_charge"] = max(stats["meilleure_charge"] or 0, e.charge)
+            stats["meilleur_1rm"] = max(stats["meilleur_1rm"] or 0, estimer_un_rm(e.charge, e.reps))
+
+    principaux = sorted(exercices.items(), key=lambda item: (len(item[1]["seances"]), item[1]["series"]), reverse=True)
+    resume = {
+        "nombre_seances": len({e.date for e in entrainements}),
+        "periode": [entrainements[0].date.isoformat(), entrainements[-1].date.isoformat()],
+        "nombre_exercices": len(exercices),
+        "principaux_exercices": [
+            {**{k: v for k, v in s.items() if k != "seances"}, "seances": len(s["seances"])}
+            for _, s in principaux[:niveau["exercices"]]
+        ],
+        "hebdomadaire": [
+            {"semaine": lundi.isoformat(), "seances": len(s["seances"]), "series": s["series"], "tonnage_kg": round(s["tonnage_kg"])}
+            for lundi, s in sorted(semaines.items())[-niveau["semaines"]:]
+        ] if niveau["semaines"] else [],
+    }
+    if niveau["jours_recents"]:
+        debut = aujourd_hui - timedelta(days=niveau["jours_recents"])
+        resume["recent"] = [
+            [e.date.isoformat(), e.exercice, e.series, e.reps, e.charge, e.rpe]
+            for e in entrainements if e.date >= debut
+        ]
+    return resume
+
+
+def resumer_journal(journal, niveau: dict, aujourd_hui: date) -> dict:
+    if not journal:
+        return {"nombre_entrees": 0}
+    semaines = defaultdict(lambda: defaultdict(list))
+    for j in journal:
+        for champ in ("humeur", "energie", "sommeil_qualite", "sommeil_duree"):
+            if getattr(j, champ) is not None:
+                semaines[_lundi(j.date)][champ].append(getattr(j, champ))
+    resume = {
+        "nombre_entrees": len(journal),
+        "hebdomadaire": [
+            {"semaine": lundi.isoformat(), **{champ: _arrondi(sum(v) / len(v)) for champ, v in champs.items()}}
+            for lundi, champs in sorted(semaines.items())[-niveau["semaines"]:]
+        ] if niveau["semaines"] else [],
+    }
+    if niveau["jours_recents"]:
+        debut = aujourd_hui - timedelta(days=niveau["jours_recents"])
+        resume["recent"] = [
+            {
+                "date": j.date.isoformat(), "humeur": j.humeur, "energie": j.energie, "sommeil_h": j.sommeil_duree,
+                **({"texte": j.texte[:niveau["texte_journal"]]} if niveau["texte_journal"] and j.texte else {}),
+            }
+            for j in journal if j.date >= debut
+        ]
+    return resume
+
+
+RESUMES = {
+    "poids": resumer_poids,
+    "mensurations": resumer_mensurations,
+    "entrainements": resumer_entrainements,
+    "journal": resumer_journal,
+}
+
+
+def compacter(lignes: dict, type_analyse: str, budget_tokens: int, aujourd_hui: Optional[date] = None) -> Tuple[dict, dict]:
+    """
+    Résume les lignes de chaque table (triées par date) pour le type d'analyse demandé.
+
+    Retourne (données compactées, informations sur la compaction : niveau retenu
+    et tokens estimés). Si même le niveau le plus sobre dépasse le budget, il est
+    renvoyé tel quel : ce ne sont plus que quelques statistiques par table.
+    """
+    aujourd_hui = aujourd_hui or date.today()
+    tables = TYPES_ANALYSE[type_analyse]
+    for indice, niveau in enumerate(NIVEAUX):
+        donnees = {table: RESUMES[table](lignes.get(table, []), niveau, aujourd_hui) for table in tables}
+        tokens = estimer_tokens(serialiser(donnees))
+        if tokens <= budget_tokens:
+            break
+    return donnees, {"niveau": indice, "tokens_estimes": tokens, "budget_tokens": budget_tokens}
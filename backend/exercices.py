@@ -0,0 +1,85 @@
+"""
+Dictionnaire des exercices.
+
+Le nom saisi d'un exercice (« Développé couché », « developpe  couche »…) est
+ramené à une clé normalisée, puis résolu en identifiant entier via la table
+des alias. Chaque ligne d'entraînement porte cet identifiant, indexé avec
+l'utilisateur et la date : l'historique et la progression d'un exercice sont
+des lectures d'index, et les variantes d'orthographe ne scindent plus
+l'historique. Un nom jamais vu crée son exercice à l'écriture.
+
+Le dictionnaire est commun à tous les utilisateurs : son nom canonique est la
+première orthographe rencontrée, tous comptes confondus. Les lectures affichent
+donc l'orthographe de l'utilisateur (`noms_saisis`), jamais ce nom canonique.
+"""
+
+import re
+import unicodedata
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import insert_upsert
+from models import AliasExercice, Entrainement, Exercice
+
+
+def normaliser(nom: str) -> str:
+    """Clé de comparaison d'un nom d'exercice : minuscules, sans accents, ponctuation ni espaces multiples."""
+    sans_accents = "".join(c for c in unicodedata.normalize("NFKD", nom) if not unicodedata.combining(c))
+    cle = " ".join(re.sub(r"[^\w]+", " ", sans_accents.lower()).split())
+    return (cle or nom.strip().lower())[:100]
+
+
+def noms_saisis(user_id: int):
+    """
+    Sous-requête (exercice_id, nom) : orthographe de la dernière ligne d'entraînement
+    de l'utilisateur pour chacun de ses exercices, et seulement ceux-là.
+    """
+    rang = func.row_number().over(
+        partition_by=Entrainement.exercice_id,
+        order_by=(Entrainement.date.desc().nulls_last(), Entrainement.id.desc()),
+    )
+    lignes = (
+        select(Entrainement.exercice_id, Entrainement.exercice.label("nom"), rang.label("rang"))
+        .where(Entrainement.user_id == user_id)
+        .subquery()
+    )
+    return select(lignes.c.exercice_id, lignes.c.nom).where(lignes.c.rang == 1).subquery("noms_saisis")
+
+
+async def trouver(db: AsyncSession, nom: str) -> Optional[int]:
+    """Identifiant de l'exercice désigné par `nom`, sans le créer."""
+    return await db.scalar(select(AliasExercice.exercice_id).where(AliasExercice.cle == normaliser(nom)))
+
+
+async def resoudre(db: AsyncSession, noms: Iterable[str]) -> Dict[str, int]:
+    """
+    Identifiant de chaque nom d'exercice, en créant les exercices inconnus.
+
+    Une requête pour tout le lot ; les créations tolèrent une insertion
+    concurrente du même exercice (ON CONFLICT DO NOTHING puis relecture).
+    """
+    cles = {nom: normaliser(nom) for nom in set(noms)}
+    if not cles:
+        return {}
+    connues = dict((await db.execute(
+        select(AliasExercice.cle, AliasExercice.exercice_id).where(AliasExercice.cle.in_(set(cles.values())))
+    )).all())
+
+    manquantes = {}
+    for nom, cle in sorted(cles.items()):
+        if cle not in connues:
+            manquantes.setdefault(cle, nom[:100])
+    if manquantes:
+        await db.execute(insert_upsert(db, Exercice).values([
+            {"nom": nom, "cle": cle} for cle, nom in manquantes.items()
+        ]).on_conflict_do_nothing(index_elements=[Exercice.cle]))
+        creees = dict((await db.execute(
+            select(Exercice.cle, Exercice.id).where(Exercice.cle.in_(list(manquantes)))
+        )).all())
+        await db.execute(insert_upsert(db, AliasExercice).values([
+            {"cle": cle, "exercice_id": exercice_id} for cle, exercice_id in creees.items()
+        ]).on_conflict_do_nothing(index_elements=[AliasExercice.cle]))
+        connues.update(creees)
+    return {nom: connues[cle] for nom, cle in cles.items()}
@@ -0,0 +1,200 @@
+"""
+Exports de données en flux.
+
+Chaque export est une seule requête SQL triée par date, lue par lots
+(`yield_per`) et sérialisée au fil de l'eau : la mémoire reste constante et le
+premier octet part dès le premier lot, quelle que soit la taille de l'historique.
+
+Les exports colonnaires (Parquet, Arrow IPC) sont écrits lot par lot avec un
+schéma typé (dates, flottants nullables) et envoyés de même ; ils nécessitent
+pyarrow (voir requirements.txt).
+"""
+
+import csv
+import io
+import logging
+
+from sqlalchemy import and_, select, union, Date, DateTime, Float, Integer
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Poids, Mensuration, Entrainement, Supplement, JournalPhysiologique, Routine, COLONNES_MENSURATION
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+TAILLE_LOT = 500
+TAILLE_LOT_COLONNAIRE = 10000
+
+ENTETES_MESURES = ['date', 'poids'] + COLONNES_MENSURATION
+
+# collection -> (modèle, colonnes exportées, colonnes de tri)
+COLLECTIONS = {
+    "entrainements": (
+        Entrainement,
+        ['date', 'exercice', 'series', 'reps', 'charge', 'rpe', 'notes'],
+        ('date', 'id'),
+    ),
+    "journal": (
+        JournalPhysiologique,
+        ['date', 'texte', 'humeur', 'energie', 'sommeil_qualite', 'sommeil_duree'],
+        ('date', 'id'),
+    ),
+    "supplements": (
+        Supplement,
+        ['nom', 'dose', 'frequence', 'date_debut', 'date_fin', 'notes'],
+        ('date_debut', 'id'),
+    ),
+}
+
+
+def requete_mesures(user_id: int):
+    """
+    Poids et mensurations fusionnés par date en une seule requête.
+
+    L'union des dates des deux tables sert de pivot pour deux jointures externes,
+    ce qui remplace la fusion en Python et garde l'ordre chronologique côté SQL.
+    """
+    dates = union(
+        select(Poids.date).where(Poids.user_id == user_id),
+        select(Mensuration.date).where(Mensuration.user_id == user_id),
+    ).subquery()
+    return (
+        select(dates.c.date, Poids.valeur, *[getattr(Mensuration, c) for c in COLONNES_MENSURATION])
+        .select_from(dates)
+        .outerjoin(Poids, and_(Poids.user_id == user_id, Poids.date == dates.c.date))
+        .outerjoin(Mensuration, and_(Mensuration.user_id == user_id, Mensuration.date == dates.c.date))
+        .order_by(dates.c.date)
+        .execution_options(yield_per=TAILLE_LOT)
+    )
+
+
+def requete_collection(user_id: int, collection: str):
+    modele, colonnes, tri = COLLECTIONS[collection]
+    return (
+        select(*[getattr(modele, c) for c in colonnes])
+        .where(modele.user_id == user_id)
+        .order_by(*[getattr(modele, c) for c in tri])
+        .execution_options(yield_per=TAILLE_LOT)
+    )
+
+
+async def flux_csv(db: AsyncSession, stmt, entetes):
+    """Générateur asynchrone de texte CSV : la requête est lue en flux, un morceau par lot de lignes."""
+    tampon = io.StringIO(newline='')
+    writer = csv.writer(tampon, lineterminator='\n')
+    writer.writerow(entetes)
+    try:
+        lignes = await db.stream(stmt)
+        i = 0
+        async for ligne in lignes:
+            i += 1
+            writer.writerow(ligne)
+            if i % TAILLE_LOT == 0:
+                yield tampon.getvalue()
+                tampon.seek(0)
+                tampon.truncate()
+    except Exception as e:
+        # Les en-têtes HTTP sont déjà partis : on ne peut que tronquer le flux
+        logger.error(f"Erreur pendant l'export CSV: {e}")
+        raise
+    yield tampon.getvalue()
+
+
+# --- Exports colonnaires ---
+TABLES_COLONNAIRES = {
+    "poids": Poids,
+    "mensurations": Mensuration,
+    "entrainements": Entrainement,
+    "supplements": Supplement,
+    "routines": Routine,
+    "journal": JournalPhysiologique,
+}
+
+# Colonnes internes, hors du format d'export : propriétaire et suivi de synchronisation (`Synchronisee`)
+COLONNES_INTERNES = {"user_id", "updated_at", "revision"}
+
+FORMATS_COLONNAIRES = {
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+    "arrow": ("arrow", "application/vnd.apache.arrow.file"),
+}
+
+
+def _type_arrow(type_sql):
+    if isinstance(type_sql, Integer):
+        return pa.int64()
+    if isinstance(type_sql, Float):
+        return pa.float64()
+    if isinstance(type_sql, DateTime):
+        return pa.timestamp("us")
+    if isinstance(type_sql, Date):
+        return pa.date32()
+    return pa.string()
+
+
+class _Tampon:
+    """Fichier en écriture seule pour pyarrow : accumule les octets écrits jusqu'au prochain `vider`."""
+
+    def __init__(self):
+        self.morceaux = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, donnees) -> int:
+        self.morceaux.append(bytes(donnees))
+        self.position += len(donnees)
+        return len(donnees)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def vider(self) -> bytes:
+        contenu = b"".join(self.morceaux)
+        self.morceaux.clear()
+        return contenu
+
+
+async def flux_colonnaire(db: AsyncSession, user_id: int, table: str, format_fichier: str):
+    """
+    Générateur asynchrone d'un fichier Parquet ou Arrow IPC (format fichier) d'une table de l'utilisateur.
+
+    Les lignes sont lues par partitions de `TAILLE_LOT_COLONNAIRE`, converties
+    directement en RecordBatch sans passer par des objets ORM, et chaque lot
+    écrit (un groupe de lignes Parquet, un lot IPC) part aussitôt : seul le
+    pied de fichier est émis à la fin.
+    """
+    modele = TABLES_COLONNAIRES[table]
+    colonnes = [c for c in modele.__table__.columns if c.name not in COLONNES_INTERNES]
+    schema = pa.schema([pa.field(c.name, _type_arrow(c.type), nullable=c.nullable) for c in colonnes])
+
+    stmt = select(*colonnes).where(modele.user_id == user_id).order_by(modele.id)
+    tampon = _Tampon()
+    sink = pa.PythonFile(tampon, mode="w")
+    writer = pq.ParquetWriter(sink, schema) if format_fichier == "parquet" else pa.ipc.new_file(sink, schema)
+    try:
+        resultat = await db.stream(stmt, execution_options={"yield_per": TAILLE_LOT_COLONNAIRE})
+        async for partition in resultat.partitions():
+            valeurs = list(zip(*partition))
+            lot = pa.record_batch(
+                [pa.array(valeurs[i], type=champ.type) for i, champ in enumerate(schema)],
+                schema=schema,
+            )
+            writer.write_batch(lot)
+            yield tampon.vider()
+        writer.close()
+    except Exception as e:
+        # Les en-têtes HTTP sont déjà partis : on ne peut que tronquer le flux
+        logger.error(f"Erreur pendant l'export {format_fichier} de {table}: {e}")
+        raise
+    yield tampon.vider()
@@ -0,0 +1,118 @@
+"""
+Hachage et vérification des mots de passe hors de la boucle d'événements.
+
+bcrypt coûte volontairement cher (~250 ms de CPU par appel). Les appels sont
+donc confiés à un exécuteur dédié et borné — un pool de processus par défaut,
+pour utiliser plusieurs cœurs malgré le GIL — derrière un sémaphore qui limite
+le nombre de hachages simultanés. Au-delà d'une profondeur de file d'attente
+maximale, les nouvelles demandes sont refusées immédiatement (503) plutôt que
+de bloquer toute l'API pendant une rafale de connexions.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+from passlib.context import CryptContext
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def _hacher(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verifier(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+class FileSaturee(Exception):
+    """Trop de hachages en attente : la demande est refusée sans être mise en file."""
+
+
+class FileHachage:
+    def __init__(self, type_executeur: str = "process", workers: int = 2, max_concurrent: int = 2, max_attente: int = 64):
+        self.type_executeur = type_executeur
+        self.workers = workers
+        self.max_concurrent = max_concurrent
+        self.max_attente = max_attente
+        self._executeur: Optional[Executor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.en_attente = 0
+        self.en_cours = 0
+        self.attente_max_observee = 0
+        self.traites = 0
+        self.rejetes = 0
+        self.duree_totale = 0.0
+
+    def _obtenir_executeur(self) -> Executor:
+        if self._executeur is None:
+            if self.type_executeur == "thread":
+                self._executeur = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="hachage")
+            else:
+                # spawn : pas de fork d'un serveur multi-threadé
+                self._executeur = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executeur
+
+    async def executer(self, fonction, *args):
+        if self.en_attente >= self.max_attente:
+            self.rejetes += 1
+            raise FileSaturee()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+
+        self.en_attente += 1
+        self.attente_max_observee = max(self.attente_max_observee, self.en_attente)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.en_attente -= 1
+        self.en_cours += 1
+        debut = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._obtenir_executeur(), fonction, *args)
+        finally:
+            self.duree_totale += time.perf_counter() - debut
+            self.traites += 1
+            self.en_cours -= 1
+            self._semaphore.release()
+
+    async def hacher(self, password: str) -> str:
+        return await self.executer(_hacher, password)
+
+    async def verifier(self, plain_password: str, hashed_password: str) -> bool:
+        return await self.executer(_verifier, plain_password, hashed_password)
+
+    def metriques(self) -> dict:
+        return {
+            "executeur": self.type_executeur,
+            "workers": self.workers,
+            "max_concurrent": self.max_concurrent,
+            "max_attente": self.max_attente,
+            "en_cours": self.en_cours,
+            "en_attente": self.en_attente,
+            "attente_max_observee": self.attente_max_observee,
+            "traites": self.traites,
+            "rejetes": self.rejetes,
+            "duree_moyenne_ms": round(1000 * self.duree_totale / self.traites, 1) if self.traites else None,
+        }
+
+    def arreter(self) -> None:
+        if self._executeur is not None:
+            self._executeur.shutdown(wait=False, cancel_futures=True)
+            self._executeur = None
+        self._semaphore = None
+
+
+def depuis_environnement() -> FileHachage:
+    workers = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+    return FileHachage(
+        type_executeur=os.getenv("PASSWORD_HASH_EXECUTOR", "process"),
+        workers=workers,
+        max_concurrent=int(os.getenv("PASSWORD_HASH_MAX_CONCURRENT", str(workers))),
+        max_attente=int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64")),
+    )
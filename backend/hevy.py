@@ -0,0 +1,288 @@
+"""
+Import des séances exportées depuis Hevy.
+
+Deux formats sont reconnus, détectés sur la première ligne :
+- l'export CSV de l'application (workouts.csv, une ligne par série) ;
+- le texte de partage d'une séance (« Set 1: 80 kg x 8 @ 8 rpe »), celui que
+  l'on copie-colle depuis le téléphone.
+
+L'analyseur est incrémental : il reçoit les lignes une à une et rend chaque
+séance dès qu'elle est complète, ce qui permet de lire un export volumineux en
+flux sans le charger en mémoire. Les séances sont dédoublonnées par empreinte
+de leur contenu, puis insérées par lots dans `entrainements`.
+"""
+
+import codecs
+import csv
+import hashlib
+import json
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import List, Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Entrainement, ImportSeance
+import exercices
+import records
+import versions
+
+TAILLE_LOT_SERIES = 1000
+LBS_EN_KG = 0.45359237
+
+MOIS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+    "janv": 1, "févr": 2, "fevr": 2, "mars": 3, "avr": 4, "mai": 5, "juin": 6,
+    "juil": 7, "août": 8, "aout": 8, "sept": 9, "déc": 12,
+}
+
+RE_SERIE = re.compile(
+    r"^(?:set|série|serie)\s*\d+\s*(?:\((?P<type>[^)]*)\))?\s*:\s*"
+    r"(?:(?P<charge>\d+(?:[.,]\d+)?)\s*(?P<unite>kg|lbs?)\s*[x×]\s*)?"
+    r"(?P<reps>\d+)(?:\s*reps?)?"
+    r"(?:\s*@\s*(?P<rpe>\d+(?:[.,]\d+)?)\s*rpe)?",
+    re.IGNORECASE,
+)
+RE_DATE_ISO = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
+RE_DATE_EN = re.compile(r"\b([A-Za-z]{3})[a-z]*\.? (\d{1,2}), (\d{4})")
+RE_DATE_FR = re.compile(r"\b(\d{1,2}) ([a-zéû]{3,5})[a-zéû]*\.? (\d{4})", re.IGNORECASE)
+
+
+@dataclass
+class SerieHevy:
+    exercice: str
+    reps: int
+    charge: Optional[float] = None
+    rpe: Optional[float] = None
+    echauffement: bool = False
+
+
+@dataclass
+class SeanceHevy:
+    titre: str
+    date: date
+    series: List[SerieHevy] = field(default_factory=list)
+
+    def empreinte(self) -> str:
+        """Hash du contenu : une même séance importée deux fois a la même empreinte."""
+        contenu = [self.date.isoformat()] + [
+            [s.exercice.lower(), s.reps, s.charge, s.rpe, s.echauffement] for s in self.series
+        ]
+        return hashlib.sha256(json.dumps(contenu).encode()).hexdigest()
+
+
+def lire_date(texte: str) -> Optional[date]:
+    """Date d'une séance : ISO, anglais (« Jan 22, 2024 ») ou français (« 22 janv. 2024 »)."""
+    if m := RE_DATE_ISO.search(texte):
+        return date(int(m[1]), int(m[2]), int(m[3]))
+    if (m := RE_DATE_EN.search(texte)) and m[1].lower() in MOIS:
+        return date(int(m[3]), MOIS[m[1].lower()], int(m[2]))
+    if (m := RE_DATE_FR.search(texte)) and m[2].lower() in MOIS:
+        return date(int(m[3]), MOIS[m[2].lower()], int(m[1]))
+    try:
+        # Format de l'export CSV : « 22 Jan 2024, 18:02 »
+        return datetime.strptime(texte.strip(), "%d %b %Y, %H:%M").date()
+    except ValueError:
+        return None
+
+
+def _nombre(valeur: str) -> Optional[float]:
+    valeur = (valeur or "").strip().replace(",", ".")
+    return float(valeur) if valeur else None
+
+
+class AnalyseurHevy:
+    """Analyseur incrémental : `ajouter_ligne` rend les séances terminées par cette ligne."""
+
+    def __init__(self, date_par_defaut: Optional[date] = None):
+        self.date_par_defaut = date_par_defaut
+        self.format = None
+        self.lignes_ignorees = 0
+        self._seance: Optional[SeanceHevy] = None
+        # CSV
+        self._colonnes = {}
+        self._cle_seance = None
+        self._ligne_en_cours = ""
+        # Texte
+        self._exercice = None
+        self._candidat = None
+
+    def ajouter_ligne(self, ligne: str) -> List[SeanceHevy]:
+        ligne = ligne.rstrip("\r\n")
+        if self.format is None:
+            if not ligne.strip():
+                return []
+            self.format = "csv" if "exercise_title" in ligne else "texte"
+            if self.format == "csv":
+                entetes = next(csv.reader([ligne]))
+                self._colonnes = {nom.strip(): i for i, nom in enumerate(entetes)}
+                return []
+        if self.format == "csv":
+            return self._ligne_csv(ligne)
+        return self._ligne_texte(ligne.strip())
+
+    def terminer(self) -> List[SeanceHevy]:
+        return self._cloturer()
+
+    def _cloturer(self) -> List[SeanceHevy]:
+        seance, self._seance = self._seance, None
+        return [seance] if seance and seance.series else []
+
+    # --- Export CSV ---
+    def _ligne_csv(self, ligne: str) -> List[SeanceHevy]:
+        # Un champ entre guillemets peut contenir des retours à la ligne (notes)
+        self._ligne_en_cours += ("\n" if self._ligne_en_cours else "") + ligne
+        if self._ligne_en_cours.count('"') % 2:
+            return []
+        brut, self._ligne_en_cours = self._ligne_en_cours, ""
+        if not brut.strip():
+            return []
+        valeurs = next(csv.reader([brut]))
+        champ = lambda nom: valeurs[self._colonnes[nom]] if nom in self._colonnes and self._colonnes[nom] < len(valeurs) else ""
+
+        terminees = []
+        cle = (champ("title"), champ("start_time"))
+        if cle != self._cle_seance:
+            terminees = self._cloturer()
+            self._cle_seance = cle
+            jour = lire_date(champ("start_time")) or self.date_par_defaut
+            if jour is None:
+                self.lignes_ignorees += 1
+                return terminees
+            self._seance = SeanceHevy(titre=champ("title"), date=jour)
+        if self._seance is None:
+            self.lignes_ignorees += 1
+            return terminees
+
+        try:
+            reps = int(_nombre(champ("reps")) or 0)
+            charge = _nombre(champ("weight_kg"))
+            if charge is None and (lbs := _nombre(champ("weight_lbs"))) is not None:
+                charge = round(lbs * LBS_EN_KG, 2)
+            rpe = _nombre(champ("rpe"))
+        except ValueError:
+            reps = 0
+        exercice = champ("exercise_title").strip()
+        if reps <= 0 or not exercice:
+            # Séries de cardio / gainage (durée, distance) : rien à stocker en séries x reps
+            self.lignes_ignorees += 1
+            return terminees
+        self._seance.series.append(SerieHevy(
+            exercice=exercice, reps=reps, charge=charge, rpe=rpe,
+            echauffement=champ("set_type").strip().lower() == "warmup",
+        ))
+        return terminees
+
+    # --- Texte de partage ---
+    def _ligne_texte(self, ligne: str) -> List[SeanceHevy]:
+        if not ligne or ligne.startswith("@") or ligne.startswith("http"):
+            return []
+
+        if m := RE_SERIE.match(ligne):
+            if self._candidat is not None:
+                self._exercice, self._candidat = self._candidat, None
+            if self._exercice is None:
+                self.lignes_ignorees += 1
+                return []
+            if self._seance is None:
+                if self.date_par_defaut is None:
+                    self.lignes_ignorees += 1
+                    return []
+                self._seance = SeanceHevy(titre="", date=self.date_par_defaut)
+            charge = _nombre(m["charge"]) if m["charge"] else None
+            if charge is not None and m["unite"].lower().startswith("lb"):
+                charge = round(charge * LBS_EN_KG, 2)
+            type_serie = (m["type"] or "").lower()
+            self._seance.series.append(SerieHevy(
+                exercice=self._exercice, reps=int(m["reps"]), charge=charge,
+                rpe=_nombre(m["rpe"]) if m["rpe"] else None,
+                echauffement="warm" in type_serie or "échauff" in type_serie,
+            ))
+            return []
+
+        jour = lire_date(ligne)
+        if jour is not None:
+            # Ligne de date : la ligne précédente était le titre d'une nouvelle séance
+            terminees = self._cloturer()
+            self._seance = SeanceHevy(titre=self._candidat or "", date=jour)
+            self._candidat = None
+            self._exercice = None
+            return terminees
+
+        if self._candidat is not None:
+            self.lignes_ignorees += 1
+        self._candidat = ligne
+        return []
+
+
+def regrouper_series(seance: SeanceHevy, user_id: int) -> List[dict]:
+    """Fusionne les séries consécutives identiques en une ligne Entrainement (séries x reps)."""
+    lignes = []
+    for serie in seance.series:
+        cle = (serie.exercice, serie.reps, serie.charge, serie.rpe, serie.echauffement)
+        if lignes and lignes[-1]["_cle"] == cle and lignes[-1]["series"] < 100:
+            lignes[-1]["series"] += 1
+            continue
+        lignes.append({
+            "_cle": cle,
+            "user_id": user_id,
+            "date": seance.date,
+            "exercice": serie.exercice[:100],
+            "series": 1,
+            "reps": min(serie.reps, 1000),
+            "charge": serie.charge if serie.charge is not None and 0 <= serie.charge <= 1000 else None,
+            "rpe": serie.rpe if serie.rpe is not None and 1 <= serie.rpe <= 10 else None,
+            "notes": "Échauffement" if serie.echauffement else None,
+        })
+    for ligne in lignes:
+        del ligne["_cle"]
+    return lignes
+
+
+async def importer_seances(db: AsyncSession, user_id: int, seances: List[SeanceHevy], bilan: dict) -> None:
+    """Insère un lot de séances en ignorant celles déjà importées (même empreinte)."""
+    par_empreinte = {}
+    for seance in seances:
+        par_empreinte.setdefault(seance.empreinte(), seance)
+    bilan["doublons"] += len(seances) - len(par_empreinte)
+
+    deja_importees = set(await db.scalars(select(ImportSeance.empreinte).where(
+        ImportSeance.user_id == user_id, ImportSeance.empreinte.in_(list(par_empreinte))
+    )))
+    bilan["doublons"] += len(deja_importees)
+    nouvelles = {e: s for e, s in par_empreinte.items() if e not in deja_importees}
+    if not nouvelles:
+        return
+
+    lignes = [ligne for seance in nouvelles.values() for ligne in regrouper_series(seance, user_id)]
+    identifiants = await exercices.resoudre(db, [ligne["exercice"] for ligne in lignes])
+    for ligne in lignes:
+        ligne["exercice_id"] = identifiants[ligne["exercice"]]
+    await db.execute(insert(Entrainement), lignes)
+    await db.execute(insert(ImportSeance), [
+        {"user_id": user_id, "empreinte": e, "date": s.date, "titre": s.titre[:100], "nombre_series": len(s.series)}
+        for e, s in nouvelles.items()
+    ])
+    await records.recalculer(db, user_id, identifiants.values())
+    await versions.incrementer(db, user_id, "entrainements")
+    await db.commit()
+    bilan["seances_importees"] += len(nouvelles)
+    bilan["series_importees"] += sum(len(s.series) for s in nouvelles.values())
+    bilan["lignes_entrainement"] += len(lignes)
+
+
+async def lignes_du_flux(flux):
+    """Découpe un flux d'octets (corps de requête) en lignes de texte UTF-8."""
+    decodeur = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    reste = ""
+    async for morceau in flux:
+        reste += decodeur.decode(morceau)
+        *lignes, reste = reste.split("\n")
+        for ligne in lignes:
+            yield ligne
+    reste += decodeur.decode(b"", final=True)
+    if reste:
+        yield reste
@@ -0,0 +1,149 @@
+"""
+Ingestion en masse : un lot validé élément par élément puis écrit en une seule transaction.
+
+Les mesures datées (poids, mensurations) sont insérées avec
+`INSERT ... ON CONFLICT (user_id, date) DO UPDATE`, sans SELECT préalable par ligne.
+Les entraînements et le journal n'ont pas de clé naturelle : ils sont insérés tels quels.
+"""
+
+from datetime import date
+from typing import List, Tuple
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import insert_upsert
+from models import Poids, Mensuration, Entrainement, JournalPhysiologique, COLONNES_MENSURATION
+import statistiques
+import exercices
+import records
+import tendance
+
+TAILLE_LOT_MAX = 1000
+
+
+def valider_lot(schema: type, elements: List[dict]) -> Tuple[List[Tuple[int, BaseModel]], dict]:
+    """
+    Valide chaque élément avec le modèle Pydantic de l'endpoint unitaire.
+
+    Retourne les éléments valides (avec leur position dans le lot) et les
+    résultats d'erreur indexés par position.
+    """
+    valides = []
+    resultats = {}
+    for index, element in enumerate(elements):
+        try:
+            valides.append((index, schema.model_validate(element)))
+        except ValidationError as e:
+            resultats[index] = {
+                "index": index,
+                "statut": "erreur",
+                "erreurs": [erreur["msg"] for erreur in e.errors()],
+            }
+    return valides, resultats
+
+
+def _dedoublonner_par_date(valides, champ_date: str, resultats: dict):
+    """Garde la dernière occurrence de chaque date : un même lot ne peut viser deux fois la même ligne."""
+    par_date = {}
+    for index, donnees in valides:
+        jour = date.fromisoformat(getattr(donnees, champ_date))
+        if jour in par_date:
+            resultats[par_date[jour][0]] = {
+                "index": par_date[jour][0],
+                "statut": "ignore",
+                "erreurs": ["Date présente plusieurs fois dans le lot : la dernière valeur est retenue"],
+            }
+        par_date[jour] = (index, donnees)
+    return par_date
+
+
+async def _dates_existantes(db: AsyncSession, modele, user_id: int, dates) -> set:
+    if not dates:
+        return set()
+    resultat = await db.scalars(select(modele.date).where(modele.user_id == user_id, modele.date.in_(dates)))
+    return set(resultat)
+
+
+async def upsert_poids(db: AsyncSession, user_id: int, valides, resultats: dict) -> None:
+    par_date = _dedoublonner_par_date(valides, "date_mesure", resultats)
+    if not par_date:
+        return
+    existantes = await _dates_existantes(db, Poids, user_id, list(par_date))
+
+    stmt = insert_upsert(db, Poids).values([
+        {"user_id": user_id, "date": jour, "valeur": donnees.valeur}
+        for jour, (_, donnees) in par_date.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Poids.user_id, Poids.date],
+        set_={"valeur": stmt.excluded.valeur, "updated_at": stmt.excluded.updated_at, "revision": None},
+    ).returning(Poids.id, Poids.date)
+
+    for identifiant, jour in await db.execute(stmt):
+        index = par_date[jour][0]
+        resultats[index] = {
+            "index": index,
+            "statut": "mis_a_jour" if jour in existantes else "cree",
+            "id": identifiant,
+        }
+    await statistiques.recalculer(db, user_id, Poids, par_date)
+    await tendance.recalculer(db, user_id, par_date)
+
+
+async def upsert_mensurations(db: AsyncSession, user_id: int, valides, resultats: dict) -> None:
+    par_date = _dedoublonner_par_date(valides, "date_mesure", resultats)
+    if not par_date:
+        return
+    existantes = await _dates_existantes(db, Mensuration, user_id, list(par_date))
+
+    stmt = insert_upsert(db, Mensuration).values([
+        {"user_id": user_id, "date": jour, **donnees.model_dump(include=set(COLONNES_MENSURATION))}
+        for jour, (_, donnees) in par_date.items()
+    ])
+    # Comme l'endpoint unitaire : seuls les champs fournis écrasent les valeurs existantes.
+    # ON CONFLICT n'applique pas les onupdate des colonnes : date et révision remises ici.
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Mensuration.user_id, Mensuration.date],
+        set_={
+            **{c: func.coalesce(stmt.excluded[c], getattr(Mensuration, c)) for c in COLONNES_MENSURATION},
+            "updated_at": stmt.excluded.updated_at, "revision": None,
+        },
+    ).returning(Mensuration.id, Mensuration.date)
+
+    for identifiant, jour in await db.execute(stmt):
+        index = par_date[jour][0]
+        resultats[index] = {
+            "index": index,
+            "statut": "mis_a_jour" if jour in existantes else "cree",
+            "id": identifiant,
+        }
+    await statistiques.recalculer(db, user_id, Mensuration, par_date)
+
+
+async def _inserer(db: AsyncSession, modele, lignes, indices, resultats: dict) -> None:
+    if not lignes:
+        return
+    stmt = insert(modele).returning(modele.id, sort_by_parameter_order=True)
+    for index, (identifiant,) in zip(indices, await db.execute(stmt, lignes)):
+        resultats[index] = {"index": index, "statut": "cree", "id": identifiant}
+
+
+async def inserer_entrainements(db: AsyncSession, user_id: int, valides, resultats: dict) -> None:
+    identifiants = await exercices.resoudre(db, [donnees.exercice for _, donnees in valides])
+    lignes = [
+        {**donnees.model_dump(exclude={"date"}), "user_id": user_id, "date": date.fromisoformat(donnees.date),
+         "exercice_id": identifiants[donnees.exercice]}
+        for _, donnees in valides
+    ]
+    await _inserer(db, Entrainement, lignes, [index for index, _ in valides], resultats)
+    await records.recalculer(db, user_id, identifiants.values())
+
+
+async def inserer_journal(db: AsyncSession, user_id: int, valides, resultats: dict) -> None:
+    lignes = [
+        {**donnees.model_dump(exclude={"date"}), "user_id": user_id, "date": date.fromisoformat(donnees.date)}
+        for _, donnees in valides
+    ]
+    await _inserer(db, JournalPhysiologique, lignes, [index for index, _ in valides], resultats)
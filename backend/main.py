@@ -1,17 +1,37 @@
-from fastapi import FastAPI, Depends, HTTPException, Response, Request
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Depends, HTTPException, Query, Response, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel, field_validator
+from contextlib import asynccontextmanager
 from datetime import date, datetime, timedelta, timezone
 from typing import Optional, List
-from sqlalchemy.orm import Session
-from models import SessionLocal, Poids, Mensuration, Entrainement, Supplement, JournalPhysiologique, Routine, User, Base, engine
-from passlib.context import CryptContext
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import AsyncSessionLocal, initialiser_schema
+from models import Poids, Mensuration, Entrainement, Supplement, JournalPhysiologique, Routine, TacheAnalyse, User
+from cache_utilisateurs import CacheUtilisateurs
+from cache_analyses import CacheAnalyses
+import hachage
+import client_llm as llm
+import taches
+from pagination import ParametresPage, paginer
+from series import METRIQUES, PERIODES, debut_periode, lttb, agreger_par_paquets
+from ingestion import TAILLE_LOT_MAX, valider_lot, upsert_poids, upsert_mensurations, inserer_entrainements, inserer_journal
+from hevy import TAILLE_LOT_SERIES, AnalyseurHevy, importer_seances, lignes_du_flux
+from compaction import TYPES_ANALYSE, compacter, serialiser
+import exports
+import statistiques
+import exercices
+import analytique
+import records
+import tendance
+import versions
+import tableau_de_bord
+from exports import COLLECTIONS, ENTETES_MESURES, TABLES_COLONNAIRES, FORMATS_COLONNAIRES, requete_mesures, requete_collection, flux_csv, flux_colonnaire
 from jose import JWTError, jwt
-import csv
-import io
 import os
 import json
+import asyncio
 import secrets
 import logging
 from dotenv import load_dotenv
@@ -30,16 +50,54 @@ if os.getenv("JWT_SECRET_KEY") is None:
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("JWT_EXPIRE_MINUTES", "1440"))  # 24h par défaut
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+# Utilisateurs déjà résolus, par sujet du token : évite une requête SQL par appel authentifié
+cache_utilisateurs = CacheUtilisateurs(
+    taille_max=int(os.getenv("AUTH_CACHE_SIZE", "1024")),
+    duree_vie=float(os.getenv("AUTH_CACHE_TTL_SECONDS", "300")),
+)
+cache_utilisateurs.surveiller()
+
+# Hachage bcrypt dans un exécuteur borné, hors de la boucle d'événements
+file_hachage = hachage.depuis_environnement()
+
+# Budget de tokens des données envoyées à l'analyse IA (résumées au-delà)
+ANALYSE_TOKEN_BUDGET = int(os.getenv("ANALYSE_TOKEN_BUDGET", "6000"))
+
+# Client HTTP partagé vers Mistral (keep-alive, HTTP/2, reprises, disjoncteur)
+client_llm = llm.depuis_environnement()
+
+# Réponses de /analyse/ déjà calculées, retrouvées par l'empreinte des données et du prompt
+cache_analyses = CacheAnalyses(
+    duree_vie=float(os.getenv("ANALYSE_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+    max_entrees=int(os.getenv("ANALYSE_CACHE_MAX_ENTRIES", "500")),
+    max_octets=int(os.getenv("ANALYSE_CACHE_MAX_BYTES", str(5 * 1024 * 1024))),
+)
+
+# Analyses soumises en tâches de fond : pool de workers borné, servi à tour de rôle par utilisateur
+file_taches = taches.depuis_environnement()
+file_taches.fabrique_sessions = AsyncSessionLocal
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+
+# Fonction pour obtenir une session de base de données
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    try:
+        return await file_hachage.verifier(plain_password, hashed_password)
+    except hachage.FileSaturee:
+        raise HTTPException(status_code=503, detail="Trop de connexions simultanées, réessayez dans un instant.", headers={"Retry-After": "1"})
 
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+async def hash_password(password: str) -> str:
+    try:
+        return await file_hachage.hacher(password)
+    except hachage.FileSaturee:
+        raise HTTPException(status_code=503, detail="Trop d'inscriptions simultanées, réessayez dans un instant.", headers={"Retry-After": "1"})
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -49,7 +107,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(lambda: next(get_db()))):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
     credentials_exception = HTTPException(
         status_code=401,
         detail="Token invalide ou expiré",
@@ -62,12 +120,30 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    user = db.query(User).filter(User.username == username).first()
+    user = cache_utilisateurs.obtenir(username)
     if user is None:
-        raise credentials_exception
+        user = await db.scalar(select(User).where(User.username == username))
+        if user is None:
+            raise credentials_exception
+        user = cache_utilisateurs.enregistrer(user)
     return user
 
 
+def collection_versionnee(collection: str):
+    """
+    Dépendance des routes de liste : ETag de la version de la collection, et 304 sans
+    lecture de la table si le client présente déjà cette version (If-None-Match).
+    """
+    async def verifier_version(request: Request, response: Response, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+        version, modifie_le = await versions.lire(db, current_user.id, collection)
+        etiquette = versions.etag(current_user.id, collection, version)
+        entetes = versions.entetes(etiquette, modifie_le)
+        if versions.correspond(request.headers.get("if-none-match"), etiquette):
+            raise HTTPException(status_code=304, headers=entetes)
+        response.headers.update(entetes)
+    return verifier_version
+
+
 class UserCreate(BaseModel):
     username: str
     password: str
@@ -304,10 +380,20 @@ class JournalPhysiologiqueCreate(BaseModel):
             raise ValueError('La durée du sommeil doit être entre 0 et 24 heures')
         return v
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await initialiser_schema()
+    await file_taches.demarrer()
+    yield
+    await file_taches.arreter()
+    file_hachage.arreter()
+    await client_llm.arreter()
+
 # Initialisation de l'application FastAPI
 app = FastAPI(
     docs_url=None if os.getenv("ENVIRONMENT") == "production" else "/docs",
     redoc_url=None if os.getenv("ENVIRONMENT") == "production" else "/redoc",
+    lifespan=lifespan,
 )
 
 # Configuration CORS - origines depuis variable d'environnement
@@ -318,7 +404,8 @@ app.add_middleware(
     allow_origins=cors_origins,
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-    allow_headers=["Content-Type", "Authorization", "Accept"],
+    allow_headers=["Content-Type", "Authorization", "Accept", "If-None-Match"],
+    expose_headers=["ETag", "Last-Modified"],
 )
 
 # Middleware pour les en-têtes de sécurité
@@ -334,35 +421,27 @@ async def add_security_headers(request: Request, call_next):
         response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
     return response
 
-# Fonction pour obtenir une session de base de données
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 # --- Endpoints d'authentification ---
 @app.post("/auth/register")
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
-    existing = db.query(User).filter(User.username == user_data.username).first()
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
+    existing = await db.scalar(select(User).where(User.username == user_data.username))
     if existing:
         raise HTTPException(status_code=400, detail="Ce nom d'utilisateur est déjà pris")
     user = User(
         username=user_data.username,
-        hashed_password=hash_password(user_data.password),
+        hashed_password=await hash_password(user_data.password),
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
-    token = create_access_token(data={"sub": user.username})
+    await db.commit()
+    cache_utilisateurs.invalider(user_data.username)
+    token = create_access_token(data={"sub": user_data.username})
     return {"access_token": token, "token_type": "bearer"}
 
 
 @app.post("/auth/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+    user = await db.scalar(select(User).where(User.username == form_data.username))
+    if not user or not await verify_password(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=401,
             detail="Nom d'utilisateur ou mot de passe incorrect",
@@ -377,90 +456,152 @@ def get_me(current_user: User = Depends(get_current_user)):
     return {"username": current_user.username, "id": current_user.id}
 
 
+@app.get("/auth/metrics")
+def metriques_hachage(current_user: User = Depends(get_current_user)):
+    """Occupation de l'exécuteur de hachage des mots de passe (file d'attente, rejets, durée moyenne)."""
+    return file_hachage.metriques()
+
+
+# Ingestion en masse
+async def ingerer_lot(elements: List[dict], schema, ecrire, collection: str, libelle: str, current_user: User, db: AsyncSession):
+    """Valide un lot avec le modèle unitaire, l'écrit en une transaction et rend un résultat par élément."""
+    if len(elements) > TAILLE_LOT_MAX:
+        raise HTTPException(status_code=413, detail=f"Lot trop volumineux ({TAILLE_LOT_MAX} éléments maximum)")
+    valides, resultats = valider_lot(schema, elements)
+    try:
+        await ecrire(db, current_user.id, valides, resultats)
+        await versions.incrementer(db, current_user.id, collection)
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Erreur lors de l'import en masse ({libelle}): {e}")
+        raise HTTPException(status_code=400, detail=f"Erreur lors de l'enregistrement du lot ({libelle}).")
+
+    resultats = [resultats[index] for index in range(len(elements))]
+    statuts = [r["statut"] for r in resultats]
+    return {
+        "message": f"Lot traité : {statuts.count('cree')} créé(s), {statuts.count('mis_a_jour')} mis à jour, "
+                   f"{statuts.count('ignore')} ignoré(s), {statuts.count('erreur')} en erreur",
+        "resultats": resultats,
+    }
+
+@app.post("/poids/bulk")
+async def ajouter_poids_en_masse(elements: List[dict], current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    return await ingerer_lot(elements, PoidsCreate, upsert_poids, "poids", "poids", current_user, db)
+
+@app.post("/mensurations/bulk")
+async def ajouter_mensurations_en_masse(elements: List[dict], current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    return await ingerer_lot(elements, MensurationCreate, upsert_mensurations, "mensurations", "mensurations", current_user, db)
+
+@app.post("/entrainements/bulk")
+async def ajouter_entrainements_en_masse(elements: List[dict], current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    return await ingerer_lot(elements, EntrainementCreate, inserer_entrainements, "entrainements", "entraînements", current_user, db)
+
+@app.post("/journal/bulk")
+async def ajouter_journal_en_masse(elements: List[dict], current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    return await ingerer_lot(elements, JournalPhysiologiqueCreate, inserer_journal, "journal", "journal", current_user, db)
+
 # Endpoints pour les poids
 @app.post("/poids/")
-def ajouter_poids(poids_data: PoidsCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def ajouter_poids(poids_data: PoidsCreate, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     try:
-        mesure_existante = db.query(Poids).filter(Poids.date == date.fromisoformat(poids_data.date_mesure)).first()
+        mesure_existante = await db.scalar(select(Poids).where(Poids.user_id == current_user.id, Poids.date == date.fromisoformat(poids_data.date_mesure)))
         if mesure_existante:
             mesure_existante.valeur = poids_data.valeur
-            db.commit()
+            await statistiques.recalculer(db, current_user.id, Poids, [mesure_existante.date])
+            await tendance.recalculer(db, current_user.id, [mesure_existante.date])
+            await versions.incrementer(db, current_user.id, "poids")
+            await db.commit()
             return {"message": "Mesure de poids mise à jour avec succès !", "id": mesure_existante.id}
         else:
-            nouvelle_mesure = Poids(valeur=poids_data.valeur, date=date.fromisoformat(poids_data.date_mesure))
+            nouvelle_mesure = Poids(user_id=current_user.id, valeur=poids_data.valeur, date=date.fromisoformat(poids_data.date_mesure))
             db.add(nouvelle_mesure)
-            db.commit()
-            db.refresh(nouvelle_mesure)
+            await statistiques.recalculer(db, current_user.id, Poids, [nouvelle_mesure.date])
+            await tendance.recalculer(db, current_user.id, [nouvelle_mesure.date])
+            await versions.incrementer(db, current_user.id, "poids")
+            await db.commit()
+            await db.refresh(nouvelle_mesure)
             return {"message": "Mesure de poids ajoutée avec succès !", "id": nouvelle_mesure.id}
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Erreur lors de l'ajout du poids: {e}")
         raise HTTPException(status_code=400, detail="Erreur lors de l'enregistrement du poids.")
 
-@app.get("/poids/")
-def lire_poids(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    poids = db.query(Poids).all()
-    return {"poids": poids}
+@app.get("/poids/", dependencies=[Depends(collection_versionnee("poids"))])
+async def lire_poids(page: ParametresPage = Depends(), current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    poids, curseur_suivant = await paginer(db, select(Poids).where(Poids.user_id == current_user.id), page, Poids.date, Poids.id)
+    return {"poids": poids, "next_cursor": curseur_suivant}
 
 @app.get("/poids/{poids_id}")
-def lire_poids_par_id(poids_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    poids = db.query(Poids).filter(Poids.id == poids_id).first()
+async def lire_poids_par_id(poids_id: int, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    poids = await db.scalar(select(Poids).where(Poids.user_id == current_user.id, Poids.id == poids_id))
     if not poids:
         raise HTTPException(status_code=404, detail="Mesure de poids non trouvée")
     return {"poids": poids}
 
 @app.put("/poids/{poids_id}")
-def mettre_a_jour_poids(poids_id: int, poids_data: PoidsCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def mettre_a_jour_poids(poids_id: int, poids_data: PoidsCreate, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     try:
-        poids = db.query(Poids).filter(Poids.id == poids_id).first()
+        poids = await db.scalar(select(Poids).where(Poids.user_id == current_user.id, Poids.id == poids_id))
         if not poids:
             raise HTTPException(status_code=404, detail="Mesure de poids non trouvée")
 
+        ancienne_date = poids.date
         poids.valeur = poids_data.valeur
         poids.date = date.fromisoformat(poids_data.date_mesure)
-        db.commit()
-        db.refresh(poids)
+        await statistiques.recalculer(db, current_user.id, Poids, [ancienne_date, poids.date])
+        await tendance.recalculer(db, current_user.id, [ancienne_date, poids.date])
+        await versions.incrementer(db, current_user.id, "poids")
+        await db.commit()
+        await db.refresh(poids)
         return {"message": "Mesure de poids mise à jour avec succès !", "poids": poids}
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Erreur lors de la mise à jour du poids {poids_id}: {e}")
         raise HTTPException(status_code=400, detail="Erreur lors de la mise à jour du poids.")
 
 @app.delete("/poids/{poids_id}")
-def supprimer_poids(poids_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def supprimer_poids(poids_id: int, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     try:
-        poids = db.query(Poids).filter(Poids.id == poids_id).first()
+        poids = await db.scalar(select(Poids).where(Poids.user_id == current_user.id, Poids.id == poids_id))
         if not poids:
             raise HTTPException(status_code=404, detail="Mesure de poids non trouvée")
 
-        db.delete(poids)
-        db.commit()
+        await db.delete(poids)
+        versions.supprimer(db, current_user.id, "poids", poids.id)
+        await statistiques.recalculer(db, current_user.id, Poids, [poids.date])
+        await tendance.recalculer(db, current_user.id, [poids.date])
+        await versions.incrementer(db, current_user.id, "poids")
+        await db.commit()
         return {"message": "Mesure de poids supprimée avec succès !"}
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Erreur lors de la suppression du poids {poids_id}: {e}")
         raise HTTPException(status_code=400, detail="Erreur lors de la suppression du poids.")
 
 # Endpoints pour les mensurations
 @app.post("/mensurations/")
-def ajouter_mensuration(mensuration_data: MensurationCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def ajouter_mensuration(mensuration_data: MensurationCreate, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     try:
-        mensuration_existante = db.query(Mensuration).filter(Mensuration.date == date.fromisoformat(mensuration_data.date_mesure)).first()
+        mensuration_existante = await db.scalar(select(Mensuration).where(Mensuration.user_id == current_user.id, Mensuration.date == date.fromisoformat(mensuration_data.date_mesure)))
         if mensuration_existante:
             # Mettre à jour uniquement les champs fournis
             for key, value in mensuration_data.dict(exclude={'date_mesure'}).items():
                 if value is not None:
                     setattr(mensuration_existante, key, value)
-            db.commit()
+            await statistiques.recalculer(db, current_user.id, Mensuration, [mensuration_existante.date])
+            await versions.incrementer(db, current_user.id, "mensurations")
+            await db.commit()
             return {"message": "Mensurations mises à jour avec succès !", "id": mensuration_existante.id}
         else:
             nouvelle_mensuration = Mensuration(
+                user_id=current_user.id,
                 date=date.fromisoformat(mensuration_data.date_mesure),
                 taille=mensuration_data.taille,
                 cou=mensuration_data.cou,
@@ -476,73 +617,83 @@ def ajouter_mensuration(mensuration_data: MensurationCreate, current_user: User
                 mollet_droit=mensuration_data.mollet_droit
             )
             db.add(nouvelle_mensuration)
-            db.commit()
-            db.refresh(nouvelle_mensuration)
+            await statistiques.recalculer(db, current_user.id, Mensuration, [nouvelle_mensuration.date])
+            await versions.incrementer(db, current_user.id, "mensurations")
+            await db.commit()
+            await db.refresh(nouvelle_mensuration)
             return {"message": "Mensurations ajoutées avec succès !", "id": nouvelle_mensuration.id}
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Erreur lors de l'ajout de la mensuration: {e}")
         raise HTTPException(status_code=400, detail="Erreur lors de l'enregistrement de la mensuration.")
 
-@app.get("/mensurations/")
-def lire_mensurations(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    mensurations = db.query(Mensuration).all()
-    return {"mensurations": mensurations}
+@app.get("/mensurations/", dependencies=[Depends(collection_versionnee("mensurations"))])
+async def lire_mensurations(page: ParametresPage = Depends(), current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    mensurations, curseur_suivant = await paginer(db, select(Mensuration).where(Mensuration.user_id == current_user.id), page, Mensuration.date, Mensuration.id)
+    return {"mensurations": mensurations, "next_cursor": curseur_suivant}
 
 @app.get("/mensurations/{mensuration_id}")
-def lire_mensuration_par_id(mensuration_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    mensuration = db.query(Mensuration).filter(Mensuration.id == mensuration_id).first()
+async def lire_mensuration_par_id(mensuration_id: int, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    mensuration = await db.scalar(select(Mensuration).where(Mensuration.user_id == current_user.id, Mensuration.id == mensuration_id))
     if not mensuration:
         raise HTTPException(status_code=404, detail="Mensuration non trouvée")
     return {"mensuration": mensuration}
 
 @app.put("/mensurations/{mensuration_id}")
-def mettre_a_jour_mensuration(mensuration_id: int, mensuration_data: MensurationCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def mettre_a_jour_mensuration(mensuration_id: int, mensuration_data: MensurationCreate, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     try:
-        mensuration = db.query(Mensuration).filter(Mensuration.id == mensuration_id).first()
+        mensuration = await db.scalar(select(Mensuration).where(Mensuration.user_id == current_user.id, Mensuration.id == mensuration_id))
         if not mensuration:
             raise HTTPException(status_code=404, detail="Mensuration non trouvée")
         
+        ancienne_date = mensuration.date
         mensuration.date = date.fromisoformat(mensuration_data.date_mesure)
         for key, value in mensuration_data.dict(exclude={'date_mesure'}).items():
             setattr(mensuration, key, value)
-        
-        db.commit()
-        db.refresh(mensuration)
+        await statistiques.recalculer(db, current_user.id, Mensuration, [ancienne_date, mensuration.date])
+        await versions.incrementer(db, current_user.id, "mensurations")
+        await db.commit()
+        await db.refresh(mensuration)
         return {"message": "Mensuration mise à jour avec succès !", "mensuration": mensuration}
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Erreur lors de la mise à jour de la mensuration {mensuration_id}: {e}")
         raise HTTPException(status_code=400, detail="Erreur lors de la mise à jour de la mensuration.")
 
 @app.delete("/mensurations/{mensuration_id}")
-def supprimer_mensuration(mensuration_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def supprimer_mensuration(mensuration_id: int, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     try:
-        mensuration = db.query(Mensuration).filter(Mensuration.id == mensuration_id).first()
+        mensuration = await db.scalar(select(Mensuration).where(Mensuration.user_id == current_user.id, Mensuration.id == mensuration_id))
         if not mensuration:
             raise HTTPException(status_code=404, detail="Mensuration non trouvée")
 
-        db.delete(mensuration)
-        db.commit()
+        await db.delete(mensuration)
+        versions.supprimer(db, current_user.id, "mensurations", mensuration.id)
+        await statistiques.recalculer(db, current_user.id, Mensuration, [mensuration.date])
+        await versions.incrementer(db, current_user.id, "mensurations")
+        await db.commit()
         return {"message": "Mensuration supprimée avec succès !"}
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Erreur lors de la suppression de la mensuration {mensuration_id}: {e}")
         raise HTTPException(status_code=400, detail="Erreur lors de la suppression de la mensuration.")
 
 # Endpoints pour les entraînements
 @app.post("/entrainements/")
-def ajouter_entrainement(entrainement_data: EntrainementCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def ajouter_entrainement(entrainement_data: EntrainementCreate, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     try:
+        exercice_id = (await exercices.resoudre(db, [entrainement_data.exercice]))[entrainement_data.exercice]
         nouvel_entrainement = Entrainement(
+            user_id=current_user.id,
             date=date.fromisoformat(entrainement_data.date),
             exercice=entrainement_data.exercice,
+            exercice_id=exercice_id,
             series=entrainement_data.series,
             reps=entrainement_data.reps,
             charge=entrainement_data.charge,
@@ -550,73 +701,122 @@ def ajouter_entrainement(entrainement_data: EntrainementCreate, current_user: Us
             notes=entrainement_data.notes
         )
         db.add(nouvel_entrainement)
-        db.commit()
-        db.refresh(nouvel_entrainement)
-        return {"message": "Entraînement ajouté avec succès !", "id": nouvel_entrainement.id}
+        nouveaux_records = await records.enregistrer_ajout(db, nouvel_entrainement)
+        await versions.incrementer(db, current_user.id, "entrainements")
+        await db.commit()
+        await db.refresh(nouvel_entrainement)
+        return {"message": "Entraînement ajouté avec succès !", "id": nouvel_entrainement.id, "nouveaux_records": nouveaux_records}
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Erreur lors de l'ajout de l'entraînement: {e}")
         raise HTTPException(status_code=400, detail="Erreur lors de l'enregistrement de l'entraînement.")
 
-@app.get("/entrainements/")
-def lire_entrainements(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    entrainements = db.query(Entrainement).all()
-    return {"entrainements": entrainements}
+@app.get("/entrainements/", dependencies=[Depends(collection_versionnee("entrainements"))])
+async def lire_entrainements(page: ParametresPage = Depends(), current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    entrainements, curseur_suivant = await paginer(db, select(Entrainement).where(Entrainement.user_id == current_user.id), page, Entrainement.date, Entrainement.id)
+    return {"entrainements": entrainements, "next_cursor": curseur_suivant}
 
 @app.get("/entrainements/{entrainement_id}")
-def lire_entrainement_par_id(entrainement_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    entrainement = db.query(Entrainement).filter(Entrainement.id == entrainement_id).first()
+async def lire_entrainement_par_id(entrainement_id: int, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    entrainement = await db.scalar(select(Entrainement).where(Entrainement.user_id == current_user.id, Entrainement.id == entrainement_id))
     if not entrainement:
         raise HTTPException(status_code=404, detail="Entraînement non trouvé")
     return {"entrainement": entrainement}
 
 @app.put("/entrainements/{entrainement_id}")
-def mettre_a_jour_entrainement(entrainement_id: int, entrainement_data: EntrainementCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def mettre_a_jour_entrainement(entrainement_id: int, entrainement_data: EntrainementCreate, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     try:
-        entrainement = db.query(Entrainement).filter(Entrainement.id == entrainement_id).first()
+        entrainement = await db.scalar(select(Entrainement).where(Entrainement.user_id == current_user.id, Entrainement.id == entrainement_id))
         if not entrainement:
             raise HTTPException(status_code=404, detail="Entraînement non trouvé")
         
+        ancien_exercice_id = entrainement.exercice_id
         entrainement.date = date.fromisoformat(entrainement_data.date)
         entrainement.exercice = entrainement_data.exercice
+        entrainement.exercice_id = (await exercices.resoudre(db, [entrainement_data.exercice]))[entrainement_data.exercice]
         entrainement.series = entrainement_data.series
         entrainement.reps = entrainement_data.reps
         entrainement.charge = entrainement_data.charge
         entrainement.rpe = entrainement_data.rpe
         entrainement.notes = entrainement_data.notes
+        await records.recalculer(db, current_user.id, {ancien_exercice_id, entrainement.exercice_id})
         
-        db.commit()
-        db.refresh(entrainement)
+        await versions.incrementer(db, current_user.id, "entrainements")
+        await db.commit()
+        await db.refresh(entrainement)
         return {"message": "Entraînement mis à jour avec succès !", "entrainement": entrainement}
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Erreur lors de la mise à jour de l'entraînement {entrainement_id}: {e}")
         raise HTTPException(status_code=400, detail="Erreur lors de la mise à jour de l'entraînement.")
 
 @app.delete("/entrainements/{entrainement_id}")
-def supprimer_entrainement(entrainement_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def supprimer_entrainement(entrainement_id: int, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     try:
-        entrainement = db.query(Entrainement).filter(Entrainement.id == entrainement_id).first()
+        entrainement = await db.scalar(select(Entrainement).where(Entrainement.user_id == current_user.id, Entrainement.id == entrainement_id))
         if not entrainement:
             raise HTTPException(status_code=404, detail="Entraînement non trouvé")
 
-        db.delete(entrainement)
-        db.commit()
+        await db.delete(entrainement)
+        versions.supprimer(db, current_user.id, "entrainements", entrainement.id)
+        await records.recalculer(db, current_user.id, [entrainement.exercice_id])
+        await versions.incrementer(db, current_user.id, "entrainements")
+        await db.commit()
         return {"message": "Entraînement supprimé avec succès !"}
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Erreur lors de la suppression de l'entraînement {entrainement_id}: {e}")
         raise HTTPException(status_code=400, detail="Erreur lors de la suppression de l'entraînement.")
 
+# Dictionnaire des exercices
+@app.get("/exercices/")
+async def lire_exercices(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """Exercices pratiqués par l'utilisateur, sous sa dernière orthographe, avec leur nombre de lignes d'entraînement et leur dernière date."""
+    noms = exercices.noms_saisis(current_user.id)
+    lignes = await db.execute(
+        select(noms.c.exercice_id, noms.c.nom, func.count(Entrainement.id), func.max(Entrainement.date))
+        .join(Entrainement, Entrainement.exercice_id == noms.c.exercice_id)
+        .where(Entrainement.user_id == current_user.id)
+        .group_by(noms.c.exercice_id, noms.c.nom)
+        .order_by(noms.c.nom)
+    )
+    return {"exercices": [
+        {"id": identifiant, "nom": nom, "nombre_lignes": nombre, "derniere_date": derniere}
+        for identifiant, nom, nombre, derniere in lignes
+    ]}
+
+@app.get("/exercices/{exercice_id}/historique")
+async def lire_historique_exercice(exercice_id: int, page: ParametresPage = Depends(), current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """Lignes d'entraînement d'un exercice, toutes orthographes confondues (lecture de l'index utilisateur, exercice, date)."""
+    noms = exercices.noms_saisis(current_user.id)
+    nom = await db.scalar(select(noms.c.nom).where(noms.c.exercice_id == exercice_id))
+    if nom is None:
+        # Exercice inconnu ou jamais pratiqué par l'utilisateur : le dictionnaire commun n'est pas exposé
+        raise HTTPException(status_code=404, detail="Exercice non trouvé")
+    stmt = select(Entrainement).where(Entrainement.user_id == current_user.id, Entrainement.exercice_id == exercice_id)
+    entrainements, curseur_suivant = await paginer(db, stmt, page, Entrainement.date, Entrainement.id)
+    return {"exercice": {"id": exercice_id, "nom": nom}, "entrainements": entrainements, "next_cursor": curseur_suivant}
+
+# Records personnels
+@app.get("/records/")
+async def lire_records(exercise: Optional[str] = None, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """Records personnels par exercice, lus dans l'index tenu à jour à l'écriture."""
+    exercice_id = None
+    if exercise:
+        exercice_id = await exercices.trouver(db, exercise)
+        if exercice_id is None:
+            raise HTTPException(status_code=404, detail="Exercice non trouvé")
+    return {"records": await records.lire_records(db, current_user.id, exercice_id)}
+
 # Endpoints pour les suppléments
 @app.post("/supplements/")
-def ajouter_supplement(supplement_data: SupplementCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def ajouter_supplement(supplement_data: SupplementCreate, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     try:
         date_debut = None
         date_fin = None
@@ -627,6 +827,7 @@ def ajouter_supplement(supplement_data: SupplementCreate, current_user: User = D
             date_fin = date.fromisoformat(supplement_data.date_fin)
         
         nouveau_supplement = Supplement(
+            user_id=current_user.id,
             nom=supplement_data.nom,
             dose=supplement_data.dose,
             frequence=supplement_data.frequence,
@@ -635,32 +836,34 @@ def ajouter_supplement(supplement_data: SupplementCreate, current_user: User = D
             notes=supplement_data.notes
         )
         db.add(nouveau_supplement)
-        db.commit()
-        db.refresh(nouveau_supplement)
+        await versions.incrementer(db, current_user.id, "supplements")
+        await db.commit()
+        await db.refresh(nouveau_supplement)
         return {"message": "Supplément ajouté avec succès !", "id": nouveau_supplement.id}
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Erreur lors de l'ajout du supplément: {e}")
         raise HTTPException(status_code=400, detail="Erreur lors de l'enregistrement du supplément.")
 
-@app.get("/supplements/")
-def lire_supplements(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    supplements = db.query(Supplement).all()
-    return {"supplements": supplements}
+@app.get("/supplements/", dependencies=[Depends(collection_versionnee("supplements"))])
+async def lire_supplements(page: ParametresPage = Depends(), current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    # Pas de date obligatoire sur les suppléments : pagination sur l'id, filtre sur la date de début
+    supplements, curseur_suivant = await paginer(db, select(Supplement).where(Supplement.user_id == current_user.id), page, Supplement.date_debut, Supplement.id, trier_par_date=False)
+    return {"supplements": supplements, "next_cursor": curseur_suivant}
 
 @app.get("/supplements/{supplement_id}")
-def lire_supplement_par_id(supplement_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    supplement = db.query(Supplement).filter(Supplement.id == supplement_id).first()
+async def lire_supplement_par_id(supplement_id: int, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    supplement = await db.scalar(select(Supplement).where(Supplement.user_id == current_user.id, Supplement.id == supplement_id))
     if not supplement:
         raise HTTPException(status_code=404, detail="Supplément non trouvé")
     return {"supplement": supplement}
 
 @app.put("/supplements/{supplement_id}")
-def mettre_a_jour_supplement(supplement_id: int, supplement_data: SupplementCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def mettre_a_jour_supplement(supplement_id: int, supplement_data: SupplementCreate, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     try:
-        supplement = db.query(Supplement).filter(Supplement.id == supplement_id).first()
+        supplement = await db.scalar(select(Supplement).where(Supplement.user_id == current_user.id, Supplement.id == supplement_id))
         if not supplement:
             raise HTTPException(status_code=404, detail="Supplément non trouvé")
         
@@ -679,39 +882,42 @@ def mettre_a_jour_supplement(supplement_id: int, supplement_data: SupplementCrea
             supplement.date_fin = None
             
         supplement.notes = supplement_data.notes
-        
-        db.commit()
-        db.refresh(supplement)
+        await versions.incrementer(db, current_user.id, "supplements")
+        await db.commit()
+        await db.refresh(supplement)
         return {"message": "Supplément mis à jour avec succès !", "supplement": supplement}
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Erreur lors de la mise à jour du supplément {supplement_id}: {e}")
         raise HTTPException(status_code=400, detail="Erreur lors de la mise à jour du supplément.")
 
 @app.delete("/supplements/{supplement_id}")
-def supprimer_supplement(supplement_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def supprimer_supplement(supplement_id: int, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     try:
-        supplement = db.query(Supplement).filter(Supplement.id == supplement_id).first()
+        supplement = await db.scalar(select(Supplement).where(Supplement.user_id == current_user.id, Supplement.id == supplement_id))
         if not supplement:
             raise HTTPException(status_code=404, detail="Supplément non trouvé")
 
-        db.delete(supplement)
-        db.commit()
+        await db.delete(supplement)
+        versions.supprimer(db, current_user.id, "supplements", supplement.id)
+        await versions.incrementer(db, current_user.id, "supplements")
+        await db.commit()
         return {"message": "Supplément supprimé avec succès !"}
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Erreur lors de la suppression du supplément {supplement_id}: {e}")
         raise HTTPException(status_code=400, detail="Erreur lors de la suppression du supplément.")
 
 # Endpoints pour le journal physiologique
 @app.post("/journal/")
-def ajouter_journal(journal_data: JournalPhysiologiqueCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def ajouter_journal(journal_data: JournalPhysiologiqueCreate, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     try:
         nouvel_entree = JournalPhysiologique(
+            user_id=current_user.id,
             date=date.fromisoformat(journal_data.date),
             texte=journal_data.texte,
             humeur=journal_data.humeur,
@@ -720,32 +926,33 @@ def ajouter_journal(journal_data: JournalPhysiologiqueCreate, current_user: User
             sommeil_duree=journal_data.sommeil_duree
         )
         db.add(nouvel_entree)
-        db.commit()
-        db.refresh(nouvel_entree)
+        await versions.incrementer(db, current_user.id, "journal")
+        await db.commit()
+        await db.refresh(nouvel_entree)
         return {"message": "Entrée de journal ajoutée avec succès !", "id": nouvel_entree.id}
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Erreur lors de l'ajout du journal: {e}")
         raise HTTPException(status_code=400, detail="Erreur lors de l'enregistrement du journal.")
 
-@app.get("/journal/")
-def lire_journal(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    entrees = db.query(JournalPhysiologique).all()
-    return {"journal": entrees}
+@app.get("/journal/", dependencies=[Depends(collection_versionnee("journal"))])
+async def lire_journal(page: ParametresPage = Depends(), current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    entrees, curseur_suivant = await paginer(db, select(JournalPhysiologique).where(JournalPhysiologique.user_id == current_user.id), page, JournalPhysiologique.date, JournalPhysiologique.id)
+    return {"journal": entrees, "next_cursor": curseur_suivant}
 
 @app.get("/journal/{journal_id}")
-def lire_journal_par_id(journal_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    entree = db.query(JournalPhysiologique).filter(JournalPhysiologique.id == journal_id).first()
+async def lire_journal_par_id(journal_id: int, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    entree = await db.scalar(select(JournalPhysiologique).where(JournalPhysiologique.user_id == current_user.id, JournalPhysiologique.id == journal_id))
     if not entree:
         raise HTTPException(status_code=404, detail="Entrée de journal non trouvée")
     return {"entree": entree}
 
 @app.put("/journal/{journal_id}")
-def mettre_a_jour_journal(journal_id: int, journal_data: JournalPhysiologiqueCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def mettre_a_jour_journal(journal_id: int, journal_data: JournalPhysiologiqueCreate, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     try:
-        entree = db.query(JournalPhysiologique).filter(JournalPhysiologique.id == journal_id).first()
+        entree = await db.scalar(select(JournalPhysiologique).where(JournalPhysiologique.user_id == current_user.id, JournalPhysiologique.id == journal_id))
         if not entree:
             raise HTTPException(status_code=404, detail="Entrée de journal non trouvée")
         
@@ -755,260 +962,407 @@ def mettre_a_jour_journal(journal_id: int, journal_data: JournalPhysiologiqueCre
         entree.energie = journal_data.energie
         entree.sommeil_qualite = journal_data.sommeil_qualite
         entree.sommeil_duree = journal_data.sommeil_duree
-        
-        db.commit()
-        db.refresh(entree)
+        await versions.incrementer(db, current_user.id, "journal")
+        await db.commit()
+        await db.refresh(entree)
         return {"message": "Entrée de journal mise à jour avec succès !", "entree": entree}
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Erreur lors de la mise à jour du journal {journal_id}: {e}")
         raise HTTPException(status_code=400, detail="Erreur lors de la mise à jour du journal.")
 
 @app.delete("/journal/{journal_id}")
-def supprimer_journal(journal_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def supprimer_journal(journal_id: int, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     try:
-        entree = db.query(JournalPhysiologique).filter(JournalPhysiologique.id == journal_id).first()
+        entree = await db.scalar(select(JournalPhysiologique).where(JournalPhysiologique.user_id == current_user.id, JournalPhysiologique.id == journal_id))
         if not entree:
             raise HTTPException(status_code=404, detail="Entrée de journal non trouvée")
 
-        db.delete(entree)
-        db.commit()
+        await db.delete(entree)
+        versions.supprimer(db, current_user.id, "journal", entree.id)
+        await versions.incrementer(db, current_user.id, "journal")
+        await db.commit()
         return {"message": "Entrée de journal supprimée avec succès !"}
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Erreur lors de la suppression du journal {journal_id}: {e}")
         raise HTTPException(status_code=400, detail="Erreur lors de la suppression du journal.")
 
 # Endpoints pour les routines
-@app.get("/routines/")
-def lire_routines(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    routines = db.query(Routine).all()
+@app.get("/routines/", dependencies=[Depends(collection_versionnee("routines"))])
+async def lire_routines(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    routines = (await db.scalars(select(Routine).where(Routine.user_id == current_user.id))).all()
     return {"routines": routines}
 
 @app.post("/routines/")
-def ajouter_routine(routine_data: RoutineCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def ajouter_routine(routine_data: RoutineCreate, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     try:
-        routine_existante = db.query(Routine).filter(Routine.nom == routine_data.nom).first()
+        routine_existante = await db.scalar(select(Routine).where(Routine.user_id == current_user.id, Routine.nom == routine_data.nom))
         if routine_existante:
             routine_existante.exercices = routine_data.exercices
-            routine_existante.updated_at = date.today()
-            db.commit()
+            await versions.incrementer(db, current_user.id, "routines")
+            await db.commit()
             return {"message": "Routine mise à jour avec succès !", "id": routine_existante.id}
         else:
             nouvelle_routine = Routine(
+                user_id=current_user.id,
                 nom=routine_data.nom,
-                exercices=routine_data.exercices,
-                updated_at=date.today()
+                exercices=routine_data.exercices
             )
             db.add(nouvelle_routine)
-            db.commit()
-            db.refresh(nouvelle_routine)
+            await versions.incrementer(db, current_user.id, "routines")
+            await db.commit()
+            await db.refresh(nouvelle_routine)
             return {"message": "Routine ajoutée avec succès !", "id": nouvelle_routine.id}
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Erreur lors de l'ajout de la routine: {e}")
         raise HTTPException(status_code=400, detail="Erreur lors de l'enregistrement de la routine.")
 
 @app.put("/routines/{routine_id}")
-def mettre_a_jour_routine(routine_id: int, routine_data: RoutineCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def mettre_a_jour_routine(routine_id: int, routine_data: RoutineCreate, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     try:
-        routine = db.query(Routine).filter(Routine.id == routine_id).first()
+        routine = await db.scalar(select(Routine).where(Routine.user_id == current_user.id, Routine.id == routine_id))
         if not routine:
             raise HTTPException(status_code=404, detail="Routine non trouvée")
         routine.nom = routine_data.nom
         routine.exercices = routine_data.exercices
-        routine.updated_at = date.today()
-        db.commit()
-        db.refresh(routine)
+        await versions.incrementer(db, current_user.id, "routines")
+        await db.commit()
+        await db.refresh(routine)
         return {"message": "Routine mise à jour avec succès !", "routine": routine}
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Erreur lors de la mise à jour de la routine {routine_id}: {e}")
         raise HTTPException(status_code=400, detail="Erreur lors de la mise à jour de la routine.")
 
 @app.delete("/routines/{routine_id}")
-def supprimer_routine(routine_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def supprimer_routine(routine_id: int, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     try:
-        routine = db.query(Routine).filter(Routine.id == routine_id).first()
+        routine = await db.scalar(select(Routine).where(Routine.user_id == current_user.id, Routine.id == routine_id))
         if not routine:
             raise HTTPException(status_code=404, detail="Routine non trouvée")
-        db.delete(routine)
-        db.commit()
+        await db.delete(routine)
+        versions.supprimer(db, current_user.id, "routines", routine.id)
+        await versions.incrementer(db, current_user.id, "routines")
+        await db.commit()
         return {"message": "Routine supprimée avec succès !"}
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Erreur lors de la suppression de la routine {routine_id}: {e}")
         raise HTTPException(status_code=400, detail="Erreur lors de la suppression de la routine.")
 
+# Amorçage du frontend
+@app.get("/dashboard/")
+async def lire_tableau_de_bord(
+    request: Request,
+    response: Response,
+    period: str = "3mois",
+    granularity: str = Query("mois", description="Granularité des statistiques : jour, semaine ou mois"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Données des vues accueil et statistiques en une requête : mesures, entraînements et journal de la période,
+    suppléments, routines, statistiques, tendance du poids et records. 304 si la révision n'a pas changé.
+    """
+    if period not in PERIODES:
+        raise HTTPException(status_code=400, detail=f"Période invalide (attendu: {', '.join(PERIODES)})")
+    if granularity not in statistiques.GRANULARITES:
+        raise HTTPException(status_code=400, detail=f"Granularité invalide (attendu: {', '.join(statistiques.GRANULARITES)})")
+
+    revision = await versions.revision_courante(db, current_user.id)
+    # La fenêtre glisse avec le jour : il fait partie de l'ETag
+    etiquette = versions.etag(current_user.id, f"dashboard-{date.today().isoformat()}", revision)
+    entetes = versions.entetes(etiquette, None)
+    if versions.correspond(request.headers.get("if-none-match"), etiquette):
+        raise HTTPException(status_code=304, headers=entetes)
+    response.headers.update(entetes)
+    return await tableau_de_bord.charger(db, current_user.id, revision, debut_periode(period), granularity)
+
+# Synchronisation incrémentale
+@app.get("/sync")
+async def synchroniser(
+    since: int = Query(0, ge=0, description="Révision de la dernière synchronisation (0 : tout)"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Lignes ajoutées ou modifiées et identifiants supprimés de chaque collection depuis la révision `since`.
+
+    Le client rappelle ensuite avec la `revision` renvoyée ; `complet` indique une resynchronisation
+    complète (révision inconnue du serveur), à substituer aux données locales.
+    """
+    return await versions.changements_depuis(db, current_user.id, since)
+
+# Import de séances Hevy
+@app.post("/import/hevy", tags=["Import"])
+async def importer_hevy(
+    request: Request,
+    date_seance: Optional[date] = Query(None, alias="date", description="Date à utiliser si le texte n'en contient pas"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Importe un export Hevy (CSV `workouts.csv` ou texte de partage d'une séance) envoyé brut dans le corps.
+
+    Le corps est lu en flux, ligne par ligne ; les séances déjà importées (même contenu) sont ignorées
+    et les séries sont insérées par lots dans les entraînements.
+    """
+    analyseur = AnalyseurHevy(date_par_defaut=date_seance)
+    bilan = {"seances_importees": 0, "doublons": 0, "series_importees": 0, "lignes_entrainement": 0}
+    lot = []
+    try:
+        async for ligne in lignes_du_flux(request.stream()):
+            lot.extend(analyseur.ajouter_ligne(ligne))
+            if sum(len(seance.series) for seance in lot) >= TAILLE_LOT_SERIES:
+                await importer_seances(db, current_user.id, lot, bilan)
+                lot = []
+        lot.extend(analyseur.terminer())
+        if lot:
+            await importer_seances(db, current_user.id, lot, bilan)
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Erreur lors de l'import Hevy: {e}")
+        raise HTTPException(status_code=400, detail="Erreur lors de l'import de la séance Hevy.")
+
+    return {
+        "message": f"{bilan['seances_importees']} séance(s) importée(s), {bilan['doublons']} déjà présente(s)",
+        **bilan,
+        "lignes_ignorees": analyseur.lignes_ignorees,
+    }
+
+# Séries sous-échantillonnées pour les graphiques
+@app.get("/series/{metric}")
+async def lire_serie(
+    metric: str,
+    period: str = "3mois",
+    points: int = Query(200, ge=10, le=2000, description="Nombre maximum de points renvoyés"),
+    method: str = Query("lttb", description="lttb ou paquets (min/moyenne/max par intervalle)"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    if metric not in METRIQUES:
+        raise HTTPException(status_code=404, detail="Métrique inconnue")
+    if period not in PERIODES:
+        raise HTTPException(status_code=400, detail=f"Période invalide (attendu: {', '.join(PERIODES)})")
+    if method not in ("lttb", "paquets"):
+        raise HTTPException(status_code=400, detail="Méthode invalide (attendu: lttb ou paquets)")
+
+    if metric == "poids":
+        modele, colonne = Poids, Poids.valeur
+    else:
+        modele, colonne = Mensuration, getattr(Mensuration, metric)
+
+    stmt = select(modele.date, colonne).where(modele.user_id == current_user.id, colonne.isnot(None))
+    debut = debut_periode(period)
+    if debut is not None:
+        stmt = stmt.where(modele.date >= debut)
+    serie = [(jour, valeur) for jour, valeur in await db.execute(stmt.order_by(modele.date))]
+
+    if method == "lttb":
+        resultat = [{"date": jour.isoformat(), "valeur": valeur} for jour, valeur in lttb(serie, points)]
+    else:
+        resultat = agreger_par_paquets(serie, points)
+    return {"metric": metric, "period": period, "method": method, "total": len(serie), "points": resultat}
+
+@app.get("/stats/")
+async def lire_statistiques(
+    metrics: Optional[str] = Query(None, description="Métriques séparées par des virgules (toutes par défaut)"),
+    granularity: str = Query("mois", description="jour, semaine ou mois"),
+    period: str = "tout",
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Moyenne, minimum, maximum, première et dernière valeur et évolution de chaque métrique,
+    globalement et par paquet, lues dans les agrégats tenus à jour à chaque écriture.
+    """
+    metriques = metrics.split(",") if metrics else METRIQUES
+    inconnues = [m for m in metriques if m not in METRIQUES]
+    if inconnues:
+        raise HTTPException(status_code=404, detail=f"Métrique inconnue : {', '.join(inconnues)}")
+    if granularity not in statistiques.GRANULARITES:
+        raise HTTPException(status_code=400, detail=f"Granularité invalide (attendu: {', '.join(statistiques.GRANULARITES)})")
+    if period not in PERIODES:
+        raise HTTPException(status_code=400, detail=f"Période invalide (attendu: {', '.join(PERIODES)})")
+
+    resultats = await statistiques.lire_statistiques(db, current_user.id, metriques, granularity, debut=debut_periode(period))
+    return {"granularity": granularity, "period": period, "metrics": resultats}
+
+@app.get("/tendance/")
+async def lire_tendance_poids(period: str = "tout", current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """
+    Poids lissé, vitesse (kg/semaine) et bande de confiance à 95 % après chaque pesée,
+    lus dans les états du filtre de tendance tenus à jour à chaque écriture.
+    """
+    if period not in PERIODES:
+        raise HTTPException(status_code=400, detail=f"Période invalide (attendu: {', '.join(PERIODES)})")
+    return {"period": period, **await tendance.lire_tendance(db, current_user.id, debut=debut_periode(period))}
+
+# Analytique d'entraînement (NumPy)
+async def charger_historique(period: str, exercise: Optional[str], formula: str, current_user: User, db: AsyncSession):
+    if analytique.np is None:
+        raise HTTPException(status_code=501, detail="Analytique d'entraînement indisponible : installez numpy sur le serveur.")
+    if period not in PERIODES:
+        raise HTTPException(status_code=400, detail=f"Période invalide (attendu: {', '.join(PERIODES)})")
+    if formula not in analytique.FORMULES_1RM:
+        raise HTTPException(status_code=400, detail=f"Formule invalide (attendu: {', '.join(analytique.FORMULES_1RM)})")
+    exercice_id = None
+    if exercise is not None:
+        exercice_id = await exercices.trouver(db, exercise)
+        if exercice_id is None:
+            return analytique.HistoriqueEntrainement.depuis_lignes([])
+    return await analytique.charger(db, current_user.id, debut=debut_periode(period), exercice_id=exercice_id)
+
+@app.get("/analytique/volume", tags=["Analytique"])
+async def lire_volume_hebdomadaire(
+    period: str = "3mois",
+    exercise: Optional[str] = None,
+    formula: str = "epley",
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Séries, répétitions, tonnage et meilleur 1RM estimé par semaine et par exercice, et tonnage total par semaine."""
+    historique = await charger_historique(period, exercise, formula, current_user, db)
+    return {"period": period, "formula": formula, **analytique.volume_hebdomadaire(historique, formula)}
+
+@app.get("/analytique/1rm", tags=["Analytique"])
+async def lire_meilleurs_un_rm(
+    period: str = "tout",
+    exercise: Optional[str] = None,
+    formula: str = "epley",
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Meilleur 1RM estimé de chaque exercice (`formula` : epley, brzycki ou rpe, qui ajoute les répétitions en réserve)."""
+    historique = await charger_historique(period, exercise, formula, current_user, db)
+    return {"period": period, "formula": formula, "exercices": analytique.meilleurs_un_rm(historique, formula)}
+
+@app.get("/analytique/intensite", tags=["Analytique"])
+async def lire_distributions_intensite(
+    period: str = "3mois",
+    exercise: Optional[str] = None,
+    formula: str = "epley",
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Répartition des séries par zone d'intensité (% du meilleur 1RM estimé de l'exercice) et par RPE."""
+    historique = await charger_historique(period, exercise, formula, current_user, db)
+    return {"period": period, "formula": formula, **analytique.distributions_intensite(historique, formula)}
+
 @app.get("/")
 def read_root():
     return {"message": "Bienvenue sur l'API de suivi de transformation physique !"}
 
 @app.get("/export-csv/")
-def export_csv(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def export_csv(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     """
     Exporte toutes les données de poids et mensurations au format CSV.
-    
-    Retourne un fichier CSV téléchargeable avec les colonnes :
+
+    Retourne un fichier CSV téléchargeable, une ligne par date, avec les colonnes :
     - date: Date de la mesure
     - poids: Valeur du poids
-    - taille: Valeur de la taille
-    - bras: Valeur des bras
-    - cuisses: Valeur des cuisses
+    - taille, cou, epaules, ... , mollet_droit: Mensurations en cm
+
+    Le fichier est envoyé en flux au fur et à mesure de la lecture en base.
     """
-    try:
-        # Récupérer toutes les données
-        poids_data = db.query(Poids).all()
-        mensurations_data = db.query(Mensuration).all()
-        
-        # Créer un dictionnaire pour stocker les données combinées par date
-        data_by_date = {}
-        
-        # Ajouter les données de poids
-        for poids in poids_data:
-            date_str = poids.date.isoformat()
-            if date_str not in data_by_date:
-                data_by_date[date_str] = {'date': date_str, 'poids': None}
-            data_by_date[date_str]['poids'] = poids.valeur
-        
-        # Ajouter les données de mensurations
-        for mensuration in mensurations_data:
-            date_str = mensuration.date.isoformat()
-            if date_str not in data_by_date:
-                data_by_date[date_str] = {'date': date_str, 'poids': None}
-            
-            # Ajouter toutes les mensurations
-            if mensuration.taille is not None:
-                data_by_date[date_str]['taille'] = mensuration.taille
-            if mensuration.cou is not None:
-                data_by_date[date_str]['cou'] = mensuration.cou
-            if mensuration.epaules is not None:
-                data_by_date[date_str]['epaules'] = mensuration.epaules
-            if mensuration.poitrine is not None:
-                data_by_date[date_str]['poitrine'] = mensuration.poitrine
-            if mensuration.nombril is not None:
-                data_by_date[date_str]['nombril'] = mensuration.nombril
-            if mensuration.hanches is not None:
-                data_by_date[date_str]['hanches'] = mensuration.hanches
-            if mensuration.biceps_gauche is not None:
-                data_by_date[date_str]['biceps_gauche'] = mensuration.biceps_gauche
-            if mensuration.biceps_droit is not None:
-                data_by_date[date_str]['biceps_droit'] = mensuration.biceps_droit
-            if mensuration.cuisse_gauche is not None:
-                data_by_date[date_str]['cuisse_gauche'] = mensuration.cuisse_gauche
-            if mensuration.cuisse_droite is not None:
-                data_by_date[date_str]['cuisse_droite'] = mensuration.cuisse_droite
-            if mensuration.mollet_gauche is not None:
-                data_by_date[date_str]['mollet_gauche'] = mensuration.mollet_gauche
-            if mensuration.mollet_droit is not None:
-                data_by_date[date_str]['mollet_droit'] = mensuration.mollet_droit
-        
-        # Créer le fichier CSV en mémoire
-        output = io.StringIO(newline='')
-        
-        # Déterminer tous les champs possibles
-        all_fields = ['date', 'poids', 'taille', 'cou', 'epaules', 'poitrine', 'nombril', 'hanches',
-                     'biceps_gauche', 'biceps_droit', 'cuisse_gauche', 'cuisse_droite',
-                     'mollet_gauche', 'mollet_droit']
-        
-        writer = csv.DictWriter(output, fieldnames=all_fields, lineterminator='\n')
-        
-        writer.writeheader()
-        for date_str in sorted(data_by_date.keys()):
-            writer.writerow(data_by_date[date_str])
-        
-        # Préparer la réponse
-        response = Response(content=output.getvalue(), media_type="text/csv")
-        response.headers["Content-Disposition"] = "attachment; filename=donnees_transformation.csv"
-        
-        return response
-        
-    except Exception as e:
-        logger.error(f"Erreur lors de l'export CSV: {e}")
-        raise HTTPException(status_code=500, detail="Erreur lors de l'export CSV.")
+    return StreamingResponse(
+        flux_csv(db, requete_mesures(current_user.id), ENTETES_MESURES),
+        media_type="text/csv",
+        headers={"Content-Disposition": "attachment; filename=donnees_transformation.csv"},
+    )
+
+@app.get("/export-csv/{collection}")
+async def export_csv_collection(collection: str, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """
+    Exporte une collection (entrainements, journal ou supplements) au format CSV, en flux.
+    """
+    if collection not in COLLECTIONS:
+        raise HTTPException(status_code=404, detail="Collection inconnue")
+    _, colonnes, _ = COLLECTIONS[collection]
+    return StreamingResponse(
+        flux_csv(db, requete_collection(current_user.id, collection), colonnes),
+        media_type="text/csv",
+        headers={"Content-Disposition": f"attachment; filename={collection}.csv"},
+    )
+
+@app.get("/export/{table}")
+async def export_table_colonnaire(table: str, format: str = "parquet", current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """
+    Exporte une table au format colonnaire typé pour l'analyse (pandas, polars, DuckDB...).
+
+    - **table** : poids, mensurations, entrainements, supplements, routines ou journal
+    - **format** : `parquet` (compressé) ou `arrow` (Arrow IPC, chargeable sans copie via memory-map)
+
+    Le fichier est envoyé en flux, un lot à la fois.
+    """
+    if table not in TABLES_COLONNAIRES:
+        raise HTTPException(status_code=404, detail="Table inconnue")
+    if format not in FORMATS_COLONNAIRES:
+        raise HTTPException(status_code=400, detail="Format invalide (attendu: parquet ou arrow)")
+    if exports.pa is None:
+        raise HTTPException(status_code=501, detail="Export colonnaire indisponible : installez pyarrow sur le serveur.")
+    extension, media_type = FORMATS_COLONNAIRES[format]
+    return StreamingResponse(
+        flux_colonnaire(db, current_user.id, table, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={table}.{extension}"},
+    )
 
 class AnalyseRequest(BaseModel):
     """Requête d'analyse IA des données de transformation."""
     user_prompt: str = "Analyse mes données de transformation physique et donne-moi des conseils personnalisés"
+    type_analyse: str = "general"
 
-@app.post("/analyse/", tags=["Analyse IA"], summary="Analyse personnalisée via Mistral AI",
-          response_description="Analyse détaillée et conseils basés sur vos données")
-async def analyse(
-    request_data: AnalyseRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
-):
-    """
-    Analyse les données de transformation physique avec l'API Mistral AI.
+    @field_validator('type_analyse')
+    @classmethod
+    def type_analyse_valide(cls, v):
+        if v not in TYPES_ANALYSE:
+            raise ValueError(f"Type d'analyse invalide (attendu: {', '.join(TYPES_ANALYSE)})")
+        return v
 
-    Récupère automatiquement toutes les données (poids, mensurations, entraînements, journal)
-    et les envoie à Mistral pour obtenir une analyse personnalisée.
+MISTRAL_URL = "https://api.mistral.ai/v1/chat/completions"
 
-    - **user_prompt** : question ou demande d'analyse personnalisée (optionnel)
-    """
+
+async def preparer_analyse(request_data: AnalyseRequest, current_user: User, db: AsyncSession):
+    """Vérifie la configuration, charge et résume les données, puis construit la requête Mistral."""
     # Vérifier la clé API
     api_key = os.getenv("MISTRAL_API_KEY")
     if not api_key or api_key == "votre_cle_api_mistral_ici":
         raise HTTPException(status_code=500, detail="Clé API Mistral non configurée côté serveur.")
 
-    # Récupérer toutes les données
-    poids_list = db.query(Poids).order_by(Poids.date).all()
-    mensurations = db.query(Mensuration).order_by(Mensuration.date).all()
-    entrainements = db.query(Entrainement).order_by(Entrainement.date).all()
-    journal_entries = db.query(JournalPhysiologique).order_by(JournalPhysiologique.date).all()
-
-    # Formater les données
-    data = {
-        "poids": [{"date": p.date.isoformat(), "valeur_kg": p.valeur} for p in poids_list],
-        "mensurations": [
-            {
-                "date": m.date.isoformat(),
-                "taille": m.taille, "cou": m.cou, "epaules": m.epaules,
-                "poitrine": m.poitrine, "nombril": m.nombril, "hanches": m.hanches,
-                "biceps_gauche": m.biceps_gauche, "biceps_droit": m.biceps_droit,
-                "cuisse_gauche": m.cuisse_gauche, "cuisse_droite": m.cuisse_droite,
-                "mollet_gauche": m.mollet_gauche, "mollet_droit": m.mollet_droit,
-            }
-            for m in mensurations
-        ],
-        "entrainements": [
-            {
-                "date": e.date.isoformat(), "exercice": e.exercice,
-                "series": e.series, "reps": e.reps,
-                "charge_kg": e.charge, "rpe": e.rpe, "notes": e.notes,
-            }
-            for e in entrainements
-        ],
-        "journal": [
-            {
-                "date": j.date.isoformat(), "texte": j.texte,
-                "humeur": j.humeur, "energie": j.energie,
-                "sommeil_qualite": j.sommeil_qualite, "sommeil_duree_h": j.sommeil_duree,
-            }
-            for j in journal_entries
-        ],
-    }
+    # Récupérer uniquement les tables utiles au type d'analyse
+    modeles = {"poids": Poids, "mensurations": Mensuration, "entrainements": Entrainement, "journal": JournalPhysiologique}
+    lignes = {}
+    for table in TYPES_ANALYSE[request_data.type_analyse]:
+        modele = modeles[table]
+        lignes[table] = (await db.scalars(select(modele).where(modele.user_id == current_user.id).order_by(modele.date, modele.id))).all()
+
+    # Résumés statistiques (hebdomadaire, tendances, meilleures performances, derniers jours) tenant dans le budget
+    data, compaction = compacter(lignes, request_data.type_analyse, ANALYSE_TOKEN_BUDGET)
 
     # Construire le prompt
     prompt = (
         f"{request_data.user_prompt}\n\n"
-        f"Voici les données de transformation physique au format JSON :\n"
-        f"{json.dumps(data, ensure_ascii=False, indent=2)}\n\n"
+        f"Voici un résumé de mes données de transformation physique au format JSON "
+        f"(agrégats hebdomadaires, tendances en unités par semaine, meilleures performances, détail des derniers jours) :\n"
+        f"{serialiser(data)}\n\n"
         f"Fournis une analyse détaillée avec des tendances, points forts, "
         f"points d'amélioration et conseils personnalisés."
     )
 
-    # Appel à l'API Mistral
+    # Requête à l'API Mistral
     headers = {
         "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json",
@@ -1023,36 +1377,260 @@ async def analyse(
         "max_tokens": 2000,
     }
 
+    data_summary = {
+        "poids_count": len(lignes.get("poids", [])),
+        "mensurations_count": len(lignes.get("mensurations", [])),
+        "entrainements_count": len(lignes.get("entrainements", [])),
+        "journal_count": len(lignes.get("journal", [])),
+        "compaction": compaction,
+    }
+    return headers, payload, data_summary
+
+
+def service_ia_indisponible(reessayer_dans: Optional[float] = None) -> HTTPException:
+    headers = {"Retry-After": str(max(1, round(reessayer_dans)))} if reessayer_dans else None
+    return HTTPException(status_code=503, detail="Service d'analyse IA temporairement indisponible.", headers=headers)
+
+
+async def lire_cache_analyse(db: AsyncSession, cle: str) -> Optional[dict]:
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                "https://api.mistral.ai/v1/chat/completions",
-                headers=headers,
-                json=payload,
-            )
+        return await cache_analyses.obtenir(db, cle)
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Erreur de lecture du cache d'analyse: {e}")
+        return None
+
+
+async def ecrire_cache_analyse(db: AsyncSession, cle: str, user_id: int, modele: str, reponse: dict) -> None:
+    try:
+        await cache_analyses.enregistrer(db, cle, user_id, modele, reponse)
+    except Exception as e:
+        # Le cache est une optimisation : l'analyse est renvoyée même s'il n'a pas pu être écrit
+        await db.rollback()
+        logger.error(f"Erreur d'écriture du cache d'analyse: {e}")
+
+
+async def calculer_analyse(request_data: AnalyseRequest, current_user: User, db: AsyncSession) -> dict:
+    """Analyse complète (cache puis Mistral), partagée par `POST /analyse/` et les tâches de fond."""
+    headers, payload, data_summary = await preparer_analyse(request_data, current_user, db)
+
+    # Même utilisateur, mêmes données, même prompt et même modèle : réponse déjà connue
+    cle_cache = cache_analyses.cle(current_user.id, payload)
+    reponse_en_cache = await lire_cache_analyse(db, cle_cache)
+    if reponse_en_cache is not None:
+        return {**reponse_en_cache, "en_cache": True}
+
+    try:
+        response = await client_llm.envoyer("POST", MISTRAL_URL, headers=headers, json=payload)
         response.raise_for_status()
         result = response.json()
+    except llm.DisjoncteurOuvert as e:
+        raise service_ia_indisponible(e.reessayer_dans)
     except httpx.HTTPStatusError as e:
         logger.error(f"Erreur HTTP Mistral ({e.response.status_code}): {e.response.text}")
         raise HTTPException(status_code=502, detail="Erreur lors de la communication avec le service d'analyse IA.")
     except httpx.RequestError as e:
         logger.error(f"Erreur de connexion Mistral: {e}")
-        raise HTTPException(status_code=503, detail="Service d'analyse IA temporairement indisponible.")
+        raise service_ia_indisponible()
 
     # Extraire le texte de la réponse
     analyse_text = result["choices"][0]["message"]["content"]
 
-    return {
+    reponse = {
         "analyse": analyse_text,
         "model": result.get("model"),
         "usage": result.get("usage"),
-        "data_summary": {
-            "poids_count": len(poids_list),
-            "mensurations_count": len(mensurations),
-            "entrainements_count": len(entrainements),
-            "journal_count": len(journal_entries),
-        },
+        "data_summary": data_summary,
     }
+    await ecrire_cache_analyse(db, cle_cache, current_user.id, payload["model"], reponse)
+    return {**reponse, "en_cache": False}
+
+
+@app.post("/analyse/", tags=["Analyse IA"], summary="Analyse personnalisée via Mistral AI",
+          response_description="Analyse détaillée et conseils basés sur vos données")
+async def analyse(
+    request_data: AnalyseRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Analyse les données de transformation physique avec l'API Mistral AI.
+
+    Récupère les données utiles au type d'analyse, les résume pour tenir dans le budget
+    de tokens et les envoie à Mistral pour obtenir une analyse personnalisée.
+
+    - **user_prompt** : question ou demande d'analyse personnalisée (optionnel)
+    - **type_analyse** : `poids` (poids, mensurations), `entrainement` (séances, journal) ou `general` (tout)
+    """
+    return await calculer_analyse(request_data, current_user, db)
+
+
+def evenement_sse(nom: str, donnees: dict) -> str:
+    return f"event: {nom}\ndata: {json.dumps(donnees, ensure_ascii=False)}\n\n"
+
+
+ENTETES_SSE = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+@app.post("/analyse/stream", tags=["Analyse IA"], summary="Analyse personnalisée via Mistral AI, en flux (SSE)")
+async def analyse_en_flux(
+    request_data: AnalyseRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Même analyse que `POST /analyse/`, relayée au fil de la génération en Server-Sent Events.
+
+    - `token` : `{"texte": ...}`, un fragment du texte généré ;
+    - `fin` : `{"model", "usage", "data_summary", "en_cache"}`, une fois la génération terminée ;
+    - `erreur` : `{"detail": ...}` si le flux amont est interrompu.
+
+    Une analyse déjà en cache est renvoyée en un seul `token` suivi de `fin`.
+    """
+    headers, payload, data_summary = await preparer_analyse(request_data, current_user, db)
+
+    cle_cache = cache_analyses.cle(current_user.id, payload)
+    reponse_en_cache = await lire_cache_analyse(db, cle_cache)
+    if reponse_en_cache is not None:
+        async def rejouer():
+            yield evenement_sse("token", {"texte": reponse_en_cache["analyse"]})
+            yield evenement_sse("fin", {**{k: v for k, v in reponse_en_cache.items() if k != "analyse"}, "en_cache": True})
+        return StreamingResponse(rejouer(), media_type="text/event-stream", headers=ENTETES_SSE)
+
+    # Connexion ouverte avant de répondre : une erreur amont devient encore un vrai code HTTP
+    try:
+        amont = await client_llm.envoyer("POST", MISTRAL_URL, stream=True, headers=headers, json={**payload, "stream": True})
+    except llm.DisjoncteurOuvert as e:
+        raise service_ia_indisponible(e.reessayer_dans)
+    except httpx.RequestError as e:
+        logger.error(f"Erreur de connexion Mistral: {e}")
+        raise service_ia_indisponible()
+    if amont.status_code >= 400:
+        await amont.aread()
+        logger.error(f"Erreur HTTP Mistral ({amont.status_code}): {amont.text}")
+        await amont.aclose()
+        raise HTTPException(status_code=502, detail="Erreur lors de la communication avec le service d'analyse IA.")
+
+    async def relayer():
+        morceaux = []
+        modele, usage = None, None
+        try:
+            async for ligne in amont.aiter_lines():
+                if not ligne.startswith("data:"):
+                    continue
+                donnees = ligne[len("data:"):].strip()
+                if donnees == "[DONE]":
+                    break
+                morceau = json.loads(donnees)
+                modele = morceau.get("model") or modele
+                usage = morceau.get("usage") or usage
+                for choix in morceau.get("choices", []):
+                    texte = (choix.get("delta") or {}).get("content")
+                    if texte:
+                        morceaux.append(texte)
+                        yield evenement_sse("token", {"texte": texte})
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error(f"Flux Mistral interrompu: {e}")
+            yield evenement_sse("erreur", {"detail": "Le flux d'analyse IA a été interrompu."})
+            return
+        finally:
+            # Aussi exécuté si le client se déconnecte : la génération amont est abandonnée
+            await amont.aclose()
+
+        reponse = {"analyse": "".join(morceaux), "model": modele, "usage": usage, "data_summary": data_summary}
+        await ecrire_cache_analyse(db, cle_cache, current_user.id, payload["model"], reponse)
+        yield evenement_sse("fin", {**{k: v for k, v in reponse.items() if k != "analyse"}, "en_cache": False})
+
+    return StreamingResponse(relayer(), media_type="text/event-stream", headers=ENTETES_SSE)
+
+
+async def analyse_en_tache(db: AsyncSession, tache: TacheAnalyse) -> dict:
+    """Calcul exécuté par les workers de `file_taches` ; les erreurs HTTP deviennent le message d'échec de la tâche."""
+    request_data = AnalyseRequest(user_prompt=tache.user_prompt, type_analyse=tache.type_analyse)
+    try:
+        return await calculer_analyse(request_data, User(id=tache.user_id), db)
+    except HTTPException as e:
+        raise taches.ErreurTache(e.detail)
+
+file_taches.calcul = analyse_en_tache
+
+# Intervalle de consultation du statut pour GET /analyse/jobs/{job_id}/stream
+INTERVALLE_SUIVI_TACHE = float(os.getenv("ANALYSE_JOBS_POLL_SECONDS", "1"))
+
+
+async def obtenir_tache(db: AsyncSession, job_id: str, user_id: int):
+    tache = await db.get(TacheAnalyse, job_id)
+    if tache is None or tache.user_id != user_id:
+        raise HTTPException(status_code=404, detail="Tâche d'analyse non trouvée")
+    return tache
+
+
+@app.post("/analyse/jobs", tags=["Analyse IA"], status_code=202, summary="Soumettre une analyse en tâche de fond")
+async def soumettre_analyse(
+    request_data: AnalyseRequest,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Enregistre la demande d'analyse et rend la main immédiatement avec l'identifiant de la tâche.
+
+    L'analyse est exécutée par le pool de workers ; son statut (`en_attente`, `en_cours`,
+    `terminee`, `echec`) et son résultat se consultent avec `GET /analyse/jobs/{job_id}`
+    ou en flux avec `GET /analyse/jobs/{job_id}/stream`.
+    """
+    try:
+        tache = await file_taches.soumettre(db, current_user.id, request_data.type_analyse, request_data.user_prompt)
+    except taches.FileUtilisateurPleine:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Trop d'analyses en cours (maximum {file_taches.max_par_utilisateur}), réessayez quand l'une d'elles sera terminée.",
+        )
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Erreur lors de la soumission de l'analyse: {e}")
+        raise HTTPException(status_code=500, detail="Erreur lors de la soumission de l'analyse")
+    response.headers["Location"] = f"/analyse/jobs/{tache.id}"
+    return {"job_id": tache.id, "statut": tache.statut}
+
+
+@app.get("/analyse/jobs/{job_id}", tags=["Analyse IA"])
+async def statut_analyse(job_id: str, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """Statut d'une tâche d'analyse et, une fois terminée, son résultat (même forme que `POST /analyse/`)."""
+    return taches.decrire(await obtenir_tache(db, job_id, current_user.id))
+
+
+@app.get("/analyse/jobs/{job_id}/stream", tags=["Analyse IA"])
+async def suivre_analyse(job_id: str, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """
+    Suit une tâche d'analyse en Server-Sent Events.
+
+    - `statut` : `{"statut": ...}` à chaque changement de statut ;
+    - `fin` : la description complète de la tâche (résultat ou erreur), une fois terminée.
+    """
+    tache = await obtenir_tache(db, job_id, current_user.id)
+
+    async def suivre():
+        dernier_statut = None
+        while True:
+            if tache.statut != dernier_statut:
+                dernier_statut = tache.statut
+                yield evenement_sse("statut", {"statut": dernier_statut})
+            if dernier_statut in taches.STATUTS_FINAUX:
+                yield evenement_sse("fin", taches.decrire(tache))
+                return
+            await asyncio.sleep(INTERVALLE_SUIVI_TACHE)
+            # Nouvelle transaction : relit la ligne mise à jour par le worker
+            await db.rollback()
+            await db.refresh(tache)
+
+    return StreamingResponse(suivre(), media_type="text/event-stream", headers=ENTETES_SSE)
+
+
+@app.get("/analyse/metrics", tags=["Analyse IA"])
+async def metriques_cache_analyses(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """Efficacité du cache des analyses, état de la connexion à Mistral (reprises, disjoncteur) et de la file de tâches."""
+    return {**await cache_analyses.metriques(db), "amont": client_llm.metriques(), "taches": file_taches.metriques()}
 
 
 if __name__ == "__main__":
@@ -18,10 +18,14 @@ target_metadata = Base.metadata
 config = context.config
 fileConfig(config.config_file_name)
 
+# Même base que l'application : DATABASE_URL prime sur alembic.ini
+if os.getenv("DATABASE_URL"):
+    config.set_main_option("sqlalchemy.url", os.environ["DATABASE_URL"].replace("%", "%%"))
+
 # Intercepter le processus de migration pour utiliser notre propre configuration
 def run_migrations_offline():
     """Run migrations in 'offline' mode."""
-    url = "sqlite:///./transformation.db"
+    url = config.get_main_option("sqlalchemy.url")
     context.configure(
         url=url,
         target_metadata=target_metadata,
@@ -46,6 +50,8 @@ def run_migrations_online():
             connection=connection,
             target_metadata=target_metadata,
             compare_type=True,
+            # ALTER TABLE par recopie sous SQLite uniquement ; instructions natives sous PostgreSQL
+            render_as_batch=connection.dialect.name == "sqlite",
         )
 
         with context.begin_transaction():
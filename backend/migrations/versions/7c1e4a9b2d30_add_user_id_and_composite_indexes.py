@@ -0,0 +1,69 @@
+"""Add user_id ownership columns and composite (user_id, date) indexes
+
+Revision ID: 7c1e4a9b2d30
+Revises: 26dd0b498b2e
+Create Date: 2026-10-18 09:12:04.517230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1e4a9b2d30'
+down_revision: Union[str, Sequence[str], None] = '26dd0b498b2e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# table -> (ancien index mono-colonne à supprimer, nouvel index composite, colonnes, unique)
+INDEX_PAR_TABLE = {
+    'poids': ('ix_poids_date', 'ix_poids_user_date', ['user_id', 'date'], True),
+    'mensurations': ('ix_mensurations_date', 'ix_mensurations_user_date', ['user_id', 'date'], True),
+    'entrainements': ('ix_entrainements_date', 'ix_entrainements_user_date', ['user_id', 'date'], False),
+    'supplements': (None, 'ix_supplements_user_date_debut', ['user_id', 'date_debut'], False),
+    'routines': (None, 'ix_routines_user_nom', ['user_id', 'nom'], False),
+    'journal_physiologique': ('ix_journal_physiologique_date', 'ix_journal_physiologique_user_date', ['user_id', 'date'], False),
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    conn = op.get_bind()
+
+    for table in INDEX_PAR_TABLE:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('user_id', sa.Integer(), nullable=True))
+
+    # Les données existantes appartiennent au premier compte créé
+    proprietaire = conn.execute(sa.text("SELECT MIN(id) FROM users")).scalar()
+    for table in INDEX_PAR_TABLE:
+        orphelins = conn.execute(sa.text(f"SELECT COUNT(*) FROM {table} WHERE user_id IS NULL")).scalar()
+        if orphelins and proprietaire is None:
+            raise RuntimeError(
+                f"La table {table} contient des données mais aucun utilisateur n'existe : "
+                "créez un compte avant d'appliquer cette migration."
+            )
+        conn.execute(sa.text(f"UPDATE {table} SET user_id = :uid WHERE user_id IS NULL"), {"uid": proprietaire})
+
+    for table, (ancien_index, nouvel_index, colonnes, unique) in INDEX_PAR_TABLE.items():
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('user_id', existing_type=sa.Integer(), nullable=False)
+            batch_op.create_foreign_key(f'fk_{table}_user_id_users', 'users', ['user_id'], ['id'])
+            if ancien_index:
+                batch_op.drop_index(ancien_index)
+            batch_op.create_index(nouvel_index, colonnes, unique=unique)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, (ancien_index, nouvel_index, colonnes, unique) in INDEX_PAR_TABLE.items():
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_index(nouvel_index)
+            if ancien_index:
+                # poids et mensurations retrouvent leur contrainte d'unicité globale sur la date
+                batch_op.create_index(ancien_index, ['date'], unique=unique)
+            batch_op.drop_constraint(f'fk_{table}_user_id_users', type_='foreignkey')
+            batch_op.drop_column('user_id')
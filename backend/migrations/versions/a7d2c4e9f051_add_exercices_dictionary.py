@@ -0,0 +1,84 @@
+"""Add exercices dictionary and entrainements.exercice_id
+
+Revision ID: a7d2c4e9f051
+Revises: f3c8a1d0b6e4
+Create Date: 2026-10-18 18:20:37.115402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from exercices import normaliser
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d2c4e9f051'
+down_revision: Union[str, Sequence[str], None] = 'f3c8a1d0b6e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    exercices = op.create_table(
+        'exercices',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('nom', sa.String(length=100), nullable=False, comment='Nom canonique (première orthographe rencontrée)'),
+        sa.Column('cle', sa.String(length=100), nullable=False, comment='Nom normalisé : minuscules, sans accents ni ponctuation'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('cle'),
+    )
+    op.create_index('ix_exercices_id', 'exercices', ['id'], unique=False)
+    alias_exercices = op.create_table(
+        'alias_exercices',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('cle', sa.String(length=100), nullable=False),
+        sa.Column('exercice_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['exercice_id'], ['exercices.id'], name='fk_alias_exercices_exercice_id_exercices'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('cle'),
+    )
+    op.create_index('ix_alias_exercices_id', 'alias_exercices', ['id'], unique=False)
+    op.create_index('ix_alias_exercices_exercice_id', 'alias_exercices', ['exercice_id'], unique=False)
+
+    with op.batch_alter_table('entrainements') as batch_op:
+        batch_op.add_column(sa.Column('exercice_id', sa.Integer(), nullable=True, comment='Exercice du dictionnaire'))
+        batch_op.alter_column('exercice', existing_type=sa.String(length=100), existing_nullable=False,
+                              comment="Nom de l'exercice tel que saisi", existing_comment="Nom de l'exercice")
+
+    # Dédoublonnage des noms existants : une entrée par clé normalisée, nommée par la première orthographe
+    connexion = op.get_bind()
+    noms = sorted(connexion.execute(sa.text("SELECT DISTINCT exercice FROM entrainements")).scalars())
+    par_cle = {}
+    for nom in noms:
+        par_cle.setdefault(normaliser(nom), nom[:100])
+    if par_cle:
+        op.bulk_insert(exercices, [{"nom": nom, "cle": cle} for cle, nom in par_cle.items()])
+        identifiants = dict(connexion.execute(sa.text("SELECT cle, id FROM exercices")).all())
+        op.bulk_insert(alias_exercices, [{"cle": cle, "exercice_id": identifiants[cle]} for cle in par_cle])
+        connexion.execute(
+            sa.text("UPDATE entrainements SET exercice_id = :exercice_id WHERE exercice = :nom"),
+            [{"exercice_id": identifiants[normaliser(nom)], "nom": nom} for nom in noms],
+        )
+
+    with op.batch_alter_table('entrainements') as batch_op:
+        batch_op.alter_column('exercice_id', existing_type=sa.Integer(), nullable=False, existing_comment='Exercice du dictionnaire')
+        batch_op.create_foreign_key('fk_entrainements_exercice_id_exercices', 'exercices', ['exercice_id'], ['id'])
+        batch_op.create_index('ix_entrainements_user_exercice_date', ['user_id', 'exercice_id', 'date'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('entrainements') as batch_op:
+        batch_op.drop_index('ix_entrainements_user_exercice_date')
+        batch_op.drop_constraint('fk_entrainements_exercice_id_exercices', type_='foreignkey')
+        batch_op.drop_column('exercice_id')
+        batch_op.alter_column('exercice', existing_type=sa.String(length=100), existing_nullable=False,
+                              comment="Nom de l'exercice", existing_comment="Nom de l'exercice tel que saisi")
+    op.drop_index('ix_alias_exercices_exercice_id', table_name='alias_exercices')
+    op.drop_index('ix_alias_exercices_id', table_name='alias_exercices')
+    op.drop_table('alias_exercices')
+    op.drop_index('ix_exercices_id', table_name='exercices')
+    op.drop_table('exercices')
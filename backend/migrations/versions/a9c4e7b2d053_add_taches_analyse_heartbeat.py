@@ -0,0 +1,30 @@
+"""Add heartbeat column to taches_analyse
+
+Revision ID: a9c4e7b2d053
+Revises: f7a3d1c6e829
+Create Date: 2026-10-18 23:41:06.381924
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9c4e7b2d053'
+down_revision: Union[str, Sequence[str], None] = 'f7a3d1c6e829'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('taches_analyse') as batch_op:
+        batch_op.add_column(sa.Column('battement_le', sa.DateTime(), nullable=True, comment="Dernier signe de vie du worker qui exécute la tâche"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('taches_analyse') as batch_op:
+        batch_op.drop_column('battement_le')
@@ -0,0 +1,69 @@
+"""Add records_personnels table maintained on training writes
+
+Revision ID: b1e6f2a8c3d7
+Revises: a7d2c4e9f051
+Create Date: 2026-10-18 19:04:51.602318
+
+"""
+from itertools import groupby
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from models import Entrainement
+from records import calculer_records
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b1e6f2a8c3d7'
+down_revision: Union[str, Sequence[str], None] = 'a7d2c4e9f051'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    records_personnels = op.create_table(
+        'records_personnels',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('exercice_id', sa.Integer(), nullable=False),
+        sa.Column('type', sa.String(length=20), nullable=False, comment='charge, un_rm ou volume_seance'),
+        sa.Column('palier_reps', sa.Integer(), nullable=False, comment='Nombre de répétitions des records de charge, 0 sinon'),
+        sa.Column('valeur', sa.Float(), nullable=False, comment='Charge, 1RM estimé ou volume en kg'),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('entrainement_id', sa.Integer(), nullable=True, comment='Ligne du record (sans clé étrangère : recalculé à la suppression)'),
+        sa.Column('charge', sa.Float(), nullable=True),
+        sa.Column('reps', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['exercice_id'], ['exercices.id'], name='fk_records_personnels_exercice_id_exercices'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], name='fk_records_personnels_user_id_users'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_records_personnels_id', 'records_personnels', ['id'], unique=False)
+    op.create_index('ix_records_personnels_user_exercice_type_palier', 'records_personnels',
+                    ['user_id', 'exercice_id', 'type', 'palier_reps'], unique=True)
+
+    # Records de l'historique existant ; les écritures suivantes les tiennent à jour
+    connexion = op.get_bind()
+    lignes = connexion.execute(
+        sa.select(Entrainement.user_id, Entrainement.exercice_id, Entrainement.id, Entrainement.date,
+                  Entrainement.series, Entrainement.reps, Entrainement.charge)
+        .where(Entrainement.date.isnot(None))
+        .order_by(Entrainement.user_id, Entrainement.exercice_id, Entrainement.date, Entrainement.id)
+    ).all()
+    nouveaux = []
+    for (user_id, exercice_id), lignes_exercice in groupby(lignes, key=lambda ligne: (ligne.user_id, ligne.exercice_id)):
+        nouveaux += [
+            {"user_id": user_id, "exercice_id": exercice_id, "type": type_, "palier_reps": palier, **record}
+            for (type_, palier), record in calculer_records(list(lignes_exercice)).items()
+        ]
+    if nouveaux:
+        op.bulk_insert(records_personnels, nouveaux)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_records_personnels_user_exercice_type_palier', table_name='records_personnels')
+    op.drop_index('ix_records_personnels_id', table_name='records_personnels')
+    op.drop_table('records_personnels')
@@ -0,0 +1,42 @@
+"""Add imports_seances table for Hevy session deduplication
+
+Revision ID: b84d0f6e13a5
+Revises: 7c1e4a9b2d30
+Create Date: 2026-10-18 10:03:51.208764
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b84d0f6e13a5'
+down_revision: Union[str, Sequence[str], None] = '7c1e4a9b2d30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'imports_seances',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('empreinte', sa.String(length=64), nullable=False, comment='SHA-256 du contenu de la séance'),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('titre', sa.String(length=100), nullable=True),
+        sa.Column('nombre_series', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_imports_seances_id', 'imports_seances', ['id'], unique=False)
+    op.create_index('ix_imports_seances_user_empreinte', 'imports_seances', ['user_id', 'empreinte'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_imports_seances_user_empreinte', table_name='imports_seances')
+    op.drop_index('ix_imports_seances_id', table_name='imports_seances')
+    op.drop_table('imports_seances')
@@ -0,0 +1,59 @@
+"""Add tendances_poids table for the weight trend filter
+
+Revision ID: c4f9a3e7d215
+Revises: b1e6f2a8c3d7
+Create Date: 2026-10-18 19:41:26.870153
+
+"""
+from itertools import groupby
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from models import Poids
+from tendance import lignes_tendance
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4f9a3e7d215'
+down_revision: Union[str, Sequence[str], None] = 'b1e6f2a8c3d7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    tendances_poids = op.create_table(
+        'tendances_poids',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('valeur', sa.Float(), nullable=False, comment='Pesée du jour'),
+        sa.Column('niveau', sa.Float(), nullable=False, comment='Poids lissé en kg'),
+        sa.Column('vitesse', sa.Float(), nullable=False, comment='Évolution en kg/jour'),
+        sa.Column('var_niveau', sa.Float(), nullable=False),
+        sa.Column('covariance', sa.Float(), nullable=False),
+        sa.Column('var_vitesse', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], name='fk_tendances_poids_user_id_users'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_tendances_poids_id', 'tendances_poids', ['id'], unique=False)
+    op.create_index('ix_tendances_poids_user_date', 'tendances_poids', ['user_id', 'date'], unique=True)
+
+    # États du filtre sur l'historique existant ; les écritures suivantes les tiennent à jour
+    connexion = op.get_bind()
+    lignes = connexion.execute(
+        sa.select(Poids.user_id, Poids.date, Poids.valeur)
+        .where(Poids.date.isnot(None))
+        .order_by(Poids.user_id, Poids.date)
+    ).all()
+    for user_id, lignes_utilisateur in groupby(lignes, key=lambda ligne: ligne.user_id):
+        op.bulk_insert(tendances_poids, lignes_tendance(user_id, [(l.date, l.valeur) for l in lignes_utilisateur]))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tendances_poids_user_date', table_name='tendances_poids')
+    op.drop_index('ix_tendances_poids_id', table_name='tendances_poids')
+    op.drop_table('tendances_poids')
@@ -0,0 +1,47 @@
+"""Add analyses_cache table for content-addressed /analyse/ responses
+
+Revision ID: d3a97c25e41f
+Revises: b84d0f6e13a5
+Create Date: 2026-10-18 14:22:07.531840
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a97c25e41f'
+down_revision: Union[str, Sequence[str], None] = 'b84d0f6e13a5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'analyses_cache',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('cle', sa.String(length=64), nullable=False, comment="SHA-256 de l'utilisateur, des données, du prompt et du modèle"),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('modele', sa.String(length=50), nullable=False),
+        sa.Column('reponse', sa.Text(), nullable=False, comment="Réponse de l'endpoint /analyse/ sérialisée en JSON"),
+        sa.Column('taille', sa.Integer(), nullable=False, comment='Taille de la réponse en octets'),
+        sa.Column('cree_le', sa.DateTime(), nullable=False),
+        sa.Column('dernier_acces', sa.DateTime(), nullable=False),
+        sa.Column('nombre_acces', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], name='fk_analyses_cache_user_id_users'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_analyses_cache_id', 'analyses_cache', ['id'], unique=False)
+    op.create_index('ix_analyses_cache_cle', 'analyses_cache', ['cle'], unique=True)
+    op.create_index('ix_analyses_cache_dernier_acces', 'analyses_cache', ['dernier_acces'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_analyses_cache_dernier_acces', table_name='analyses_cache')
+    op.drop_index('ix_analyses_cache_cle', table_name='analyses_cache')
+    op.drop_index('ix_analyses_cache_id', table_name='analyses_cache')
+    op.drop_table('analyses_cache')
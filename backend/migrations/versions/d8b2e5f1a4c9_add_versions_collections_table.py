@@ -0,0 +1,42 @@
+"""Add versions_collections table for conditional list requests
+
+Revision ID: d8b2e5f1a4c9
+Revises: c4f9a3e7d215
+Create Date: 2026-10-18 20:12:48.337504
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8b2e5f1a4c9'
+down_revision: Union[str, Sequence[str], None] = 'c4f9a3e7d215'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Pas de reprise : une collection jamais écrite depuis est en version 0
+    op.create_table(
+        'versions_collections',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('collection', sa.String(length=30), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('modifie_le', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], name='fk_versions_collections_user_id_users'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_versions_collections_id', 'versions_collections', ['id'], unique=False)
+    op.create_index('ix_versions_collections_user_collection', 'versions_collections', ['user_id', 'collection'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_versions_collections_user_collection', table_name='versions_collections')
+    op.drop_index('ix_versions_collections_id', table_name='versions_collections')
+    op.drop_table('versions_collections')
@@ -0,0 +1,95 @@
+"""Add updated_at and revision columns, users.revision and suppressions for /sync
+
+Revision ID: e2a7c9d4b618
+Revises: d8b2e5f1a4c9
+Create Date: 2026-10-18 20:47:09.518266
+
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a7c9d4b618'
+down_revision: Union[str, Sequence[str], None] = 'd8b2e5f1a4c9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES_SYNCHRONISEES = ['poids', 'mensurations', 'entrainements', 'supplements', 'journal_physiologique', 'routines']
+COMMENTAIRE_UPDATED_AT = 'Dernière modification (UTC)'
+COMMENTAIRE_REVISION = "Révision de l'utilisateur à la dernière modification"
+
+
+def _remplacer_colonne_routines(type_, conversion: str, commentaire) -> None:
+    """
+    Change le type de `routines.updated_at` par une nouvelle colonne remplie explicitement.
+
+    Sous SQLite, la recopie de table d'un simple changement de type convertit
+    '2024-01-01' en l'entier 2024 (affinité numérique de DATETIME) : les valeurs
+    sont donc recopiées par `conversion`, puis l'ancienne colonne est remplacée.
+    """
+    with op.batch_alter_table('routines') as batch_op:
+        batch_op.add_column(sa.Column('updated_at_nouveau', type_, nullable=True, comment=commentaire))
+    op.get_bind().execute(sa.text(f"UPDATE routines SET updated_at_nouveau = {conversion} WHERE updated_at IS NOT NULL"))
+    with op.batch_alter_table('routines') as batch_op:
+        batch_op.drop_column('updated_at')
+    with op.batch_alter_table('routines') as batch_op:
+        batch_op.alter_column('updated_at_nouveau', new_column_name='updated_at', existing_type=type_, existing_nullable=True)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('revision', sa.Integer(), server_default='0', nullable=False, comment='Compteur des écritures, pour /sync'))
+
+    # Les lignes existantes forment la révision 1 de leur utilisateur : un premier /sync?since=0 les rend toutes
+    maintenant = datetime.now(timezone.utc).replace(tzinfo=None)
+    connexion = op.get_bind()
+    for table in TABLES_SYNCHRONISEES:
+        if table == 'routines':
+            # Date -> DateTime : minuit du jour enregistré
+            conversion = "updated_at || ' 00:00:00'" if connexion.dialect.name == 'sqlite' else "updated_at"
+            _remplacer_colonne_routines(sa.DateTime(), conversion, COMMENTAIRE_UPDATED_AT)
+        with op.batch_alter_table(table) as batch_op:
+            if table != 'routines':
+                batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True, comment=COMMENTAIRE_UPDATED_AT))
+            batch_op.add_column(sa.Column('revision', sa.Integer(), nullable=True, comment=COMMENTAIRE_REVISION))
+        connexion.execute(sa.text(f"UPDATE {table} SET revision = 1, updated_at = COALESCE(updated_at, :maintenant)"), {"maintenant": maintenant})
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=False, existing_comment=COMMENTAIRE_UPDATED_AT)
+            batch_op.create_index(f'ix_{table}_user_revision', ['user_id', 'revision'], unique=False)
+    connexion.execute(sa.text("UPDATE users SET revision = 1"))
+
+    op.create_table(
+        'suppressions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('collection', sa.String(length=30), nullable=False),
+        sa.Column('entite_id', sa.Integer(), nullable=False, comment='Identifiant de la ligne supprimée'),
+        sa.Column('revision', sa.Integer(), nullable=True),
+        sa.Column('supprime_le', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], name='fk_suppressions_user_id_users'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_suppressions_id', 'suppressions', ['id'], unique=False)
+    op.create_index('ix_suppressions_user_revision', 'suppressions', ['user_id', 'revision'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_suppressions_user_revision', table_name='suppressions')
+    op.drop_index('ix_suppressions_id', table_name='suppressions')
+    op.drop_table('suppressions')
+    for table in TABLES_SYNCHRONISEES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_index(f'ix_{table}_user_revision')
+            batch_op.drop_column('revision')
+            if table != 'routines':
+                batch_op.drop_column('updated_at')
+        if table == 'routines':
+            _remplacer_colonne_routines(sa.Date(), "date(updated_at)", None)
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('revision')
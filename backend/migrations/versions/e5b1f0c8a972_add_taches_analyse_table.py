@@ -0,0 +1,46 @@
+"""Add taches_analyse table for background AI analysis jobs
+
+Revision ID: e5b1f0c8a972
+Revises: d3a97c25e41f
+Create Date: 2026-10-18 16:05:44.918203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b1f0c8a972'
+down_revision: Union[str, Sequence[str], None] = 'd3a97c25e41f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'taches_analyse',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('statut', sa.String(length=20), nullable=False, comment='en_attente, en_cours, terminee ou echec'),
+        sa.Column('type_analyse', sa.String(length=20), nullable=False),
+        sa.Column('user_prompt', sa.Text(), nullable=False),
+        sa.Column('resultat', sa.Text(), nullable=True, comment="Réponse de l'analyse sérialisée en JSON"),
+        sa.Column('erreur', sa.Text(), nullable=True),
+        sa.Column('cree_le', sa.DateTime(), nullable=False),
+        sa.Column('demarre_le', sa.DateTime(), nullable=True),
+        sa.Column('termine_le', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], name='fk_taches_analyse_user_id_users'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_taches_analyse_user_id', 'taches_analyse', ['user_id'], unique=False)
+    op.create_index('ix_taches_analyse_statut_cree_le', 'taches_analyse', ['statut', 'cree_le'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_taches_analyse_statut_cree_le', table_name='taches_analyse')
+    op.drop_index('ix_taches_analyse_user_id', table_name='taches_analyse')
+    op.drop_table('taches_analyse')
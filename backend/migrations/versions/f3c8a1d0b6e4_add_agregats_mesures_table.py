@@ -0,0 +1,69 @@
+"""Add agregats_mesures rollup table for weight and measurement statistics
+
+Revision ID: f3c8a1d0b6e4
+Revises: e5b1f0c8a972
+Create Date: 2026-10-18 17:12:03.481920
+
+"""
+from itertools import groupby
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from models import Mensuration, Poids
+from statistiques import METRIQUES_PAR_MODELE, calculer_agregats, points_des_lignes
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3c8a1d0b6e4'
+down_revision: Union[str, Sequence[str], None] = 'e5b1f0c8a972'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    agregats_mesures = op.create_table(
+        'agregats_mesures',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('metrique', sa.String(length=30), nullable=False, comment='poids ou colonne de mensuration'),
+        sa.Column('granularite', sa.String(length=10), nullable=False, comment='jour, semaine (commençant le lundi) ou mois'),
+        sa.Column('debut', sa.Date(), nullable=False),
+        sa.Column('nombre', sa.Integer(), nullable=False),
+        sa.Column('somme', sa.Float(), nullable=False),
+        sa.Column('minimum', sa.Float(), nullable=False),
+        sa.Column('maximum', sa.Float(), nullable=False),
+        sa.Column('premiere_date', sa.Date(), nullable=False),
+        sa.Column('premiere_valeur', sa.Float(), nullable=False),
+        sa.Column('derniere_date', sa.Date(), nullable=False),
+        sa.Column('derniere_valeur', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], name='fk_agregats_mesures_user_id_users'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_agregats_mesures_id', 'agregats_mesures', ['id'], unique=False)
+    op.create_index('ix_agregats_mesures_user_metrique_granularite_debut', 'agregats_mesures',
+                    ['user_id', 'metrique', 'granularite', 'debut'], unique=True)
+
+    # Agrégats de l'historique existant ; les écritures suivantes les tiennent à jour
+    connexion = op.get_bind()
+    for modele in (Poids, Mensuration):
+        colonnes = [getattr(modele, colonne) for colonne in METRIQUES_PAR_MODELE[modele].values()]
+        lignes = connexion.execute(
+            sa.select(modele.user_id, modele.date, *colonnes).order_by(modele.user_id, modele.date)
+        ).all()
+        for user_id, lignes_utilisateur in groupby(lignes, key=lambda ligne: ligne.user_id):
+            agregats = calculer_agregats(points_des_lignes(modele, lignes_utilisateur))
+            if agregats:
+                op.bulk_insert(agregats_mesures, [
+                    {"user_id": user_id, "metrique": metrique, "granularite": granularite, "debut": debut, **valeurs}
+                    for (metrique, granularite, debut), valeurs in agregats.items()
+                ])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_agregats_mesures_user_metrique_granularite_debut', table_name='agregats_mesures')
+    op.drop_index('ix_agregats_mesures_id', table_name='agregats_mesures')
+    op.drop_table('agregats_mesures')
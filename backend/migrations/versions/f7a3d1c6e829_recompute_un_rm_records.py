@@ -0,0 +1,50 @@
+"""Recompute estimated 1RM records with the single-rep rule
+
+Revision ID: f7a3d1c6e829
+Revises: e2a7c9d4b618
+Create Date: 2026-10-18 23:12:37.204518
+
+"""
+from itertools import groupby
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from models import Entrainement, RecordPersonnel
+from records import UN_RM, calculer_records
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7a3d1c6e829'
+down_revision: Union[str, Sequence[str], None] = 'e2a7c9d4b618'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Une série d'une répétition vaut désormais sa charge (et non Epley) : les records de 1RM sont recalculés
+    connexion = op.get_bind()
+    connexion.execute(sa.delete(RecordPersonnel.__table__).where(RecordPersonnel.type == UN_RM))
+    lignes = connexion.execute(
+        sa.select(Entrainement.user_id, Entrainement.exercice_id, Entrainement.id, Entrainement.date,
+                  Entrainement.series, Entrainement.reps, Entrainement.charge)
+        .where(Entrainement.date.isnot(None))
+        .order_by(Entrainement.user_id, Entrainement.exercice_id, Entrainement.date, Entrainement.id)
+    ).all()
+    nouveaux = []
+    for (user_id, exercice_id), lignes_exercice in groupby(lignes, key=lambda ligne: (ligne.user_id, ligne.exercice_id)):
+        nouveaux += [
+            {"user_id": user_id, "exercice_id": exercice_id, "type": type_, "palier_reps": palier, **record}
+            for (type_, palier), record in calculer_records(list(lignes_exercice)).items()
+            if type_ == UN_RM
+        ]
+    if nouveaux:
+        op.bulk_insert(RecordPersonnel.__table__, nouveaux)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Les records recalculés restent valides
+    pass
@@ -1,29 +1,57 @@
-from sqlalchemy import create_engine, Column, Integer, Float, String, Date, Text, ForeignKey
+from datetime import datetime, timezone
+
+from sqlalchemy import MetaData, null, Column, Integer, Float, String, Date, DateTime, Text, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import relationship
+
+# Moteurs et sessions : voir database.py
+# Clés étrangères nommées comme dans les migrations, pour que create_all et Alembic produisent le même schéma
+Base = declarative_base(metadata=MetaData(naming_convention={"ix": "ix_%(column_0_label)s", "fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}))
+
+
+def _maintenant() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class Synchronisee:
+    """
+    Colonnes des collections synchronisées par `/sync`.
+
+    Toute écriture remet `revision` à NULL ; `versions.incrementer` y inscrit la
+    révision de l'utilisateur avant le commit.
+    """
+    updated_at = Column(DateTime, nullable=False, default=_maintenant, onupdate=_maintenant, comment="Dernière modification (UTC)")
+    revision = Column(Integer, nullable=True, onupdate=null(), comment="Révision de l'utilisateur à la dernière modification")
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./transformation.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
 
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String(50), unique=True, nullable=False, index=True)
     hashed_password = Column(String(255), nullable=False)
+    revision = Column(Integer, nullable=False, default=0, server_default="0", comment="Compteur des écritures, pour /sync")
 
 
-class Poids(Base):
+class Poids(Synchronisee, Base):
     __tablename__ = "poids"
+    __table_args__ = (
+        Index("ix_poids_user_date", "user_id", "date", unique=True),
+        Index("ix_poids_user_revision", "user_id", "revision"),
+    )
     id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     valeur = Column(Float, nullable=False)
-    date = Column(Date, unique=True, index=True)
+    date = Column(Date)
 
-class Mensuration(Base):
+class Mensuration(Synchronisee, Base):
     __tablename__ = "mensurations"
+    __table_args__ = (
+        Index("ix_mensurations_user_date", "user_id", "date", unique=True),
+        Index("ix_mensurations_user_revision", "user_id", "revision"),
+    )
     id = Column(Integer, primary_key=True, index=True)
-    date = Column(Date, unique=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    date = Column(Date)
     
     # Mensurations principales
     taille = Column(Float, nullable=True, comment="Tour de taille en cm")
@@ -45,20 +73,55 @@ class Mensuration(Base):
     mollet_gauche = Column(Float, nullable=True, comment="Tour de mollet gauche en cm")
     mollet_droit = Column(Float, nullable=True, comment="Tour de mollet droit en cm")
 
-class Entrainement(Base):
+# Colonnes de mesure de Mensuration, dans l'ordre d'affichage et d'export
+COLONNES_MENSURATION = [
+    'taille', 'cou', 'epaules', 'poitrine', 'nombril', 'hanches',
+    'biceps_gauche', 'biceps_droit', 'cuisse_gauche', 'cuisse_droite',
+    'mollet_gauche', 'mollet_droit',
+]
+
+class Exercice(Base):
+    """Exercice du dictionnaire : nom canonique, retrouvé par la clé normalisée de ses alias."""
+    __tablename__ = "exercices"
+    id = Column(Integer, primary_key=True, index=True)
+    nom = Column(String(100), nullable=False, comment="Nom canonique (première orthographe rencontrée)")
+    cle = Column(String(100), nullable=False, unique=True, comment="Nom normalisé : minuscules, sans accents ni ponctuation")
+
+
+class AliasExercice(Base):
+    """Clé normalisée d'une orthographe d'exercice, vers l'exercice qu'elle désigne."""
+    __tablename__ = "alias_exercices"
+    id = Column(Integer, primary_key=True, index=True)
+    cle = Column(String(100), nullable=False, unique=True)
+    exercice_id = Column(Integer, ForeignKey("exercices.id"), nullable=False, index=True)
+
+
+class Entrainement(Synchronisee, Base):
     __tablename__ = "entrainements"
+    __table_args__ = (
+        Index("ix_entrainements_user_date", "user_id", "date"),
+        Index("ix_entrainements_user_exercice_date", "user_id", "exercice_id", "date"),
+        Index("ix_entrainements_user_revision", "user_id", "revision"),
+    )
     id = Column(Integer, primary_key=True, index=True)
-    date = Column(Date, index=True)
-    exercice = Column(String(100), nullable=False, comment="Nom de l'exercice")
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    date = Column(Date)
+    exercice = Column(String(100), nullable=False, comment="Nom de l'exercice tel que saisi")
+    exercice_id = Column(Integer, ForeignKey("exercices.id"), nullable=False, comment="Exercice du dictionnaire")
     series = Column(Integer, nullable=False, comment="Nombre de séries")
     reps = Column(Integer, nullable=False, comment="Nombre de répétitions")
     charge = Column(Float, nullable=True, comment="Charge en kg")
     rpe = Column(Float, nullable=True, comment="RPE (Rate of Perceived Exertion) de 1 à 10")
     notes = Column(Text, nullable=True, comment="Notes supplémentaires")
 
-class Supplement(Base):
+class Supplement(Synchronisee, Base):
     __tablename__ = "supplements"
+    __table_args__ = (
+        Index("ix_supplements_user_date_debut", "user_id", "date_debut"),
+        Index("ix_supplements_user_revision", "user_id", "revision"),
+    )
     id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     nom = Column(String(100), nullable=False, comment="Nom du supplément")
     dose = Column(String(50), nullable=False, comment="Dose (ex: 5g, 200mg)")
     frequence = Column(String(50), nullable=False, comment="Fréquence (ex: 2x/jour, 1x/semaine)")
@@ -66,22 +129,144 @@ class Supplement(Base):
     date_fin = Column(Date, nullable=True, comment="Date de fin de prise")
     notes = Column(Text, nullable=True, comment="Notes supplémentaires")
 
-class Routine(Base):
+class Routine(Synchronisee, Base):
     __tablename__ = "routines"
+    __table_args__ = (
+        Index("ix_routines_user_nom", "user_id", "nom"),
+        Index("ix_routines_user_revision", "user_id", "revision"),
+    )
     id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     nom = Column(String(10))
     exercices = Column(Text)
-    updated_at = Column(Date)
 
-class JournalPhysiologique(Base):
+class JournalPhysiologique(Synchronisee, Base):
     __tablename__ = "journal_physiologique"
+    __table_args__ = (
+        Index("ix_journal_physiologique_user_date", "user_id", "date"),
+        Index("ix_journal_physiologique_user_revision", "user_id", "revision"),
+    )
     id = Column(Integer, primary_key=True, index=True)
-    date = Column(Date, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    date = Column(Date)
     texte = Column(Text, nullable=False, comment="Texte libre pour le journal")
     humeur = Column(Integer, nullable=True, comment="Niveau d'humeur de 1 à 10")
     energie = Column(Integer, nullable=True, comment="Niveau d'énergie de 1 à 10")
     sommeil_qualite = Column(Integer, nullable=True, comment="Qualité du sommeil de 1 à 10")
     sommeil_duree = Column(Float, nullable=True, comment="Durée du sommeil en heures")
 
-# Créer toutes les tables
-Base.metadata.create_all(bind=engine)
+
+class ImportSeance(Base):
+    """Séance importée depuis une application externe (Hevy), pour ne jamais l'importer deux fois."""
+    __tablename__ = "imports_seances"
+    __table_args__ = (Index("ix_imports_seances_user_empreinte", "user_id", "empreinte", unique=True),)
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    empreinte = Column(String(64), nullable=False, comment="SHA-256 du contenu de la séance")
+    date = Column(Date, nullable=False)
+    titre = Column(String(100), nullable=True)
+    nombre_series = Column(Integer, nullable=False)
+
+
+class AnalyseEnCache(Base):
+    """Réponse d'analyse IA déjà calculée, retrouvée par l'empreinte de ses entrées."""
+    __tablename__ = "analyses_cache"
+    id = Column(Integer, primary_key=True, index=True)
+    cle = Column(String(64), nullable=False, unique=True, index=True, comment="SHA-256 de l'utilisateur, des données, du prompt et du modèle")
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    modele = Column(String(50), nullable=False)
+    reponse = Column(Text, nullable=False, comment="Réponse de l'endpoint /analyse/ sérialisée en JSON")
+    taille = Column(Integer, nullable=False, comment="Taille de la réponse en octets")
+    cree_le = Column(DateTime, nullable=False)
+    dernier_acces = Column(DateTime, nullable=False, index=True)
+    nombre_acces = Column(Integer, nullable=False, default=0)
+
+
+class TacheAnalyse(Base):
+    """Analyse IA soumise en tâche de fond : statut et résultat persistés, consultables après coup."""
+    __tablename__ = "taches_analyse"
+    __table_args__ = (Index("ix_taches_analyse_statut_cree_le", "statut", "cree_le"),)
+    id = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    statut = Column(String(20), nullable=False, comment="en_attente, en_cours, terminee ou echec")
+    type_analyse = Column(String(20), nullable=False)
+    user_prompt = Column(Text, nullable=False)
+    resultat = Column(Text, nullable=True, comment="Réponse de l'analyse sérialisée en JSON")
+    erreur = Column(Text, nullable=True)
+    cree_le = Column(DateTime, nullable=False)
+    demarre_le = Column(DateTime, nullable=True)
+    termine_le = Column(DateTime, nullable=True)
+    battement_le = Column(DateTime, nullable=True, comment="Dernier signe de vie du worker qui exécute la tâche")
+
+
+class AgregatMesure(Base):
+    """Statistiques d'une métrique (poids ou mensuration) sur un jour, une semaine ou un mois, tenues à jour à l'écriture."""
+    __tablename__ = "agregats_mesures"
+    __table_args__ = (Index("ix_agregats_mesures_user_metrique_granularite_debut", "user_id", "metrique", "granularite", "debut", unique=True),)
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    metrique = Column(String(30), nullable=False, comment="poids ou colonne de mensuration")
+    granularite = Column(String(10), nullable=False, comment="jour, semaine (commençant le lundi) ou mois")
+    debut = Column(Date, nullable=False)
+    nombre = Column(Integer, nullable=False)
+    somme = Column(Float, nullable=False)
+    minimum = Column(Float, nullable=False)
+    maximum = Column(Float, nullable=False)
+    premiere_date = Column(Date, nullable=False)
+    premiere_valeur = Column(Float, nullable=False)
+    derniere_date = Column(Date, nullable=False)
+    derniere_valeur = Column(Float, nullable=False)
+
+
+class RecordPersonnel(Base):
+    """Record personnel d'un exercice (charge par nombre de répétitions, 1RM estimé ou volume de séance), tenu à jour à l'écriture."""
+    __tablename__ = "records_personnels"
+    __table_args__ = (Index("ix_records_personnels_user_exercice_type_palier", "user_id", "exercice_id", "type", "palier_reps", unique=True),)
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    exercice_id = Column(Integer, ForeignKey("exercices.id"), nullable=False)
+    type = Column(String(20), nullable=False, comment="charge, un_rm ou volume_seance")
+    palier_reps = Column(Integer, nullable=False, comment="Nombre de répétitions des records de charge, 0 sinon")
+    valeur = Column(Float, nullable=False, comment="Charge, 1RM estimé ou volume en kg")
+    date = Column(Date, nullable=False)
+    entrainement_id = Column(Integer, nullable=True, comment="Ligne du record (sans clé étrangère : recalculé à la suppression)")
+    charge = Column(Float, nullable=True)
+    reps = Column(Integer, nullable=True)
+
+
+class TendancePoids(Base):
+    """État du filtre de tendance du poids après une pesée, recalculé à partir de la date des écritures."""
+    __tablename__ = "tendances_poids"
+    __table_args__ = (Index("ix_tendances_poids_user_date", "user_id", "date", unique=True),)
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    date = Column(Date, nullable=False)
+    valeur = Column(Float, nullable=False, comment="Pesée du jour")
+    niveau = Column(Float, nullable=False, comment="Poids lissé en kg")
+    vitesse = Column(Float, nullable=False, comment="Évolution en kg/jour")
+    var_niveau = Column(Float, nullable=False)
+    covariance = Column(Float, nullable=False)
+    var_vitesse = Column(Float, nullable=False)
+
+
+class VersionCollection(Base):
+    """Version d'une collection d'un utilisateur, incrémentée à chaque écriture (ETag des routes de liste)."""
+    __tablename__ = "versions_collections"
+    __table_args__ = (Index("ix_versions_collections_user_collection", "user_id", "collection", unique=True),)
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    collection = Column(String(30), nullable=False)
+    version = Column(Integer, nullable=False)
+    modifie_le = Column(DateTime, nullable=False)
+
+
+class Suppression(Base):
+    """Trace d'une ligne supprimée d'une collection synchronisée, pour que `/sync` la signale."""
+    __tablename__ = "suppressions"
+    __table_args__ = (Index("ix_suppressions_user_revision", "user_id", "revision"),)
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    collection = Column(String(30), nullable=False)
+    entite_id = Column(Integer, nullable=False, comment="Identifiant de la ligne supprimée")
+    revision = Column(Integer, nullable=True)
+    supprime_le = Column(DateTime, nullable=False, default=_maintenant)
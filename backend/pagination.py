@@ -0,0 +1,95 @@
+"""
+Pagination par curseur (keyset) pour les endpoints de liste.
+
+Les pages sont ordonnées sur (date, id) : chaque requête reprend juste après
+la dernière ligne renvoyée au lieu d'utiliser un OFFSET, ce qui permet à la
+base de partir directement de l'index sur la date. Les lignes sans date
+viennent en dernier, par identifiant, sur tous les dialectes ; le curseur
+encode alors une date nulle.
+"""
+
+import base64
+import json
+from datetime import date
+from typing import Optional
+
+from fastapi import HTTPException, Query
+from sqlalchemy import and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+TAILLE_PAGE_DEFAUT = 100
+TAILLE_PAGE_MAX = 500
+
+
+class ParametresPage:
+    """Paramètres de requête communs aux endpoints de liste."""
+
+    def __init__(
+        self,
+        date_debut: Optional[date] = Query(None, alias="from", description="Date de début incluse (YYYY-MM-DD)"),
+        date_fin: Optional[date] = Query(None, alias="to", description="Date de fin incluse (YYYY-MM-DD)"),
+        cursor: Optional[str] = Query(None, description="Curseur renvoyé par la page précédente"),
+        limit: int = Query(TAILLE_PAGE_DEFAUT, ge=1, le=TAILLE_PAGE_MAX, description="Nombre maximum d'éléments"),
+    ):
+        self.date_debut = date_debut
+        self.date_fin = date_fin
+        self.curseur = cursor
+        self.limite = limit
+
+
+def encoder_curseur(date_valeur: Optional[date], identifiant: int) -> str:
+    brut = json.dumps([date_valeur.isoformat() if date_valeur else None, identifiant])
+    return base64.urlsafe_b64encode(brut.encode()).decode().rstrip("=")
+
+
+def decoder_curseur(curseur: str):
+    try:
+        rembourrage = "=" * (-len(curseur) % 4)
+        date_iso, identifiant = json.loads(base64.urlsafe_b64decode(curseur + rembourrage))
+        return (date.fromisoformat(date_iso) if date_iso else None), int(identifiant)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+
+
+async def paginer(db: AsyncSession, stmt, page: ParametresPage, colonne_date, colonne_id, trier_par_date: bool = True):
+    """
+    Applique les filtres de dates, le curseur et la limite à un `select` puis l'exécute.
+
+    `colonne_date` sert au filtre from/to ; si `trier_par_date` est faux (table
+    sans date de référence fiable), seul l'identifiant sert de clé de pagination.
+
+    Retourne (éléments, curseur_suivant) — le curseur vaut None sur la dernière page.
+    """
+    if page.date_debut is not None:
+        stmt = stmt.where(colonne_date >= page.date_debut)
+    if page.date_fin is not None:
+        stmt = stmt.where(colonne_date <= page.date_fin)
+
+    if page.curseur:
+        date_curseur, id_curseur = decoder_curseur(page.curseur)
+        if trier_par_date and date_curseur is None:
+            # Déjà parmi les lignes sans date
+            stmt = stmt.where(colonne_date.is_(None), colonne_id > id_curseur)
+        elif trier_par_date:
+            # Une comparaison avec NULL n'est jamais vraie : les lignes sans date sont reprises explicitement
+            stmt = stmt.where(or_(
+                colonne_date > date_curseur,
+                and_(colonne_date == date_curseur, colonne_id > id_curseur),
+                colonne_date.is_(None),
+            ))
+        else:
+            stmt = stmt.where(colonne_id > id_curseur)
+
+    ordre = (colonne_date.asc().nulls_last(), colonne_id) if trier_par_date else (colonne_id,)
+    # Une ligne de plus que demandé pour savoir s'il reste une page
+    elements = (await db.scalars(stmt.order_by(*ordre).limit(page.limite + 1))).all()
+
+    curseur_suivant = None
+    if len(elements) > page.limite:
+        elements = elements[:page.limite]
+        dernier = elements[-1]
+        curseur_suivant = encoder_curseur(
+            getattr(dernier, colonne_date.key) if trier_par_date else None,
+            getattr(dernier, colonne_id.key),
+        )
+    return elements, curseur_suivant
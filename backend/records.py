@@ -0,0 +1,157 @@
+"""
+Records personnels par exercice, tenus à jour à l'écriture.
+
+Trois sortes de records : meilleure charge pour chaque nombre de répétitions,
+meilleur 1RM estimé (Epley) et meilleur volume de séance (séries × reps ×
+charge d'un exercice sur une journée). `/records/` les lit directement dans
+`records_personnels`, une ligne par record, sans parcourir l'historique.
+
+Un ajout ne peut qu'améliorer un record : il est comparé aux records existants
+de l'exercice. Une modification ou une suppression peut en faire tomber un :
+les records des exercices concernés sont alors recalculés depuis leurs lignes
+(lecture de l'index utilisateur, exercice, date), ce qui retrouve le record
+précédent. Un record à égalité reste attribué à la première fois où il a été atteint.
+"""
+
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from exercices import noms_saisis
+from models import Entrainement, RecordPersonnel
+from un_rm import estimer as estimer_un_rm
+
+CHARGE = "charge"
+UN_RM = "un_rm"
+VOLUME_SEANCE = "volume_seance"
+
+Cle = Tuple[str, int]  # (type, palier de répétitions ; 0 hors records de charge)
+
+CHAMPS_RECORD = ("valeur", "date", "entrainement_id", "charge", "reps")
+
+
+def _candidats(lignes) -> Dict[Cle, dict]:
+    """Meilleurs records de charge et de 1RM parmi des lignes triées par date (la première l'emporte à égalité)."""
+    meilleurs = {}
+    for ligne in lignes:
+        if not ligne.charge:
+            continue
+        for cle, valeur in (((CHARGE, ligne.reps), ligne.charge), ((UN_RM, 0), estimer_un_rm(ligne.charge, ligne.reps))):
+            if cle not in meilleurs or valeur > meilleurs[cle]["valeur"]:
+                meilleurs[cle] = {
+                    "valeur": valeur, "date": ligne.date, "entrainement_id": ligne.id,
+                    "charge": ligne.charge, "reps": ligne.reps,
+                }
+    return meilleurs
+
+
+def calculer_records(lignes) -> Dict[Cle, dict]:
+    """Tous les records d'un exercice depuis ses lignes triées par date."""
+    records = _candidats(lignes)
+    seances = defaultdict(float)
+    for ligne in lignes:
+        seances[ligne.date] += ligne.series * ligne.reps * (ligne.charge or 0)
+    if seances:
+        jour, volume = max(seances.items(), key=lambda item: (item[1], -item[0].toordinal()))
+        if volume > 0:
+            records[(VOLUME_SEANCE, 0)] = {"valeur": volume, "date": jour, "entrainement_id": None, "charge": None, "reps": None}
+    return records
+
+
+async def recalculer(db: AsyncSession, user_id: int, exercice_ids: Iterable[int]) -> None:
+    """Recalcule tous les records des exercices donnés depuis leurs lignes d'entraînement."""
+    exercice_ids = set(exercice_ids)
+    if not exercice_ids:
+        return
+    await db.flush()
+    lignes = (await db.execute(
+        select(Entrainement.id, Entrainement.exercice_id, Entrainement.date, Entrainement.series,
+               Entrainement.reps, Entrainement.charge)
+        .where(Entrainement.user_id == user_id, Entrainement.exercice_id.in_(exercice_ids), Entrainement.date.isnot(None))
+        .order_by(Entrainement.date, Entrainement.id)
+    )).all()
+    par_exercice = defaultdict(list)
+    for ligne in lignes:
+        par_exercice[ligne.exercice_id].append(ligne)
+
+    await db.execute(delete(RecordPersonnel).where(
+        RecordPersonnel.user_id == user_id, RecordPersonnel.exercice_id.in_(exercice_ids),
+    ))
+    nouveaux = []
+    for exercice_id, lignes_exercice in par_exercice.items():
+        nouveaux += [
+            {"user_id": user_id, "exercice_id": exercice_id, "type": type_, "palier_reps": palier, **record}
+            for (type_, palier), record in calculer_records(lignes_exercice).items()
+        ]
+    if nouveaux:
+        await db.execute(insert(RecordPersonnel), nouveaux)
+
+
+async def enregistrer_ajout(db: AsyncSession, entrainement: Entrainement) -> List[dict]:
+    """
+    Met à jour les records après l'ajout d'une ligne ; renvoie les records battus.
+
+    Seuls les records de l'exercice et le volume de la séance du jour sont relus.
+    """
+    await db.flush()
+    existants = {
+        (r.type, r.palier_reps): r
+        for r in await db.scalars(select(RecordPersonnel).where(
+            RecordPersonnel.user_id == entrainement.user_id, RecordPersonnel.exercice_id == entrainement.exercice_id,
+        ))
+    }
+    ameliores = _candidats([entrainement])
+    volume = await db.scalar(
+        select(func.sum(Entrainement.series * Entrainement.reps * func.coalesce(Entrainement.charge, 0))).where(
+            Entrainement.user_id == entrainement.user_id,
+            Entrainement.exercice_id == entrainement.exercice_id,
+            Entrainement.date == entrainement.date,
+        )
+    )
+    if volume:
+        ameliores[(VOLUME_SEANCE, 0)] = {"valeur": float(volume), "date": entrainement.date, "entrainement_id": None, "charge": None, "reps": None}
+
+    battus = []
+    for (type_, palier), record in ameliores.items():
+        existant = existants.get((type_, palier))
+        if existant is not None and record["valeur"] <= existant.valeur:
+            continue
+        battus.append({**_decrire(type_, record), "precedent": existant.valeur if existant else None})
+        if existant is None:
+            db.add(RecordPersonnel(user_id=entrainement.user_id, exercice_id=entrainement.exercice_id, type=type_, palier_reps=palier, **record))
+        else:
+            for champ, valeur in record.items():
+                setattr(existant, champ, valeur)
+    return battus
+
+
+def _decrire(type_: str, record: dict) -> dict:
+    description = {"type": type_, "valeur": round(record["valeur"], 1), "date": record["date"].isoformat()}
+    if type_ != VOLUME_SEANCE:
+        description.update({"charge": record["charge"], "reps": record["reps"], "entrainement_id": record["entrainement_id"]})
+    return description
+
+
+async def lire_records(db: AsyncSession, user_id: int, exercice_id: Optional[int] = None) -> List[dict]:
+    """Records de l'utilisateur regroupés par exercice (un seul exercice si `exercice_id`)."""
+    noms = noms_saisis(user_id)
+    stmt = (
+        select(RecordPersonnel, noms.c.nom)
+        .join(noms, noms.c.exercice_id == RecordPersonnel.exercice_id)
+        .where(RecordPersonnel.user_id == user_id)
+    )
+    if exercice_id is not None:
+        stmt = stmt.where(RecordPersonnel.exercice_id == exercice_id)
+    par_exercice = {}
+    for record, nom in await db.execute(stmt.order_by(noms.c.nom, RecordPersonnel.type, RecordPersonnel.palier_reps)):
+        resume = par_exercice.setdefault(record.exercice_id, {
+            "exercice_id": record.exercice_id, "exercice": nom, UN_RM: None, VOLUME_SEANCE: None, "charge_par_reps": [],
+        })
+        description = _decrire(record.type, {champ: getattr(record, champ) for champ in CHAMPS_RECORD})
+        if record.type == CHARGE:
+            resume["charge_par_reps"].append(description)
+        else:
+            resume[record.type] = description
+    return list(par_exercice.values())
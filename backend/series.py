@@ -0,0 +1,102 @@
+"""
+Sous-échantillonnage des séries temporelles (poids, mensurations) pour les graphiques.
+
+Les deux méthodes parcourent les points une seule fois et renvoient au plus
+`nombre_points` éléments, quelle que soit la longueur de l'historique :
+- LTTB (Largest-Triangle-Three-Buckets) conserve la forme visuelle de la courbe ;
+- l'agrégation par paquets renvoie min / moyenne / max de chaque intervalle.
+"""
+
+import calendar
+from datetime import date
+from typing import List, Optional, Tuple
+
+from models import COLONNES_MENSURATION
+
+METRIQUES = ["poids"] + COLONNES_MENSURATION
+
+# Périodes proposées par le sélecteur des graphiques (en mois, None = tout l'historique)
+PERIODES = {"1mois": 1, "3mois": 3, "6mois": 6, "1an": 12, "tout": None}
+
+Point = Tuple[date, float]
+
+
+def debut_periode(periode: str, aujourd_hui: Optional[date] = None) -> Optional[date]:
+    """Date de début d'une période, ou None pour tout l'historique."""
+    mois = PERIODES[periode]
+    if mois is None:
+        return None
+    aujourd_hui = aujourd_hui or date.today()
+    annee, indice_mois = divmod(aujourd_hui.year * 12 + aujourd_hui.month - 1 - mois, 12)
+    # Ramener au dernier jour du mois si besoin (ex: 31 mars - 1 mois -> 29 février)
+    jour = min(aujourd_hui.day, calendar.monthrange(annee, indice_mois + 1)[1])
+    return date(annee, indice_mois + 1, jour)
+
+
+def lttb(points: List[Point], nombre_points: int) -> List[Point]:
+    """Largest-Triangle-Three-Buckets sur des points triés par date."""
+    n = len(points)
+    if nombre_points >= n or nombre_points < 3:
+        return list(points)
+
+    xs = [p[0].toordinal() for p in points]
+    ys = [p[1] for p in points]
+    taille_paquet = (n - 2) / (nombre_points - 2)
+
+    resultat = [points[0]]
+    a = 0
+    for i in range(nombre_points - 2):
+        # Moyenne du paquet suivant : sommet « cible » du triangle
+        debut_suivant = int((i + 1) * taille_paquet) + 1
+        fin_suivant = min(int((i + 2) * taille_paquet) + 1, n)
+        longueur = fin_suivant - debut_suivant
+        moyenne_x = sum(xs[debut_suivant:fin_suivant]) / longueur
+        moyenne_y = sum(ys[debut_suivant:fin_suivant]) / longueur
+
+        # Point du paquet courant formant le plus grand triangle avec a et la moyenne
+        debut = int(i * taille_paquet) + 1
+        fin = int((i + 1) * taille_paquet) + 1
+        meilleure_aire = -1.0
+        choisi = debut
+        for j in range(debut, fin):
+            aire = abs((xs[a] - moyenne_x) * (ys[j] - ys[a]) - (xs[a] - xs[j]) * (moyenne_y - ys[a]))
+            if aire > meilleure_aire:
+                meilleure_aire = aire
+                choisi = j
+        resultat.append(points[choisi])
+        a = choisi
+
+    resultat.append(points[-1])
+    return resultat
+
+
+def agreger_par_paquets(points: List[Point], nombre_points: int) -> List[dict]:
+    """Découpe la période couverte en intervalles de temps égaux et résume chacun."""
+    if not points:
+        return []
+    premier = points[0][0].toordinal()
+    etendue = points[-1][0].toordinal() - premier + 1
+    largeur = max(1, -(-etendue // nombre_points))  # division arrondie au supérieur
+
+    paquets = []
+    courant = None
+    for jour, valeur in points:
+        indice = (jour.toordinal() - premier) // largeur
+        if courant is None or courant["indice"] != indice:
+            courant = {"indice": indice, "date": jour, "min": valeur, "max": valeur, "somme": 0.0, "nombre": 0}
+            paquets.append(courant)
+        courant["min"] = min(courant["min"], valeur)
+        courant["max"] = max(courant["max"], valeur)
+        courant["somme"] += valeur
+        courant["nombre"] += 1
+
+    return [
+        {
+            "date": p["date"].isoformat(),
+            "min": p["min"],
+            "moyenne": round(p["somme"] / p["nombre"], 2),
+            "max": p["max"],
+            "nombre": p["nombre"],
+        }
+        for p in paquets
+    ]
@@ -0,0 +1,177 @@
+"""
+Agrégats journaliers, hebdomadaires et mensuels des poids et mensurations.
+
+Chaque écriture (ajout, modification, suppression, import en masse) recalcule
+dans la même transaction les seuls paquets qui contiennent les dates touchées :
+au plus un mois de lignes relues, quelle que soit la longueur de l'historique.
+Les statistiques de `/stats/` se lisent ensuite dans `agregats_mesures`, en
+combinant quelques dizaines de paquets au lieu de parcourir toutes les mesures.
+
+Les paquets sont recalculés plutôt que corrigés par différence : une
+suppression ou une modification peut changer le minimum, le maximum ou la
+première valeur, que l'on ne sait pas défaire sans relire le paquet.
+"""
+
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import AgregatMesure, Mensuration, Poids, COLONNES_MENSURATION
+
+GRANULARITES = ["jour", "semaine", "mois"]
+
+# Métriques de chaque table : nom de la métrique -> colonne
+METRIQUES_PAR_MODELE = {
+    Poids: {"poids": "valeur"},
+    Mensuration: {colonne: colonne for colonne in COLONNES_MENSURATION},
+}
+
+Cle = Tuple[str, str, date]  # (métrique, granularité, début du paquet)
+
+
+def debut_paquet(jour: date, granularite: str) -> date:
+    if granularite == "jour":
+        return jour
+    if granularite == "semaine":
+        return jour - timedelta(days=jour.weekday())
+    return jour.replace(day=1)
+
+
+def fin_paquet(debut: date, granularite: str) -> date:
+    """Premier jour du paquet suivant."""
+    if granularite == "jour":
+        return debut + timedelta(days=1)
+    if granularite == "semaine":
+        return debut + timedelta(days=7)
+    return (debut.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def calculer_agregats(points: Iterable[Tuple[str, date, float]]) -> Dict[Cle, dict]:
+    """Agrège des points (métrique, date, valeur) triés par date, pour les trois granularités."""
+    agregats = {}
+    for metrique, jour, valeur in points:
+        for granularite in GRANULARITES:
+            cle = (metrique, granularite, debut_paquet(jour, granularite))
+            agregat = agregats.get(cle)
+            if agregat is None:
+                agregats[cle] = {
+                    "nombre": 1, "somme": valeur, "minimum": valeur, "maximum": valeur,
+                    "premiere_date": jour, "premiere_valeur": valeur,
+                    "derniere_date": jour, "derniere_valeur": valeur,
+                }
+            else:
+                agregat["nombre"] += 1
+                agregat["somme"] += valeur
+                agregat["minimum"] = min(agregat["minimum"], valeur)
+                agregat["maximum"] = max(agregat["maximum"], valeur)
+                agregat["derniere_date"] = jour
+                agregat["derniere_valeur"] = valeur
+    return agregats
+
+
+def points_des_lignes(modele, lignes) -> List[Tuple[str, date, float]]:
+    """Points (métrique, date, valeur) des lignes d'une table, valeurs absentes ignorées."""
+    return [
+        (metrique, ligne.date, getattr(ligne, colonne))
+        for ligne in lignes
+        for metrique, colonne in METRIQUES_PAR_MODELE[modele].items()
+        if getattr(ligne, colonne) is not None
+    ]
+
+
+async def recalculer(db: AsyncSession, user_id: int, modele, dates: Iterable[date]) -> None:
+    """
+    Recalcule les paquets contenant `dates` pour les métriques de `modele` (Poids ou Mensuration).
+
+    À appeler avant le commit de l'écriture, avec les anciennes et nouvelles
+    dates des lignes modifiées.
+    """
+    paquets = {(g, debut_paquet(jour, g)) for jour in dates for g in GRANULARITES}
+    if not paquets:
+        return
+    await db.flush()
+    premier_jour = min(d for _, d in paquets)
+    jour_suivant = max(fin_paquet(d, g) for g, d in paquets)
+    colonnes = [getattr(modele, colonne) for colonne in METRIQUES_PAR_MODELE[modele].values()]
+    lignes = (await db.execute(
+        select(modele.date, *colonnes)
+        .where(modele.user_id == user_id, modele.date >= premier_jour, modele.date < jour_suivant)
+        .order_by(modele.date)
+    )).all()
+    agregats = calculer_agregats(points_des_lignes(modele, lignes))
+
+    metriques = list(METRIQUES_PAR_MODELE[modele])
+    for granularite in GRANULARITES:
+        debuts = [d for g, d in paquets if g == granularite]
+        await db.execute(delete(AgregatMesure).where(
+            AgregatMesure.user_id == user_id,
+            AgregatMesure.metrique.in_(metriques),
+            AgregatMesure.granularite == granularite,
+            AgregatMesure.debut.in_(debuts),
+        ))
+    # Seuls les paquets visés sont réécrits : les autres, lus en partie, seraient incomplets
+    nouvelles = [
+        {"user_id": user_id, "metrique": metrique, "granularite": granularite, "debut": debut, **valeurs}
+        for (metrique, granularite, debut), valeurs in agregats.items()
+        if (granularite, debut) in paquets
+    ]
+    if nouvelles:
+        await db.execute(insert(AgregatMesure), nouvelles)
+
+
+async def lire_statistiques(
+    db: AsyncSession,
+    user_id: int,
+    metriques: List[str],
+    granularite: str,
+    debut: Optional[date] = None,
+    fin: Optional[date] = None,
+) -> dict:
+    """Statistiques globales et par paquet de chaque métrique, sur les paquets couvrant [debut, fin]."""
+    stmt = select(AgregatMesure).where(
+        AgregatMesure.user_id == user_id,
+        AgregatMesure.metrique.in_(metriques),
+        AgregatMesure.granularite == granularite,
+    )
+    if debut is not None:
+        stmt = stmt.where(AgregatMesure.debut >= debut_paquet(debut, granularite))
+    if fin is not None:
+        stmt = stmt.where(AgregatMesure.debut <= fin)
+    agregats = (await db.scalars(stmt.order_by(AgregatMesure.metrique, AgregatMesure.debut))).all()
+
+    par_metrique = {metrique: [] for metrique in metriques}
+    for agregat in agregats:
+        par_metrique[agregat.metrique].append(agregat)
+    return {metrique: _resumer(paquets) for metrique, paquets in par_metrique.items()}
+
+
+def _resumer(paquets: List[AgregatMesure]) -> dict:
+    if not paquets:
+        return {"nombre": 0, "paquets": []}
+    nombre = sum(p.nombre for p in paquets)
+    premiere, derniere = paquets[0].premiere_valeur, paquets[-1].derniere_valeur
+    return {
+        "nombre": nombre,
+        "moyenne": round(sum(p.somme for p in paquets) / nombre, 2),
+        "min": min(p.minimum for p in paquets),
+        "max": max(p.maximum for p in paquets),
+        "premiere": {"date": paquets[0].premiere_date.isoformat(), "valeur": premiere},
+        "derniere": {"date": paquets[-1].derniere_date.isoformat(), "valeur": derniere},
+        "evolution": {
+            "difference": round(derniere - premiere, 2),
+            "pourcentage": round((derniere - premiere) / premiere * 100, 2) if premiere else None,
+        },
+        "paquets": [
+            {
+                "debut": p.debut.isoformat(),
+                "nombre": p.nombre,
+                "moyenne": round(p.somme / p.nombre, 2),
+                "min": p.minimum,
+                "max": p.maximum,
+                "derniere": p.derniere_valeur,
+            }
+            for p in paquets
+        ],
+    }
@@ -0,0 +1,160 @@
+"""
+Profil de stockage SQLite : pragmas de connexion et séparation lecture / écriture.
+
+Le profil est choisi par `SQLITE_STORAGE_PROFILE` :
+- `wal` (défaut) : journal WAL, `synchronous=NORMAL`, cache de pages dimensionné,
+  E/S mmap et délai d'attente sur verrou ; les lectures passent par un pool de
+  connexions en lecture seule et ne patientent jamais derrière un commit ;
+- `durable` : comme `wal`, avec `synchronous=FULL` (aucune transaction perdue
+  en cas de coupure de courant) ;
+- `compat` : comportement historique (journal de rollback, une seule connexion
+  pour tout), utile sur un système de fichiers réseau où WAL n'est pas fiable.
+
+Les pragmas sont posés par un hook `connect` sur chaque nouvelle connexion.
+"""
+
+import os
+from typing import Optional
+
+from sqlalchemy import event, Delete, Insert, Update
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+
+PROFILS = {
+    "wal": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "temp_store": "MEMORY",
+        "cache_size_kb": 65536,
+        "mmap_size_mb": 256,
+        "busy_timeout_ms": 5000,
+        "lectures_separees": True,
+    },
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "temp_store": "MEMORY",
+        "cache_size_kb": 65536,
+        "mmap_size_mb": 256,
+        "busy_timeout_ms": 5000,
+        "lectures_separees": True,
+    },
+    "compat": {
+        "lectures_separees": False,
+    },
+}
+
+
+def profil_depuis_environnement() -> dict:
+    nom = os.getenv("SQLITE_STORAGE_PROFILE", "wal")
+    if nom not in PROFILS:
+        raise ValueError(f"SQLITE_STORAGE_PROFILE invalide : {nom} (attendu: {', '.join(PROFILS)})")
+    profil = {"nom": nom, **PROFILS[nom]}
+    # Réglages fins, surchargés individuellement
+    for cle, variable in (
+        ("cache_size_kb", "SQLITE_CACHE_SIZE_KB"),
+        ("mmap_size_mb", "SQLITE_MMAP_SIZE_MB"),
+        ("busy_timeout_ms", "SQLITE_BUSY_TIMEOUT_MS"),
+    ):
+        if os.getenv(variable):
+            profil[cle] = int(os.environ[variable])
+    return profil
+
+
+def pragmas(profil: dict, lecture_seule: bool = False) -> list:
+    """Instructions PRAGMA à exécuter à l'ouverture d'une connexion."""
+    instructions = []
+    if "busy_timeout_ms" in profil:
+        instructions.append(f"PRAGMA busy_timeout = {profil['busy_timeout_ms']}")
+    # Le mode de journal est persistant dans le fichier : la connexion d'écriture le pose
+    if "journal_mode" in profil and not lecture_seule:
+        instructions.append(f"PRAGMA journal_mode = {profil['journal_mode']}")
+    if "synchronous" in profil:
+        instructions.append(f"PRAGMA synchronous = {profil['synchronous']}")
+    if "temp_store" in profil:
+        instructions.append(f"PRAGMA temp_store = {profil['temp_store']}")
+    if "cache_size_kb" in profil:
+        # Valeur négative : taille en KiB plutôt qu'en nombre de pages
+        instructions.append(f"PRAGMA cache_size = -{profil['cache_size_kb']}")
+    if "mmap_size_mb" in profil:
+        instructions.append(f"PRAGMA mmap_size = {profil['mmap_size_mb'] * 1024 * 1024}")
+    if lecture_seule:
+        instructions.append("PRAGMA query_only = ON")
+    return instructions
+
+
+def configurer_connexions(moteur, profil: dict, lecture_seule: bool = False) -> None:
+    """Applique les pragmas du profil à chaque connexion ouverte par le moteur (sync ou async)."""
+    moteur_sync = moteur.sync_engine if isinstance(moteur, AsyncEngine) else moteur
+    instructions = pragmas(profil, lecture_seule)
+
+    @event.listens_for(moteur_sync, "connect")
+    def _appliquer_pragmas(connexion_dbapi, enregistrement):
+        curseur = connexion_dbapi.cursor()
+        for instruction in instructions:
+            curseur.execute(instruction)
+        curseur.close()
+
+
+class SessionRoutee(Session):
+    """
+    Session qui envoie les lectures vers le moteur en lecture seule et les écritures vers le moteur d'écriture.
+
+    Dès qu'une transaction a écrit, ses lectures suivantes restent sur la
+    connexion d'écriture pour voir ses propres modifications non validées.
+    """
+
+    def __init__(self, *args, lecture=None, **kw):
+        super().__init__(*args, **kw)
+        self.moteur_lecture = lecture
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.moteur_lecture is None or self.info.get("ecriture"):
+            return super().get_bind(mapper, clause=clause, **kw)
+        if self._flushing or isinstance(clause, (Insert, Update, Delete)):
+            self.info["ecriture"] = True
+            return super().get_bind(mapper, clause=clause, **kw)
+        return self.moteur_lecture
+
+
+@event.listens_for(SessionRoutee, "after_transaction_end")
+def _fin_transaction(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("ecriture", None)
+
+
+def creer_moteurs_async(chemin: str, profil: dict, **options_pool):
+    """
+    Moteurs asynchrones (écriture, lecture) sur le fichier SQLite `chemin`.
+
+    SQLite n'accepte qu'un écrivain à la fois : le pool d'écriture est petit
+    (`SQLITE_WRITE_POOL_SIZE`, 1 par défaut) pour que les écritures concurrentes
+    attendent dans l'application plutôt que sur le verrou du fichier. Sans
+    lectures séparées (profil `compat`), le moteur de lecture est le moteur d'écriture.
+    """
+    url = f"sqlite+aiosqlite:///{chemin}"
+    if not options_pool:
+        options_pool = {"pool_size": int(os.getenv("SQLITE_WRITE_POOL_SIZE", "1")), "max_overflow": 0}
+    ecriture = create_async_engine(url, **options_pool)
+    configurer_connexions(ecriture, profil)
+    if not profil.get("lectures_separees"):
+        return ecriture, ecriture
+
+    if "pool_size" in options_pool:
+        options_pool = {**options_pool, "pool_size": int(os.getenv("SQLITE_READ_POOL_SIZE", "5")), "max_overflow": 5}
+    lecture = create_async_engine(url, **options_pool)
+    configurer_connexions(lecture, profil, lecture_seule=True)
+    return ecriture, lecture
+
+
+def fabrique_sessions(ecriture: AsyncEngine, lecture: Optional[AsyncEngine] = None) -> async_sessionmaker:
+    if lecture is None or lecture is ecriture:
+        return async_sessionmaker(ecriture, autoflush=False, expire_on_commit=False)
+    return async_sessionmaker(
+        ecriture,
+        class_=AsyncSession,
+        sync_session_class=SessionRoutee,
+        lecture=lecture.sync_engine,
+        autoflush=False,
+        expire_on_commit=False,
+    )
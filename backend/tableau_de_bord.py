@@ -0,0 +1,51 @@
+"""
+Données d'amorçage de l'application en une seule requête.
+
+À la connexion, le frontend a besoin des mesures récentes, des suppléments,
+des routines et des résumés (statistiques, tendance du poids, records). Au
+lieu de six requêtes authentifiées, chacune avec son décodage de jeton, sa
+session et sa lecture complète de table, `/dashboard/` les rassemble dans une
+session : une requête indexée par collection sur la fenêtre récente, et des
+résumés lus dans les tables tenues à jour à l'écriture.
+
+La réponse porte la révision de l'utilisateur : le client continue ensuite
+avec `/sync?since=`, et `/dashboard/` répond 304 tant qu'elle n'a pas changé.
+"""
+
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Entrainement, JournalPhysiologique, Mensuration, Poids, Routine, Supplement
+from series import METRIQUES
+import records
+import statistiques
+import tendance
+
+# Collections datées, limitées à la fenêtre demandée
+COLLECTIONS_DATEES = {
+    "poids": Poids,
+    "mensurations": Mensuration,
+    "entrainements": Entrainement,
+    "journal": JournalPhysiologique,
+}
+
+
+async def charger(db: AsyncSession, user_id: int, revision: int, debut: Optional[date], granularite: str) -> dict:
+    """Fenêtre récente des collections datées, suppléments, routines et résumés, depuis `debut` (tout si None)."""
+    donnees = {"revision": revision}
+    for cle, modele in COLLECTIONS_DATEES.items():
+        stmt = select(modele).where(modele.user_id == user_id)
+        if debut is not None:
+            stmt = stmt.where(modele.date >= debut)
+        donnees[cle] = (await db.scalars(stmt.order_by(modele.date, modele.id))).all()
+    # Peu de lignes, et les suppléments en cours peuvent avoir commencé avant la fenêtre
+    for cle, modele in (("supplements", Supplement), ("routines", Routine)):
+        donnees[cle] = (await db.scalars(select(modele).where(modele.user_id == user_id).order_by(modele.id))).all()
+
+    donnees["stats"] = await statistiques.lire_statistiques(db, user_id, METRIQUES, granularite, debut=debut)
+    donnees["tendance"] = await tendance.lire_tendance(db, user_id, debut=debut)
+    donnees["records"] = await records.lire_records(db, user_id)
+    return donnees
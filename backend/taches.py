@@ -0,0 +1,261 @@
+"""
+File de tâches de fond pour les analyses IA.
+
+Une analyse soumise en tâche est enregistrée en base puis exécutée par un
+pool de workers asyncio : le nombre de workers borne les appels simultanés au
+modèle, et les tâches sont servies à tour de rôle par utilisateur pour qu'un
+seul utilisateur ne monopolise pas la file. Statut et résultat sont persistés :
+ils restent consultables si le client s'est déconnecté.
+
+Plusieurs processus (workers uvicorn) peuvent partager la table : une tâche
+est réservée par une mise à jour conditionnelle (en attente -> en cours), et
+son worker inscrit un battement périodique tant qu'il l'exécute. Seules les
+tâches « en cours » sans battement récent, dont le processus s'est arrêté,
+sont remises en attente, au démarrage puis à chaque intervalle de battement.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import uuid
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import TacheAnalyse
+
+logger = logging.getLogger(__name__)
+
+EN_ATTENTE = "en_attente"
+EN_COURS = "en_cours"
+TERMINEE = "terminee"
+ECHEC = "echec"
+STATUTS_FINAUX = (TERMINEE, ECHEC)
+
+
+def maintenant() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class FileUtilisateurPleine(Exception):
+    """L'utilisateur a déjà trop de tâches en attente ou en cours."""
+
+
+class ErreurTache(Exception):
+    """Échec attendu d'une tâche : le message est enregistré tel quel pour l'utilisateur."""
+
+
+def decrire(tache: TacheAnalyse) -> dict:
+    return {
+        "job_id": tache.id,
+        "statut": tache.statut,
+        "type_analyse": tache.type_analyse,
+        "cree_le": tache.cree_le.isoformat(),
+        "demarre_le": tache.demarre_le.isoformat() if tache.demarre_le else None,
+        "termine_le": tache.termine_le.isoformat() if tache.termine_le else None,
+        "resultat": json.loads(tache.resultat) if tache.resultat else None,
+        "erreur": tache.erreur,
+    }
+
+
+class FileTaches:
+    def __init__(self, workers: int = 2, max_par_utilisateur: int = 3, retention_jours: int = 30,
+                 intervalle_battement: float = 15.0, battements_manques: int = 4):
+        self.workers = workers
+        self.max_par_utilisateur = max_par_utilisateur
+        self.retention_jours = retention_jours
+        self.intervalle_battement = intervalle_battement
+        # Sans battement depuis ce délai, le worker d'une tâche « en cours » est considéré arrêté
+        self.delai_abandon = intervalle_battement * battements_manques
+        self.fabrique_sessions: Optional[Callable[[], AsyncSession]] = None
+        self.calcul: Optional[Callable[[AsyncSession, TacheAnalyse], Awaitable[dict]]] = None
+        self._files = {}        # user_id -> deque des tâches en attente
+        self._tour = deque()    # utilisateurs ayant des tâches en attente, servis à tour de rôle
+        self._par_utilisateur = {}  # user_id -> tâches en attente ou en cours
+        self._condition: Optional[asyncio.Condition] = None
+        self._taches_workers = []
+        self.terminees = 0
+        self.echouees = 0
+        self.reprises = 0
+
+    def _obtenir_condition(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    @property
+    def en_attente(self) -> int:
+        return sum(len(file) for file in self._files.values())
+
+    async def _enfiler(self, user_id: int, tache_id: str) -> None:
+        condition = self._obtenir_condition()
+        async with condition:
+            if user_id not in self._files:
+                self._files[user_id] = deque()
+                self._tour.append(user_id)
+            self._files[user_id].append(tache_id)
+            self._par_utilisateur[user_id] = self._par_utilisateur.get(user_id, 0) + 1
+            condition.notify()
+
+    async def soumettre(self, db: AsyncSession, user_id: int, type_analyse: str, user_prompt: str) -> TacheAnalyse:
+        if self._par_utilisateur.get(user_id, 0) >= self.max_par_utilisateur:
+            raise FileUtilisateurPleine()
+        tache = TacheAnalyse(
+            id=uuid.uuid4().hex, user_id=user_id, statut=EN_ATTENTE,
+            type_analyse=type_analyse, user_prompt=user_prompt, cree_le=maintenant(),
+        )
+        db.add(tache)
+        await db.commit()
+        await self._enfiler(user_id, tache.id)
+        return tache
+
+    async def _prochaine(self):
+        condition = self._obtenir_condition()
+        async with condition:
+            while not self._tour:
+                await condition.wait()
+            user_id = self._tour.popleft()
+            file = self._files[user_id]
+            tache_id = file.popleft()
+            if file:
+                self._tour.append(user_id)  # retour en fin de tour
+            else:
+                del self._files[user_id]
+            return user_id, tache_id
+
+    async def _worker(self) -> None:
+        while True:
+            user_id, tache_id = await self._prochaine()
+            try:
+                await self.executer(tache_id)
+            except Exception as e:
+                logger.error(f"Erreur du worker d'analyse sur la tâche {tache_id}: {e}")
+            finally:
+                self._par_utilisateur[user_id] -= 1
+                if not self._par_utilisateur[user_id]:
+                    del self._par_utilisateur[user_id]
+
+    async def _battre(self, tache_id: str) -> None:
+        """Signe de vie périodique du worker qui exécute la tâche, dans sa propre session."""
+        while True:
+            await asyncio.sleep(self.intervalle_battement)
+            try:
+                async with self.fabrique_sessions() as db:
+                    await db.execute(
+                        update(TacheAnalyse)
+                        .where(TacheAnalyse.id == tache_id, TacheAnalyse.statut == EN_COURS)
+                        .values(battement_le=maintenant())
+                    )
+                    await db.commit()
+            except Exception as e:
+                logger.error(f"Erreur lors du battement de la tâche {tache_id}: {e}")
+
+    async def executer(self, tache_id: str) -> None:
+        async with self.fabrique_sessions() as db:
+            # Réservation atomique : un seul processus exécute la tâche, même si plusieurs l'ont en file
+            debut = maintenant()
+            reservation = await db.execute(
+                update(TacheAnalyse)
+                .where(TacheAnalyse.id == tache_id, TacheAnalyse.statut == EN_ATTENTE)
+                .values(statut=EN_COURS, demarre_le=debut, battement_le=debut)
+            )
+            await db.commit()
+            if reservation.rowcount != 1:
+                return
+            tache = await db.get(TacheAnalyse, tache_id)
+            battement = asyncio.create_task(self._battre(tache_id))
+            try:
+                resultat = await self.calcul(db, tache)
+                tache.statut = TERMINEE
+                tache.resultat = json.dumps(resultat, ensure_ascii=False)
+            except Exception as e:
+                await db.rollback()
+                if not isinstance(e, ErreurTache):
+                    logger.error(f"Erreur lors de l'analyse en tâche de fond {tache_id}: {e}")
+                tache.statut = ECHEC
+                tache.erreur = str(e) if isinstance(e, ErreurTache) else "Erreur interne lors de l'analyse."
+            finally:
+                battement.cancel()
+            tache.termine_le = maintenant()
+            await db.commit()
+            # Compté une fois le statut final visible en base
+            if tache.statut == TERMINEE:
+                self.terminees += 1
+            else:
+                self.echouees += 1
+
+    async def _reprendre_abandonnees(self, db: AsyncSession) -> list:
+        """Remet en attente les tâches « en cours » dont le worker ne donne plus signe de vie ; renvoie (user_id, id)."""
+        limite = maintenant() - timedelta(seconds=self.delai_abandon)
+        reprises = (await db.execute(
+            update(TacheAnalyse)
+            .where(TacheAnalyse.statut == EN_COURS, or_(TacheAnalyse.battement_le.is_(None), TacheAnalyse.battement_le < limite))
+            .values(statut=EN_ATTENTE, demarre_le=None, battement_le=None)
+            .returning(TacheAnalyse.user_id, TacheAnalyse.id)
+        )).all()
+        self.reprises += len(reprises)
+        return reprises
+
+    async def _surveiller(self) -> None:
+        """Reprend les tâches abandonnées par un processus arrêté pendant que celui-ci tourne."""
+        while True:
+            await asyncio.sleep(self.intervalle_battement)
+            try:
+                async with self.fabrique_sessions() as db:
+                    reprises = await self._reprendre_abandonnees(db)
+                    await db.commit()
+                for user_id, tache_id in reprises:
+                    await self._enfiler(user_id, tache_id)
+            except Exception as e:
+                logger.error(f"Erreur lors de la reprise des tâches abandonnées: {e}")
+
+    async def demarrer(self) -> None:
+        """Reprend les tâches abandonnées et en attente, purge les anciennes et lance les workers."""
+        async with self.fabrique_sessions() as db:
+            await db.execute(delete(TacheAnalyse).where(
+                TacheAnalyse.statut.in_(STATUTS_FINAUX),
+                TacheAnalyse.termine_le < maintenant() - timedelta(days=self.retention_jours),
+            ))
+            # Une tâche abandonnée est rejouée depuis le début ; celles d'un autre processus vivant continuent
+            await self._reprendre_abandonnees(db)
+            await db.commit()
+            reprises = (await db.execute(
+                select(TacheAnalyse.user_id, TacheAnalyse.id).where(TacheAnalyse.statut == EN_ATTENTE).order_by(TacheAnalyse.cree_le)
+            )).all()
+        for user_id, tache_id in reprises:
+            await self._enfiler(user_id, tache_id)
+        self._taches_workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._taches_workers.append(asyncio.create_task(self._surveiller()))
+
+    async def arreter(self) -> None:
+        for tache in self._taches_workers:
+            tache.cancel()
+        await asyncio.gather(*self._taches_workers, return_exceptions=True)
+        self._taches_workers = []
+        self._files.clear()
+        self._tour.clear()
+        self._par_utilisateur.clear()
+        self._condition = None
+
+    def metriques(self) -> dict:
+        return {
+            "workers": self.workers,
+            "en_attente": self.en_attente,
+            "utilisateurs_en_attente": len(self._tour),
+            "terminees": self.terminees,
+            "echouees": self.echouees,
+            "reprises": self.reprises,
+        }
+
+
+def depuis_environnement() -> FileTaches:
+    return FileTaches(
+        workers=int(os.getenv("ANALYSE_JOBS_WORKERS", "2")),
+        max_par_utilisateur=int(os.getenv("ANALYSE_JOBS_MAX_PER_USER", "3")),
+        retention_jours=int(os.getenv("ANALYSE_JOBS_RETENTION_DAYS", "30")),
+        intervalle_battement=float(os.getenv("ANALYSE_JOBS_HEARTBEAT_SECONDS", "15")),
+    )
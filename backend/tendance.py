@@ -0,0 +1,143 @@
+"""
+Tendance du poids : filtre de Kalman à niveau et vitesse.
+
+Les pesées quotidiennes varient de plusieurs centaines de grammes (hydratation,
+repas) autour d'une tendance lente. Le filtre estime à chaque pesée le poids
+lissé, sa vitesse d'évolution et leurs variances ; l'écart des jours sans
+pesée est pris en compte dans la prédiction.
+
+L'état du filtre est enregistré après chaque pesée dans `tendances_poids`.
+Une écriture à une date ne change que les états à partir de cette date : ils
+sont recalculés depuis le dernier état antérieur, sans relire l'historique.
+`/tendance/` lit ensuite les états directement.
+"""
+
+import math
+from dataclasses import dataclass
+from datetime import date
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Poids, TendancePoids
+
+# Variances du modèle (kg², kg²/jour, (kg/jour)²/jour)
+BRUIT_MESURE = 0.5
+BRUIT_NIVEAU = 0.01
+BRUIT_VITESSE = 1e-5
+# Incertitude initiale sur la vitesse : ±0,1 kg/jour
+VARIANCE_VITESSE_INITIALE = 0.01
+Z_BANDE = 1.96  # bande de confiance à 95 %
+
+
+@dataclass
+class EtatFiltre:
+    date: date
+    niveau: float
+    vitesse: float  # kg/jour
+    var_niveau: float
+    covariance: float
+    var_vitesse: float
+
+    @classmethod
+    def initial(cls, jour: date, valeur: float) -> "EtatFiltre":
+        return cls(jour, valeur, 0.0, BRUIT_MESURE, 0.0, VARIANCE_VITESSE_INITIALE)
+
+    def suivant(self, jour: date, valeur: float) -> "EtatFiltre":
+        """Prédiction jusqu'à `jour` puis correction par la pesée."""
+        dt = (jour - self.date).days
+        niveau = self.niveau + self.vitesse * dt
+        p11 = self.var_niveau + 2 * dt * self.covariance + dt * dt * self.var_vitesse + BRUIT_NIVEAU * dt
+        p12 = self.covariance + dt * self.var_vitesse
+        p22 = self.var_vitesse + BRUIT_VITESSE * dt
+
+        gain_niveau, gain_vitesse = p11 / (p11 + BRUIT_MESURE), p12 / (p11 + BRUIT_MESURE)
+        ecart = valeur - niveau
+        return EtatFiltre(
+            date=jour,
+            niveau=niveau + gain_niveau * ecart,
+            vitesse=self.vitesse + gain_vitesse * ecart,
+            var_niveau=(1 - gain_niveau) * p11,
+            covariance=(1 - gain_niveau) * p12,
+            var_vitesse=p22 - gain_vitesse * p12,
+        )
+
+
+def filtrer(pesees: Iterable[Tuple[date, float]], etat: Optional[EtatFiltre] = None) -> List[Tuple[float, EtatFiltre]]:
+    """États successifs (pesée, état) pour des pesées triées par date, en repartant de `etat` s'il est donné."""
+    resultats = []
+    for jour, valeur in pesees:
+        etat = EtatFiltre.initial(jour, valeur) if etat is None else etat.suivant(jour, valeur)
+        resultats.append((valeur, etat))
+    return resultats
+
+
+def _ligne(user_id: int, valeur: float, etat: EtatFiltre) -> dict:
+    return {
+        "user_id": user_id, "date": etat.date, "valeur": valeur, "niveau": etat.niveau, "vitesse": etat.vitesse,
+        "var_niveau": etat.var_niveau, "covariance": etat.covariance, "var_vitesse": etat.var_vitesse,
+    }
+
+
+def lignes_tendance(user_id: int, pesees: Iterable[Tuple[date, float]]) -> List[dict]:
+    """Lignes de `tendances_poids` de tout un historique."""
+    return [_ligne(user_id, valeur, etat) for valeur, etat in filtrer(pesees)]
+
+
+async def recalculer(db: AsyncSession, user_id: int, dates: Iterable[date]) -> None:
+    """
+    Recalcule les états à partir de la plus ancienne des `dates`.
+
+    À appeler avant le commit de l'écriture, avec les anciennes et nouvelles
+    dates des pesées modifiées.
+    """
+    dates = [jour for jour in dates if jour is not None]
+    if not dates:
+        return
+    depart = min(dates)
+    await db.flush()
+    precedent = await db.scalar(
+        select(TendancePoids)
+        .where(TendancePoids.user_id == user_id, TendancePoids.date < depart)
+        .order_by(TendancePoids.date.desc())
+        .limit(1)
+    )
+    pesees = (await db.execute(
+        select(Poids.date, Poids.valeur)
+        .where(Poids.user_id == user_id, Poids.date >= depart, Poids.date.isnot(None), Poids.valeur.isnot(None))
+        .order_by(Poids.date)
+    )).all()
+
+    await db.execute(delete(TendancePoids).where(TendancePoids.user_id == user_id, TendancePoids.date >= depart))
+    etat = None
+    if precedent is not None:
+        etat = EtatFiltre(precedent.date, precedent.niveau, precedent.vitesse,
+                          precedent.var_niveau, precedent.covariance, precedent.var_vitesse)
+    nouvelles = [_ligne(user_id, valeur, e) for valeur, e in filtrer(pesees, etat)]
+    if nouvelles:
+        await db.execute(insert(TendancePoids), nouvelles)
+
+
+def decrire(tendance: TendancePoids) -> dict:
+    marge = Z_BANDE * math.sqrt(max(tendance.var_niveau, 0.0))
+    return {
+        "date": tendance.date.isoformat(),
+        "valeur": tendance.valeur,
+        "tendance": round(tendance.niveau, 2),
+        "vitesse_kg_semaine": round(tendance.vitesse * 7, 3),
+        "bande_basse": round(tendance.niveau - marge, 2),
+        "bande_haute": round(tendance.niveau + marge, 2),
+    }
+
+
+async def lire_tendance(db: AsyncSession, user_id: int, debut: Optional[date] = None) -> dict:
+    """Dernier état (lecture d'index) et états depuis `debut`."""
+    derniere = await db.scalar(
+        select(TendancePoids).where(TendancePoids.user_id == user_id).order_by(TendancePoids.date.desc()).limit(1)
+    )
+    stmt = select(TendancePoids).where(TendancePoids.user_id == user_id)
+    if debut is not None:
+        stmt = stmt.where(TendancePoids.date >= debut)
+    points = (await db.scalars(stmt.order_by(TendancePoids.date))).all()
+    return {"actuelle": decrire(derniere) if derniere else None, "points": [decrire(t) for t in points]}
@@ -0,0 +1,136 @@
+"""
+Tests du cache des réponses de /analyse/ (appels Mistral simulés).
+"""
+
+import json
+from datetime import date
+
+import httpx
+import pytest
+
+import main
+from client_llm import ClientLLM
+from main import cache_analyses
+from models import Poids, AnalyseEnCache
+
+
+@pytest.fixture
+def mistral(monkeypatch):
+    """Remplace l'API Mistral par un transport local qui compte les appels."""
+    appels = []
+
+    def repondre(request):
+        appels.append(request)
+        return httpx.Response(200, json={
+            "model": "mistral-small-latest",
+            "choices": [{"message": {"content": f"Analyse n°{len(appels)}"}}],
+            "usage": {"total_tokens": 42},
+        })
+
+    monkeypatch.setenv("MISTRAL_API_KEY", "cle-de-test")
+    monkeypatch.setattr(main, "client_llm", ClientLLM(transport=httpx.MockTransport(repondre)))
+    return appels
+
+
+def test_analyse_identique_servie_depuis_le_cache(client_authentifie, db, mistral):
+    db.add(Poids(user_id=1, valeur=80, date=date(2024, 1, 1)))
+    db.commit()
+    succes = cache_analyses.succes
+
+    premiere = client_authentifie.post("/analyse/", json={}).json()
+    seconde = client_authentifie.post("/analyse/", json={}).json()
+    assert len(mistral) == 1
+    assert premiere["en_cache"] is False and seconde["en_cache"] is True
+    assert seconde["analyse"] == premiere["analyse"]
+    assert cache_analyses.succes == succes + 1
+
+
+def test_nouvelle_donnee_change_la_cle(client_authentifie, db, mistral):
+    client_authentifie.post("/analyse/", json={})
+    db.add(Poids(user_id=1, valeur=79, date=date(2024, 1, 2)))
+    db.commit()
+    assert client_authentifie.post("/analyse/", json={}).json()["analyse"] == "Analyse n°2"
+    # Un autre prompt est aussi une autre entrée
+    client_authentifie.post("/analyse/", json={"user_prompt": "Et mon sommeil ?"})
+    assert len(mistral) == 3
+
+
+def test_eviction_lru(client_authentifie, db, mistral, monkeypatch):
+    monkeypatch.setattr(cache_analyses, "max_entrees", 2)
+    for prompt in ("a", "b"):
+        client_authentifie.post("/analyse/", json={"user_prompt": prompt})
+    client_authentifie.post("/analyse/", json={"user_prompt": "a"})  # « a » redevient la plus récente
+    client_authentifie.post("/analyse/", json={"user_prompt": "c"})
+
+    assert db.query(AnalyseEnCache).count() == 2
+    client_authentifie.post("/analyse/", json={"user_prompt": "a"})
+    assert len(mistral) == 3  # « b » a été évincée, « a » est restée en cache
+    metriques = client_authentifie.get("/analyse/metrics").json()
+    assert metriques["entrees"] == 2
+
+
+def test_entree_expiree(client_authentifie, db, mistral, monkeypatch):
+    client_authentifie.post("/analyse/", json={})
+    monkeypatch.setattr(cache_analyses, "duree_vie", -1)
+    assert client_authentifie.post("/analyse/", json={}).json()["en_cache"] is False
+    assert len(mistral) == 2
+
+
+def test_type_analyse(client_authentifie, db, mistral):
+    db.add(Poids(user_id=1, valeur=80, date=date(2024, 1, 1)))
+    db.commit()
+    reponse = client_authentifie.post("/analyse/", json={"type_analyse": "poids"}).json()
+    assert reponse["data_summary"]["poids_count"] == 1
+    assert b"entrainements" not in mistral[0].content
+    assert client_authentifie.post("/analyse/", json={"type_analyse": "inconnu"}).status_code == 422
+
+
+def _evenements(texte: str):
+    evenements = []
+    for bloc in texte.strip().split("\n\n"):
+        nom, donnees = bloc.split("\n")
+        evenements.append((nom[len("event: "):], json.loads(donnees[len("data: "):])))
+    return evenements
+
+
+@pytest.fixture
+def mistral_en_flux(monkeypatch):
+    appels = []
+
+    def repondre(request):
+        appels.append(json.loads(request.content))
+        morceaux = [
+            {"model": "mistral-small-latest", "choices": [{"delta": {"content": fragment}}]}
+            for fragment in ("Bonne ", "progression", " !")
+        ]
+        morceaux.append({"model": "mistral-small-latest", "choices": [{"delta": {}, "finish_reason": "stop"}],
+                         "usage": {"prompt_tokens": 30, "completion_tokens": 3, "total_tokens": 33}})
+        corps = "".join(f"data: {json.dumps(m)}\n\n" for m in morceaux) + "data: [DONE]\n\n"
+        return httpx.Response(200, content=corps.encode(), headers={"content-type": "text/event-stream"})
+
+    monkeypatch.setenv("MISTRAL_API_KEY", "cle-de-test")
+    monkeypatch.setattr(main, "client_llm", ClientLLM(transport=httpx.MockTransport(repondre)))
+    return appels
+
+
+def test_analyse_en_flux(client_authentifie, db, mistral_en_flux):
+    reponse = client_authentifie.post("/analyse/stream", json={})
+    assert reponse.headers["content-type"].startswith("text/event-stream")
+    evenements = _evenements(reponse.text)
+    assert [e for e, _ in evenements] == ["token", "token", "token", "fin"]
+    assert "".join(d["texte"] for e, d in evenements if e == "token") == "Bonne progression !"
+    assert evenements[-1][1]["usage"]["total_tokens"] == 33
+    assert mistral_en_flux[0]["stream"] is True
+
+    # L'analyse complète a été mise en cache : partagée avec l'endpoint non streamé
+    assert client_authentifie.post("/analyse/", json={}).json()["analyse"] == "Bonne progression !"
+    evenements = _evenements(client_authentifie.post("/analyse/stream", json={}).text)
+    assert evenements[-1] == ("fin", {**evenements[-1][1], "en_cache": True})
+    assert len(mistral_en_flux) == 1
+
+
+def test_analyse_en_flux_erreur_amont(client_authentifie, db, monkeypatch):
+    monkeypatch.setenv("MISTRAL_API_KEY", "cle-de-test")
+    monkeypatch.setattr(main, "client_llm", ClientLLM(
+        transport=httpx.MockTransport(lambda request: httpx.Response(400, text="requête refusée"))))
+    assert client_authentifie.post("/analyse/stream", json={}).status_code == 502
@@ -0,0 +1,86 @@
+"""
+Tests de l'analytique d'entraînement vectorisée et des endpoints /analytique/.
+"""
+
+from datetime import date
+
+import numpy as np
+import pytest
+
+from analytique import HistoriqueEntrainement, distributions_intensite, meilleurs_un_rm, volume_hebdomadaire
+from models import Entrainement, Exercice
+from un_rm import estimer as estimer_un_rm
+
+LIGNES = [
+    # date, exercice, séries, répétitions, charge, RPE
+    (date(2024, 1, 1), "Squat", 3, 5, 100, 8),
+    (date(2024, 1, 3), "Squat", 1, 1, 130, None),
+    (date(2024, 1, 3), "Tractions", 4, 8, None, 9),
+    (date(2024, 1, 9), "Squat", 5, 10, 90, 7),
+]
+
+
+def test_un_rm_par_formule():
+    historique = HistoriqueEntrainement.depuis_lignes(LIGNES)
+    epley, brzycki, rpe = (historique.un_rm(f) for f in ("epley", "brzycki", "rpe"))
+    assert epley[0] == pytest.approx(100 * (1 + 5 / 30))
+    assert brzycki[0] == pytest.approx(100 * 36 / 32)
+    # RPE 8 : 2 répétitions en réserve, soit 7 possibles
+    assert rpe[0] == pytest.approx(100 * (1 + 7 / 30))
+    # Une seule répétition : la charge ; sans charge ou sans RPE : NaN
+    assert epley[1] == 130 and np.isnan(epley[2]) and np.isnan(rpe[1])
+
+
+def test_un_rm_commun_aux_records_et_a_l_analytique():
+    # Même série, même 1RM : records et résumés IA (un_rm.estimer) comme analytique
+    historique = HistoriqueEntrainement.depuis_lignes(LIGNES)
+    assert estimer_un_rm(130, 1) == 130 == historique.un_rm("epley")[1]
+    assert estimer_un_rm(100, 5) == round(float(historique.un_rm("epley")[0]), 1)
+
+
+def test_volume_hebdomadaire():
+    volume = volume_hebdomadaire(HistoriqueEntrainement.depuis_lignes(LIGNES))
+    assert volume["par_exercice"][0] == {
+        "semaine": "2024-01-01", "exercice": "Squat", "series": 4, "reps": 16, "tonnage_kg": 1630.0, "un_rm_max": 130.0,
+    }
+    assert volume["par_exercice"][1]["un_rm_max"] is None  # exercice au poids du corps
+    assert volume["total"] == [
+        {"semaine": "2024-01-01", "series": 8, "tonnage_kg": 1630.0},
+        {"semaine": "2024-01-08", "series": 5, "tonnage_kg": 4500.0},
+    ]
+
+
+def test_meilleurs_un_rm_et_intensite():
+    historique = HistoriqueEntrainement.depuis_lignes(LIGNES)
+    meilleurs = meilleurs_un_rm(historique)
+    assert [(m["exercice"], m["un_rm"], m["date"]) for m in meilleurs] == [("Squat", 130.0, "2024-01-03")]
+
+    distributions = distributions_intensite(historique)
+    # 90 kg / 130 = 69 %, 100 kg / 130 = 77 %, 130 kg = 100 %
+    assert distributions["intensite_pct_1rm"] == {"<60": 0, "60-70": 5, "70-80": 3, "80-90": 0, ">=90": 1}
+    assert distributions["rpe"] == {"<7": 0, "7": 5, "8": 3, "9": 4, "10": 0}
+    assert distributions["series_total"] == 13
+
+
+def test_historique_vide():
+    historique = HistoriqueEntrainement.depuis_lignes([])
+    assert volume_hebdomadaire(historique) == {"par_exercice": [], "total": []}
+    assert meilleurs_un_rm(historique) == []
+    assert distributions_intensite(historique)["series_total"] == 0
+
+
+def test_endpoints(client_authentifie, db):
+    client_authentifie.post("/entrainements/bulk", json=[
+        {"date": d.isoformat(), "exercice": e, "series": s, "reps": r, "charge": c, "rpe": rpe} for d, e, s, r, c, rpe in LIGNES
+    ])
+    db.add(Entrainement(user_id=2, date=date(2024, 1, 1), exercice="Squat", series=1, reps=1, charge=300,
+                        exercice_id=db.query(Exercice).filter_by(cle="squat").one().id))
+    db.commit()
+
+    un_rm = client_authentifie.get("/analytique/1rm", params={"formula": "brzycki"}).json()
+    assert un_rm["exercices"][0]["un_rm"] == 130.0
+    # Variante d'orthographe : même exercice
+    volume = client_authentifie.get("/analytique/volume", params={"period": "tout", "exercise": "squat "}).json()
+    assert {v["exercice"] for v in volume["par_exercice"]} == {"Squat"}
+    assert client_authentifie.get("/analytique/intensite", params={"period": "tout"}).json()["series_total"] == 13
+    assert client_authentifie.get("/analytique/1rm", params={"formula": "lombardi"}).status_code == 400
@@ -0,0 +1,60 @@
+"""
+Tests de l'authentification et du cache des utilisateurs résolus.
+"""
+
+import asyncio
+
+import pytest
+
+from hachage import FileHachage, FileSaturee
+from main import cache_utilisateurs
+
+
+def _inscrire(client, username="julien"):
+    response = client.post("/auth/register", json={"username": username, "password": "motdepasse"})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def test_utilisateur_resolu_depuis_le_cache(client):
+    cache_utilisateurs.invalider()
+    entetes = _inscrire(client)
+    echecs = cache_utilisateurs.echecs
+
+    assert client.get("/auth/me", headers=entetes).json()["username"] == "julien"
+    assert cache_utilisateurs.echecs == echecs + 1
+    succes = cache_utilisateurs.succes
+    assert client.get("/auth/me", headers=entetes).status_code == 200
+    assert cache_utilisateurs.succes == succes + 1
+
+
+def test_donnees_ecrites_avec_l_utilisateur_en_cache(client):
+    cache_utilisateurs.invalider()
+    entetes = _inscrire(client, "camille")
+    client.get("/auth/me", headers=entetes)
+    response = client.post("/poids/", json={"valeur": 75, "date_mesure": "2024-05-01"}, headers=entetes)
+    assert response.status_code == 200
+    assert client.get("/poids/", headers=entetes).json()["poids"][0]["valeur"] == 75
+
+
+def test_token_invalide(client):
+    assert client.get("/auth/me", headers={"Authorization": "Bearer faux"}).status_code == 401
+
+
+def test_connexion_avec_hachage_hors_boucle(client):
+    _inscrire(client, "alex")
+    response = client.post("/auth/login", data={"username": "alex", "password": "motdepasse"})
+    assert response.status_code == 200
+    response = client.post("/auth/login", data={"username": "alex", "password": "mauvais!"})
+    assert response.status_code == 401
+
+
+def test_file_de_hachage_saturee():
+    file = FileHachage(type_executeur="thread", workers=1, max_concurrent=1, max_attente=0)
+
+    async def scenario():
+        with pytest.raises(FileSaturee):
+            await file.hacher("motdepasse")
+
+    asyncio.run(scenario())
+    assert file.metriques()["rejetes"] == 1
@@ -0,0 +1,175 @@
+"""
+Tests du client partagé vers l'API du modèle : reprises, Retry-After, disjoncteur.
+"""
+
+import asyncio
+import threading
+import time
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+import main
+from client_llm import ClientLLM, Disjoncteur, DisjoncteurOuvert, delai_retry_after
+
+
+@pytest.fixture
+def serveur_local():
+    """Serveur HTTP local : répond 503 (Retry-After: 0) aux deux premières requêtes, puis 200."""
+    etat = {"requetes": 0, "ports": set()}
+
+    class Gestionnaire(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            etat["requetes"] += 1
+            etat["ports"].add(self.client_address[1])
+            corps = b'{"ok": true}'
+            self.send_response(503 if etat["requetes"] <= 2 else 200)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(corps)))
+            self.end_headers()
+            self.wfile.write(corps)
+
+        def log_message(self, *args):
+            pass
+
+    serveur = ThreadingHTTPServer(("127.0.0.1", 0), Gestionnaire)
+    threading.Thread(target=serveur.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{serveur.server_address[1]}/v1/chat/completions", etat
+    serveur.shutdown()
+
+
+def test_reprises_sur_serveur_local(serveur_local):
+    url, etat = serveur_local
+    client = ClientLLM(delai_base=0.01)
+
+    async def appeler():
+        try:
+            return await client.envoyer("POST", url, json={"model": "test"})
+        finally:
+            await client.arreter()
+
+    reponse = asyncio.run(appeler())
+    assert reponse.status_code == 200
+    assert etat["requetes"] == 3 and client.reessais == 2
+    # Les trois tentatives ont réutilisé la même connexion
+    assert len(etat["ports"]) == 1
+
+
+def test_delai_retry_after():
+    assert delai_retry_after(httpx.Response(429, headers={"Retry-After": "3"})) == 3
+    date_http = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert 25 < delai_retry_after(httpx.Response(503, headers={"Retry-After": date_http})) <= 30
+    assert delai_retry_after(httpx.Response(503)) is None
+    # Le délai demandé est plafonné
+    assert ClientLLM(delai_max=2)._delai(0, httpx.Response(429, headers={"Retry-After": "120"})) == 2
+
+
+def test_erreur_reseau_reessayee_puis_levee():
+    appels = []
+
+    def refuser(request):
+        appels.append(request)
+        raise httpx.ConnectError("refusé", request=request)
+
+    client = ClientLLM(transport=httpx.MockTransport(refuser), max_tentatives=2, delai_base=0)
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(client.envoyer("POST", "https://amont.test/"))
+    assert len(appels) == 3
+
+
+def test_disjoncteur():
+    appels = []
+    statut = {"code": 500}
+
+    def repondre(request):
+        appels.append(request)
+        return httpx.Response(statut["code"])
+
+    client = ClientLLM(
+        transport=httpx.MockTransport(repondre), max_tentatives=0,
+        disjoncteur=Disjoncteur(seuil=2, duree_ouverture=0.05),
+    )
+
+    async def scenario():
+        for _ in range(2):
+            assert (await client.envoyer("POST", "https://amont.test/")).status_code == 500
+        assert client.disjoncteur.etat == "ouvert"
+        with pytest.raises(DisjoncteurOuvert):
+            await client.envoyer("POST", "https://amont.test/")
+        assert len(appels) == 2  # refusé sans appel
+
+        await asyncio.sleep(0.06)
+        assert client.disjoncteur.etat == "semi_ouvert"
+        statut["code"] = 200
+        assert (await client.envoyer("POST", "https://amont.test/")).status_code == 200
+        assert client.disjoncteur.etat == "ferme"
+
+    asyncio.run(scenario())
+    assert client.metriques()["ouvertures_disjoncteur"] == 1
+
+
+def test_analyse_refusee_quand_le_disjoncteur_est_ouvert(client_authentifie, db, monkeypatch):
+    monkeypatch.setenv("MISTRAL_API_KEY", "cle-de-test")
+    client = ClientLLM(transport=httpx.MockTransport(lambda request: httpx.Response(200)))
+    client.disjoncteur.ouvert_depuis = time.monotonic()
+    monkeypatch.setattr(main, "client_llm", client)
+
+    reponse = client_authentifie.post("/analyse/", json={})
+    assert reponse.status_code == 503
+    assert int(reponse.headers["Retry-After"]) >= 1
+
+
+def test_limitation_persistante_ouvre_le_disjoncteur():
+    appels = []
+
+    def limiter(request):
+        appels.append(request)
+        return httpx.Response(429, headers={"Retry-After": "0"})
+
+    client = ClientLLM(
+        transport=httpx.MockTransport(limiter), max_tentatives=1, delai_base=0,
+        disjoncteur=Disjoncteur(seuil=2, duree_ouverture=30),
+    )
+
+    async def scenario():
+        for _ in range(2):
+            assert (await client.envoyer("POST", "https://amont.test/")).status_code == 429
+        assert client.disjoncteur.etat == "ouvert"
+        with pytest.raises(DisjoncteurOuvert):
+            await client.envoyer("POST", "https://amont.test/")
+
+    asyncio.run(scenario())
+    assert len(appels) == 4  # deux appels, chacun avec sa reprise
+
+
+def test_essai_annule_libere_le_semi_ouvert():
+    async def bloquer(request):
+        await asyncio.sleep(10)
+        return httpx.Response(200)
+
+    client = ClientLLM(
+        transport=httpx.MockTransport(bloquer), max_tentatives=0,
+        disjoncteur=Disjoncteur(seuil=1, duree_ouverture=0.01),
+    )
+
+    async def scenario():
+        client.disjoncteur.echec()
+        await asyncio.sleep(0.02)
+        assert client.disjoncteur.etat == "semi_ouvert"
+        # Le client se déconnecte pendant l'essai
+        essai = asyncio.create_task(client.envoyer("POST", "https://amont.test/"))
+        await asyncio.sleep(0.01)
+        essai.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await essai
+        assert not client.disjoncteur.essai_en_cours
+        assert client.disjoncteur.autoriser()  # un nouvel essai est permis
+
+    asyncio.run(scenario())
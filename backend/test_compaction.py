@@ -0,0 +1,68 @@
+"""
+Tests de la compaction des données envoyées à l'analyse IA.
+"""
+
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+from compaction import compacter, estimer_tokens, pente_par_semaine, serialiser
+from un_rm import estimer as estimer_un_rm
+
+AUJOURD_HUI = date(2024, 6, 30)
+
+
+def _historique(jours: int):
+    debut = AUJOURD_HUI - timedelta(days=jours - 1)
+    poids = [SimpleNamespace(date=debut + timedelta(days=i), valeur=90 - i * 0.05) for i in range(jours)]
+    entrainements = [
+        SimpleNamespace(date=debut + timedelta(days=i), exercice=f"Exercice {i % 20}", exercice_id=i % 20, series=4, reps=8, charge=60 + i % 30, rpe=8)
+        for i in range(0, jours, 2)
+    ]
+    journal = [
+        SimpleNamespace(date=debut + timedelta(days=i), texte="Bonne séance, " * 40, humeur=7, energie=6, sommeil_qualite=7, sommeil_duree=7.5)
+        for i in range(jours)
+    ]
+    return {"poids": poids, "mensurations": [], "entrainements": entrainements, "journal": journal}
+
+
+def test_tables_selon_le_type():
+    lignes = _historique(60)
+    donnees, _ = compacter(lignes, "poids", 10000, AUJOURD_HUI)
+    assert set(donnees) == {"poids", "mensurations"}
+    donnees, _ = compacter(lignes, "entrainement", 10000, AUJOURD_HUI)
+    assert set(donnees) == {"entrainements", "journal"}
+
+
+def test_respect_du_budget():
+    lignes = _historique(3 * 365)
+    brut = estimer_tokens(serialiser({t: [{k: str(x) for k, x in vars(l).items()} for l in v] for t, v in lignes.items()}))
+    donnees, info = compacter(lignes, "general", 1500, AUJOURD_HUI)
+    assert info["tokens_estimes"] <= 1500 < brut
+    assert info["niveau"] > 0
+    # Les statistiques principales restent présentes au niveau le plus sobre
+    assert donnees["poids"]["derniere"]["date"] == AUJOURD_HUI.isoformat()
+
+
+def test_detail_complet_si_le_budget_le_permet():
+    donnees, info = compacter(_historique(30), "general", 100000, AUJOURD_HUI)
+    assert info["niveau"] == 0
+    assert len(donnees["poids"]["recent"]) == 15  # 14 jours en arrière + aujourd'hui
+    assert donnees["entrainements"]["principaux_exercices"][0]["meilleur_1rm"] is not None
+
+
+def test_variantes_d_un_exercice_regroupees():
+    entrainements = [
+        SimpleNamespace(date=date(2024, 6, 1), exercice="Squat", exercice_id=1, series=3, reps=5, charge=100, rpe=None),
+        SimpleNamespace(date=date(2024, 6, 8), exercice="squat", exercice_id=1, series=3, reps=5, charge=105, rpe=None),
+    ]
+    donnees, _ = compacter({"poids": [], "mensurations": [], "entrainements": entrainements, "journal": []}, "entrainement", 10000, AUJOURD_HUI)
+    principaux = donnees["entrainements"]["principaux_exercices"]
+    # Un seul exercice, sous la dernière orthographe saisie
+    assert [(e["exercice"], e["seances"], e["meilleure_charge"]) for e in principaux] == [("squat", 2, 105)]
+    assert donnees["entrainements"]["nombre_exercices"] == 1
+
+
+def test_tendance_et_un_rm():
+    points = [(date(2024, 1, 1) + timedelta(days=i), 80 - i / 7) for i in range(28)]
+    assert pente_par_semaine(points) == -1.0
+    assert estimer_un_rm(100, 10) == 133.3
@@ -0,0 +1,135 @@
+"""
+Tests des chemins d'écriture et d'export sur la couche base asynchrone.
+"""
+
+import asyncio
+from datetime import date
+
+import pytest
+
+import exports
+from conftest import AsyncSessionTest
+from models import Poids, Mensuration, Entrainement, Exercice
+
+
+def test_crud_poids(client_authentifie, db):
+    reponse = client_authentifie.post("/poids/", json={"valeur": 80.5, "date_mesure": "2024-01-01"})
+    assert reponse.status_code == 200
+    identifiant = reponse.json()["id"]
+
+    # Même date : mise à jour plutôt que doublon
+    client_authentifie.post("/poids/", json={"valeur": 81, "date_mesure": "2024-01-01"})
+    assert client_authentifie.get(f"/poids/{identifiant}").json()["poids"]["valeur"] == 81
+
+    assert client_authentifie.delete(f"/poids/{identifiant}").status_code == 200
+    assert client_authentifie.get(f"/poids/{identifiant}").status_code == 404
+
+
+def test_lot_poids(client_authentifie, db):
+    reponse = client_authentifie.post("/poids/bulk", json=[
+        {"valeur": 80, "date_mesure": "2024-01-01"},
+        {"valeur": 79.5, "date_mesure": "2024-01-02"},
+        {"valeur": -1, "date_mesure": "2024-01-03"},
+        {"valeur": 79, "date_mesure": "2024-01-02"},
+    ])
+    statuts = [r["statut"] for r in reponse.json()["resultats"]]
+    assert statuts == ["cree", "ignore", "erreur", "cree"]
+    assert reponse.json()["message"] == "Lot traité : 2 créé(s), 0 mis à jour, 1 ignoré(s), 1 en erreur"
+    assert db.query(Poids).filter(Poids.user_id == 1).count() == 2
+
+
+def test_import_hevy(client_authentifie, db):
+    texte = "Push\nJan 22, 2024\nBench Press (Barbell)\nSet 1: 80 kg x 8\nSet 2: 80 kg x 8\n"
+    reponse = client_authentifie.post("/import/hevy", content=texte.encode())
+    assert reponse.json()["seances_importees"] == 1
+    entrainement = db.query(Entrainement).one()
+    assert (entrainement.series, entrainement.reps, entrainement.charge) == (2, 8, 80)
+
+    # Deuxième import identique : ignoré
+    assert client_authentifie.post("/import/hevy", content=texte.encode()).json()["doublons"] == 1
+
+
+def test_export_csv_en_flux(client_authentifie, db):
+    db.add_all([Poids(user_id=1, valeur=80, date=date(2024, 1, d)) for d in range(1, 4)])
+    db.commit()
+    lignes = client_authentifie.get("/export-csv/").text.strip().split("\n")
+    assert lignes[0].startswith("date,poids")
+    assert len(lignes) == 4
+
+
+def test_export_csv_collection(client_authentifie, db):
+    exercice = Exercice(nom="Squat", cle="squat")
+    db.add(exercice)
+    db.flush()
+    db.add_all([
+        Entrainement(user_id=1, date=date(2024, 1, 2), exercice="Squat", exercice_id=exercice.id, series=3, reps=5, charge=100),
+        Entrainement(user_id=1, date=date(2024, 1, 1), exercice="squat", exercice_id=exercice.id, series=3, reps=8, charge=70),
+        Entrainement(user_id=2, date=date(2024, 1, 1), exercice="SQUAT", exercice_id=exercice.id, series=1, reps=1, charge=200),
+    ])
+    db.commit()
+    reponse = client_authentifie.get("/export-csv/entrainements")
+    assert reponse.status_code == 200
+    assert reponse.headers["content-type"].startswith("text/csv")
+    lignes = reponse.text.strip().split("\n")
+    assert lignes[0] == "date,exercice,series,reps,charge,rpe,notes"
+    # Trié par date, sans les lignes de l'utilisateur 2
+    assert [ligne.split(",")[1] for ligne in lignes[1:]] == ["squat", "Squat"]
+
+    assert client_authentifie.get("/export-csv/inconnue").status_code == 404
+
+
+def test_export_csv_vide(client_authentifie, db):
+    exercice = Exercice(nom="Squat", cle="squat")
+    db.add(exercice)
+    db.flush()
+    db.add(Entrainement(user_id=2, date=date(2024, 1, 1), exercice="Squat", exercice_id=exercice.id, series=1, reps=1, charge=100))
+    db.commit()
+    assert client_authentifie.get("/export-csv/entrainements").text == "date,exercice,series,reps,charge,rpe,notes\n"
+    assert client_authentifie.get("/export-csv/journal").text.startswith("date,texte,humeur")
+    assert client_authentifie.get("/export-csv/").text.strip().split("\n") == [",".join(exports.ENTETES_MESURES)]
+
+
+def test_flux_csv_par_lots(db, monkeypatch):
+    monkeypatch.setattr(exports, "TAILLE_LOT", 2)
+    db.add_all([Poids(user_id=1, valeur=80 + d, date=date(2024, 1, d)) for d in range(1, 6)])
+    db.add(Poids(user_id=2, valeur=60, date=date(2024, 1, 1)))
+    db.commit()
+
+    async def lire():
+        async with AsyncSessionTest() as session:
+            return [morceau async for morceau in exports.flux_csv(
+                session, exports.requete_mesures(1), exports.ENTETES_MESURES)]
+
+    morceaux = asyncio.run(lire())
+    # Un morceau par lot de 2 lignes (l'en-tête part avec le premier), puis le reste
+    assert [morceau.count("\n") for morceau in morceaux] == [3, 2, 1]
+    lignes = "".join(morceaux).strip().split("\n")
+    assert [ligne.split(",")[1] for ligne in lignes[1:]] == ["81.0", "82.0", "83.0", "84.0", "85.0"]
+
+
+def test_export_parquet(client_authentifie, db, monkeypatch):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    monkeypatch.setattr(exports, "TAILLE_LOT_COLONNAIRE", 2)
+    db.add_all([Mensuration(user_id=1, taille=80 + d, date=date(2024, 1, d)) for d in range(1, 5)])
+    db.add(Mensuration(user_id=1, taille=None, cou=38, date=date(2024, 1, 5)))
+    db.add(Mensuration(user_id=2, taille=60, date=date(2024, 1, 1)))
+    db.commit()
+
+    reponse = client_authentifie.get("/export/mensurations", params={"format": "parquet"})
+    assert reponse.status_code == 200
+    assert reponse.headers["content-type"] == "application/vnd.apache.parquet"
+    fichier = pq.ParquetFile(pa.BufferReader(reponse.content))
+    assert fichier.num_row_groups == 3  # un groupe de lignes par partition
+    table = fichier.read()
+    assert table.schema.field("date").type == pa.date32()
+    taille = table.schema.field("taille")
+    assert taille.type == pa.float64() and taille.nullable
+    assert table.schema.names == ["id", "date"] + exports.COLONNES_MENSURATION
+    # Seules les mesures de l'utilisateur 1
+    assert table.column("taille").to_pylist() == [81.0, 82.0, 83.0, 84.0, None]
+    assert table.column("date").to_pylist()[0] == date(2024, 1, 1)
+
+    arrow = client_authentifie.get("/export/mensurations", params={"format": "arrow"})
+    assert pa.ipc.open_file(pa.BufferReader(arrow.content)).read_all().num_rows == 5
+    assert client_authentifie.get("/export/mensurations", params={"format": "csv"}).status_code == 400
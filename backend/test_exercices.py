@@ -0,0 +1,63 @@
+"""
+Tests du dictionnaire des exercices : normalisation, résolution à l'écriture et historique par exercice.
+"""
+
+from datetime import date
+
+from exercices import normaliser
+from models import AliasExercice, Entrainement, Exercice
+
+
+def test_normaliser():
+    assert normaliser("  Développé   couché ") == "developpe couche"
+    assert normaliser("Bench Press (Barbell)") == "bench press barbell"
+    assert normaliser("Pull-up") == normaliser("pull up")
+
+
+def test_variantes_resolues_vers_le_meme_exercice(client_authentifie, db):
+    client_authentifie.post("/entrainements/", json={"date": "2024-01-01", "exercice": "Développé couché", "series": 3, "reps": 8, "charge": 80})
+    client_authentifie.post("/entrainements/bulk", json=[
+        {"date": "2024-01-03", "exercice": "developpe  couche", "series": 3, "reps": 8, "charge": 82.5},
+        {"date": "2024-01-03", "exercice": "Squat", "series": 5, "reps": 5, "charge": 100},
+    ])
+    texte = "Push\nJan 5, 2024\nDéveloppé Couché\nSet 1: 85 kg x 5\n"
+    client_authentifie.post("/import/hevy", content=texte.encode())
+
+    assert db.query(Exercice).count() == 2
+    assert db.query(AliasExercice).count() == 2
+    identifiants = {e.exercice_id for e in db.query(Entrainement).filter(Entrainement.exercice != "Squat")}
+    assert len(identifiants) == 1
+
+    exercices = client_authentifie.get("/exercices/").json()["exercices"]
+    # Nommé d'après la dernière saisie de l'utilisateur
+    assert [(e["nom"], e["nombre_lignes"]) for e in exercices] == [("Développé Couché", 3), ("Squat", 1)]
+
+    historique = client_authentifie.get(f"/exercices/{exercices[0]['id']}/historique").json()
+    assert [e["charge"] for e in historique["entrainements"]] == [80, 82.5, 85]
+    assert client_authentifie.get("/exercices/999999/historique").status_code == 404
+
+
+def test_modification_change_d_exercice(client_authentifie, db):
+    identifiant = client_authentifie.post("/entrainements/", json={"date": "2024-01-01", "exercice": "Squat", "series": 3, "reps": 5}).json()["id"]
+    client_authentifie.put(f"/entrainements/{identifiant}", json={"date": "2024-01-01", "exercice": "Front squat", "series": 3, "reps": 5})
+    entrainement = db.get(Entrainement, identifiant)
+    assert entrainement.exercice_id == db.query(Exercice).filter_by(cle="front squat").one().id
+
+
+def test_exercices_des_autres_utilisateurs_invisibles(client_authentifie, db):
+    # L'utilisateur 2 crée l'exercice du dictionnaire commun sous son orthographe
+    exercice = Exercice(nom="DC prise serrée (secret)", cle="dc prise serree secret")
+    db.add(exercice)
+    db.flush()
+    db.add(AliasExercice(cle=exercice.cle, exercice_id=exercice.id))
+    db.add(Entrainement(user_id=2, date=date(2024, 1, 1), exercice=exercice.nom, exercice_id=exercice.id, series=3, reps=8))
+    db.commit()
+    assert client_authentifie.get(f"/exercices/{exercice.id}/historique").status_code == 404
+    assert client_authentifie.get("/exercices/").json()["exercices"] == []
+
+    client_authentifie.post("/entrainements/", json={"date": "2024-01-02", "exercice": "dc prise serree secret", "series": 3, "reps": 8, "charge": 60})
+    historique = client_authentifie.get(f"/exercices/{exercice.id}/historique").json()
+    assert historique["exercice"] == {"id": exercice.id, "nom": "dc prise serree secret"}
+    assert len(historique["entrainements"]) == 1
+    records = client_authentifie.get("/records/").json()["records"]
+    assert [r["exercice"] for r in records] == ["dc prise serree secret"]
@@ -0,0 +1,48 @@
+"""
+Tests des migrations Alembic sur une base SQLite dédiée.
+"""
+
+import os
+import subprocess
+import sys
+from datetime import datetime
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from models import Base, Routine
+
+DOSSIER = os.path.dirname(os.path.abspath(__file__))
+
+
+def _alembic(url, *arguments):
+    # Processus séparé : env.py reconfigure la journalisation
+    subprocess.run([sys.executable, "-m", "alembic", *arguments], cwd=DOSSIER, check=True,
+                   env={**os.environ, "DATABASE_URL": url}, capture_output=True)
+
+
+def test_routines_existantes_lisibles_apres_revisions_de_sync(tmp_path):
+    url = f"sqlite:///{tmp_path / 'migration.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    _alembic(url, "stamp", "head")
+    # Schéma d'avant /sync : routines.updated_at est une date
+    _alembic(url, "downgrade", "d8b2e5f1a4c9")
+    with engine.begin() as connexion:
+        connexion.execute(text("INSERT INTO users (id, username, hashed_password) VALUES (1, 'test', '-')"))
+        connexion.execute(text(
+            "INSERT INTO routines (user_id, nom, exercices, updated_at) VALUES (1, 'A', '[]', '2024-01-01')"
+        ))
+
+    _alembic(url, "upgrade", "head")
+    with engine.connect() as connexion:
+        assert connexion.scalar(text("SELECT typeof(updated_at) FROM routines")) == "text"
+    with Session(engine) as session:
+        routine = session.query(Routine).one()
+        assert routine.updated_at == datetime(2024, 1, 1)
+        assert routine.revision == 1
+
+    _alembic(url, "downgrade", "d8b2e5f1a4c9")
+    with engine.connect() as connexion:
+        assert connexion.scalar(text("SELECT updated_at FROM routines")) == "2024-01-01"
+    engine.dispose()
@@ -0,0 +1,94 @@
+"""
+Tests de la pagination par curseur des endpoints de liste.
+"""
+
+from datetime import date, timedelta
+
+import pytest
+
+from models import Poids, Supplement
+from pagination import encoder_curseur, decoder_curseur
+
+
+@pytest.fixture
+def donnees(db):
+    debut = date(2024, 1, 1)
+    db.add_all([Poids(user_id=1, valeur=80 + i / 10, date=debut + timedelta(days=i)) for i in range(25)])
+    db.add_all([Supplement(user_id=1, nom=f"S{i}", dose="5g", frequence="1x/jour") for i in range(3)])
+    # Données d'un autre utilisateur, jamais visibles par l'utilisateur 1
+    db.add_all([Poids(user_id=2, valeur=60, date=debut + timedelta(days=i)) for i in range(5)])
+    db.commit()
+
+
+def test_curseur_aller_retour():
+    curseur = encoder_curseur(date(2024, 3, 1), 42)
+    assert decoder_curseur(curseur) == (date(2024, 3, 1), 42)
+
+
+def test_curseur_invalide(client_authentifie):
+    response = client_authentifie.get("/poids/", params={"cursor": "pas-un-curseur"})
+    assert response.status_code == 400
+
+
+def test_parcours_complet_par_pages(client_authentifie, donnees):
+    dates = []
+    curseur = None
+    while True:
+        params = {"limit": 10}
+        if curseur:
+            params["cursor"] = curseur
+        data = client_authentifie.get("/poids/", params=params).json()
+        assert len(data["poids"]) <= 10
+        dates.extend(p["date"] for p in data["poids"])
+        curseur = data["next_cursor"]
+        if curseur is None:
+            break
+    assert len(dates) == 25
+    assert dates == sorted(dates)
+
+
+def test_lignes_sans_date_en_derniere_page(client_authentifie, donnees, db):
+    db.add_all([Poids(user_id=1, valeur=70 + i, date=None) for i in range(3)])
+    db.commit()
+    dates, curseur = [], None
+    while True:
+        data = client_authentifie.get("/poids/", params={"limit": 10, **({"cursor": curseur} if curseur else {})}).json()
+        dates.extend(p["date"] for p in data["poids"])
+        curseur = data["next_cursor"]
+        if curseur is None:
+            break
+    # Les lignes sans date suivent les 25 pesées datées, y compris à cheval sur deux pages
+    assert len(dates) == 28
+    assert dates[25:] == [None, None, None]
+    assert dates[:25] == sorted(dates[:25])
+
+    # Curseur posé sur une ligne sans date
+    data = client_authentifie.get("/poids/", params={"limit": 26}).json()
+    assert data["poids"][-1]["date"] is None
+    suite = client_authentifie.get("/poids/", params={"limit": 26, "cursor": data["next_cursor"]}).json()
+    assert [p["valeur"] for p in suite["poids"]] == [71, 72]
+
+
+def test_isolation_par_utilisateur(client_authentifie, donnees, db):
+    response = client_authentifie.get("/poids/", params={"to": "2024-01-03"}).json()
+    assert [p["valeur"] for p in response["poids"]] == [80.0, 80.1, 80.2]
+    id_autre = db.query(Poids).filter(Poids.user_id == 2).first().id
+    assert client_authentifie.get(f"/poids/{id_autre}").status_code == 404
+
+
+def test_filtre_par_dates(client_authentifie, donnees):
+    data = client_authentifie.get("/poids/", params={"from": "2024-01-05", "to": "2024-01-09"}).json()
+    assert [p["date"] for p in data["poids"]] == [f"2024-01-0{j}" for j in range(5, 10)]
+    assert data["next_cursor"] is None
+
+
+def test_limite_bornee(client_authentifie):
+    assert client_authentifie.get("/poids/", params={"limit": 100000}).status_code == 422
+
+
+def test_supplements_pagines_par_id(client_authentifie, donnees):
+    premiere = client_authentifie.get("/supplements/", params={"limit": 2}).json()
+    assert len(premiere["supplements"]) == 2
+    suite = client_authentifie.get("/supplements/", params={"limit": 2, "cursor": premiere["next_cursor"]}).json()
+    assert len(suite["supplements"]) == 1
+    assert suite["next_cursor"] is None
@@ -0,0 +1,89 @@
+"""
+Tests de l'index des records personnels : ajout, correction, suppression et imports en masse.
+"""
+
+from datetime import date
+
+from models import Entrainement, RecordPersonnel
+from records import calculer_records
+
+
+def _ajouter(client, jour, charge, reps=5, series=3, exercice="Squat"):
+    return client.post("/entrainements/", json={"date": jour, "exercice": exercice, "series": series, "reps": reps, "charge": charge}).json()
+
+
+def _records(client, exercice="Squat"):
+    return client.get("/records/", params={"exercise": exercice}).json()["records"][0]
+
+
+def test_calculer_records():
+    lignes = [
+        Entrainement(id=1, date=date(2024, 1, 1), series=3, reps=5, charge=100),
+        Entrainement(id=2, date=date(2024, 1, 2), series=1, reps=5, charge=100),
+        Entrainement(id=3, date=date(2024, 1, 2), series=3, reps=5, charge=60),
+        Entrainement(id=4, date=date(2024, 1, 3), series=2, reps=10, charge=None),
+    ]
+    records = calculer_records(lignes)
+    # À égalité, le premier record atteint reste attribué
+    assert records[("charge", 5)]["entrainement_id"] == 1
+    assert records[("un_rm", 0)]["valeur"] == round(100 * (1 + 5 / 30), 1)
+    assert records[("volume_seance", 0)] == {"valeur": 1500, "date": date(2024, 1, 1), "entrainement_id": None, "charge": None, "reps": None}
+    assert ("charge", 10) not in records
+
+
+def test_ajout_signale_les_nouveaux_records(client_authentifie):
+    premier = _ajouter(client_authentifie, "2024-01-01", 100)
+    assert {r["type"] for r in premier["nouveaux_records"]} == {"charge", "un_rm", "volume_seance"}
+
+    # Charge inférieure : aucun record
+    assert _ajouter(client_authentifie, "2024-01-03", 90)["nouveaux_records"] == []
+
+    # Même jour : le volume de la séance s'additionne
+    battus = _ajouter(client_authentifie, "2024-01-03", 90, series=1)["nouveaux_records"]
+    assert battus == [{"type": "volume_seance", "valeur": 1800.0, "date": "2024-01-03", "precedent": 1500.0}]
+
+    battus = {r["type"]: r for r in _ajouter(client_authentifie, "2024-01-05", 110, reps=3)["nouveaux_records"]}
+    assert set(battus) == {"charge", "un_rm"}
+    assert battus["charge"]["precedent"] is None  # premier record à 3 répétitions
+    assert battus["un_rm"]["precedent"] == round(100 * (1 + 5 / 30), 1)
+
+    records = _records(client_authentifie)
+    assert records["exercice"] == "Squat"
+    assert [(r["reps"], r["charge"]) for r in records["charge_par_reps"]] == [(3, 110), (5, 100)]
+    assert records["un_rm"]["charge"] == 110
+    assert records["volume_seance"]["valeur"] == 1800.0
+
+
+def test_correction_et_suppression_retrouvent_le_record_precedent(client_authentifie, db):
+    _ajouter(client_authentifie, "2024-01-01", 100)
+    record = _ajouter(client_authentifie, "2024-01-08", 120)["id"]
+    assert _records(client_authentifie)["un_rm"]["charge"] == 120
+
+    # Saisie corrigée : 102,5 kg au lieu de 120
+    client_authentifie.put(f"/entrainements/{record}", json={"date": "2024-01-08", "exercice": "Squat", "series": 3, "reps": 5, "charge": 102.5})
+    assert [r["charge"] for r in _records(client_authentifie)["charge_par_reps"]] == [102.5]
+
+    client_authentifie.delete(f"/entrainements/{record}")
+    records = _records(client_authentifie)
+    assert records["charge_par_reps"][0]["charge"] == 100
+    assert records["volume_seance"]["date"] == "2024-01-01"
+
+    # Changement d'exercice : le record quitte l'ancien exercice
+    premier = db.query(Entrainement).one().id
+    client_authentifie.put(f"/entrainements/{premier}", json={"date": "2024-01-01", "exercice": "Front squat", "series": 3, "reps": 5, "charge": 100})
+    assert [r["exercice"] for r in client_authentifie.get("/records/").json()["records"]] == ["Front squat"]
+    assert db.query(RecordPersonnel).count() == 3
+
+
+def test_imports_en_masse(client_authentifie):
+    client_authentifie.post("/entrainements/bulk", json=[
+        {"date": "2024-01-01", "exercice": "Squat", "series": 3, "reps": 5, "charge": 100},
+        {"date": "2024-01-02", "exercice": "squat", "series": 1, "reps": 1, "charge": 140},
+    ])
+    texte = "Jambes\nJan 5, 2024\nSquat\nSet 1: 145 kg x 1\n"
+    client_authentifie.post("/import/hevy", content=texte.encode())
+
+    records = _records(client_authentifie, "SQUAT")
+    assert [(r["reps"], r["charge"]) for r in records["charge_par_reps"]] == [(1, 145), (5, 100)]
+    assert records["un_rm"]["date"] == "2024-01-05"
+    assert client_authentifie.get("/records/", params={"exercise": "Curl"}).status_code == 404
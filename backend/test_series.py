@@ -0,0 +1,36 @@
+"""
+Tests du sous-échantillonnage des séries (LTTB et agrégation par paquets).
+"""
+
+import sys
+from datetime import date, timedelta
+
+sys.path.append('.')
+
+from series import lttb, agreger_par_paquets, debut_periode
+
+POINTS = [(date(2020, 1, 1) + timedelta(days=i), 80.0 + (i % 7)) for i in range(1000)]
+
+
+def test_lttb_borne_le_nombre_de_points():
+    resultat = lttb(POINTS, 100)
+    assert len(resultat) == 100
+    assert resultat[0] == POINTS[0]
+    assert resultat[-1] == POINTS[-1]
+    assert [p[0] for p in resultat] == sorted(p[0] for p in resultat)
+
+
+def test_lttb_serie_courte_inchangee():
+    assert lttb(POINTS[:20], 100) == POINTS[:20]
+
+
+def test_paquets_min_moyenne_max():
+    paquets = agreger_par_paquets(POINTS, 50)
+    assert len(paquets) <= 50
+    assert sum(p["nombre"] for p in paquets) == len(POINTS)
+    assert all(p["min"] <= p["moyenne"] <= p["max"] for p in paquets)
+
+
+def test_debut_periode_fin_de_mois():
+    assert debut_periode("1mois", date(2024, 3, 31)) == date(2024, 2, 29)
+    assert debut_periode("tout") is None
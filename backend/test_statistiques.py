@@ -0,0 +1,69 @@
+"""
+Tests des agrégats de poids et mensurations tenus à jour par les écritures, et de /stats/.
+"""
+
+from datetime import date
+
+from models import AgregatMesure
+from statistiques import fin_paquet
+
+
+def _paquets(db, metrique, granularite):
+    db.expire_all()
+    return {
+        a.debut: (a.nombre, a.somme, a.minimum, a.maximum, a.derniere_valeur)
+        for a in db.query(AgregatMesure).filter_by(user_id=1, metrique=metrique, granularite=granularite)
+    }
+
+
+def test_fin_paquet():
+    assert fin_paquet(date(2024, 12, 1), "mois") == date(2025, 1, 1)
+    assert fin_paquet(date(2024, 2, 1), "mois") == date(2024, 3, 1)
+    assert fin_paquet(date(2024, 1, 1), "semaine") == date(2024, 1, 8)
+
+
+def test_agregats_suivent_ajout_modification_suppression(client_authentifie, db):
+    for valeur, jour in [(80, "2024-01-30"), (78, "2024-01-31"), (79, "2024-02-01")]:
+        client_authentifie.post("/poids/", json={"valeur": valeur, "date_mesure": jour})
+    # Semaine du lundi 29 janvier, à cheval sur deux mois
+    assert _paquets(db, "poids", "semaine") == {date(2024, 1, 29): (3, 237, 78, 80, 79)}
+    assert _paquets(db, "poids", "mois") == {date(2024, 1, 1): (2, 158, 78, 80, 78), date(2024, 2, 1): (1, 79, 79, 79, 79)}
+
+    # Déplacer le minimum dans un autre mois recalcule l'ancien et le nouveau paquet
+    identifiant = client_authentifie.get("/poids/").json()["poids"][1]["id"]
+    client_authentifie.put(f"/poids/{identifiant}", json={"valeur": 77, "date_mesure": "2024-03-15"})
+    assert _paquets(db, "poids", "mois") == {
+        date(2024, 1, 1): (1, 80, 80, 80, 80), date(2024, 2, 1): (1, 79, 79, 79, 79), date(2024, 3, 1): (1, 77, 77, 77, 77),
+    }
+
+    client_authentifie.delete(f"/poids/{identifiant}")
+    assert date(2024, 3, 1) not in _paquets(db, "poids", "mois")
+    assert date(2024, 3, 15) not in _paquets(db, "poids", "jour")
+
+
+def test_agregats_des_imports_en_masse(client_authentifie, db):
+    client_authentifie.post("/mensurations/bulk", json=[
+        {"date_mesure": "2024-01-01", "taille": 90, "cou": 40},
+        {"date_mesure": "2024-01-15", "taille": 88},
+    ])
+    assert _paquets(db, "taille", "mois") == {date(2024, 1, 1): (2, 178, 88, 90, 88)}
+    assert _paquets(db, "cou", "mois") == {date(2024, 1, 1): (1, 40, 40, 40, 40)}
+    assert _paquets(db, "hanches", "mois") == {}
+
+
+def test_stats(client_authentifie, db):
+    client_authentifie.post("/poids/bulk", json=[
+        {"valeur": 80, "date_mesure": "2024-01-01"},
+        {"valeur": 82, "date_mesure": "2024-01-20"},
+        {"valeur": 76, "date_mesure": "2024-02-10"},
+    ])
+    reponse = client_authentifie.get("/stats/", params={"metrics": "poids,taille"}).json()
+    poids = reponse["metrics"]["poids"]
+    assert (poids["nombre"], poids["moyenne"], poids["min"], poids["max"]) == (3, 79.33, 76, 82)
+    assert poids["premiere"] == {"date": "2024-01-01", "valeur": 80}
+    assert poids["evolution"] == {"difference": -4, "pourcentage": -5.0}
+    assert [p["debut"] for p in poids["paquets"]] == ["2024-01-01", "2024-02-01"]
+    assert reponse["metrics"]["taille"] == {"nombre": 0, "paquets": []}
+
+    assert client_authentifie.get("/stats/", params={"metrics": "inconnue"}).status_code == 404
+    assert client_authentifie.get("/stats/", params={"granularity": "annee"}).status_code == 400
@@ -0,0 +1,90 @@
+"""
+Tests du profil de stockage SQLite (pragmas, connexions de lecture et d'écriture séparées).
+"""
+
+import asyncio
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import NullPool
+
+import stockage
+from models import Base, Poids
+
+
+@pytest.fixture
+def base(tmp_path):
+    chemin = str(tmp_path / "stockage.db")
+    profil = stockage.PROFILS["wal"]
+    moteur = create_engine(f"sqlite:///{chemin}")
+    stockage.configurer_connexions(moteur, profil)
+    Base.metadata.create_all(bind=moteur)
+    moteur.dispose()
+    return chemin, profil
+
+
+def test_pragmas_du_profil(base):
+    chemin, profil = base
+
+    async def lire_pragmas():
+        ecriture, lecture = stockage.creer_moteurs_async(chemin, profil, poolclass=NullPool)
+        resultats = {}
+        for nom, moteur in (("ecriture", ecriture), ("lecture", lecture)):
+            async with moteur.connect() as connexion:
+                resultats[nom] = [
+                    (await connexion.execute(text(f"PRAGMA {p}"))).scalar()
+                    for p in ("journal_mode", "synchronous", "busy_timeout", "query_only")
+                ]
+        return resultats
+
+    resultats = asyncio.run(lire_pragmas())
+    # synchronous=NORMAL vaut 1
+    assert resultats["ecriture"] == ["wal", 1, 5000, 0]
+    assert resultats["lecture"] == ["wal", 1, 5000, 1]
+
+
+def test_connexion_de_lecture_refuse_les_ecritures(base):
+    chemin, profil = base
+
+    async def ecrire_en_lecture():
+        _, lecture = stockage.creer_moteurs_async(chemin, profil, poolclass=NullPool)
+        async with lecture.connect() as connexion:
+            await connexion.execute(text("INSERT INTO users (username, hashed_password) VALUES ('x', 'y')"))
+
+    with pytest.raises(OperationalError):
+        asyncio.run(ecrire_en_lecture())
+
+
+def test_session_routee(base):
+    chemin, profil = base
+
+    async def scenario():
+        ecriture, lecture = stockage.creer_moteurs_async(chemin, profil, poolclass=NullPool)
+        async with stockage.fabrique_sessions(ecriture, lecture)() as session:
+            sync = session.sync_session
+            assert sync.get_bind(clause=select(Poids)) is lecture.sync_engine
+            session.add(Poids(user_id=1, valeur=80.0, date=date(2024, 1, 1)))
+            await session.flush()
+            # Après une écriture, la transaction lit ses propres données sur la connexion d'écriture
+            assert sync.get_bind(clause=select(Poids)) is ecriture.sync_engine
+            await session.commit()
+            assert sync.get_bind(clause=select(Poids)) is lecture.sync_engine
+            return (await session.scalars(select(Poids.valeur))).all()
+
+    assert asyncio.run(scenario()) == [80.0]
+
+
+def test_profil_compat_sans_separation(monkeypatch):
+    monkeypatch.setenv("SQLITE_STORAGE_PROFILE", "compat")
+    profil = stockage.profil_depuis_environnement()
+    assert stockage.pragmas(profil) == []
+    ecriture, lecture = stockage.creer_moteurs_async(":memory:", profil, poolclass=NullPool)
+    assert ecriture is lecture
+
+
+def test_profil_invalide(monkeypatch):
+    monkeypatch.setenv("SQLITE_STORAGE_PROFILE", "turbo")
+    with pytest.raises(ValueError):
+        stockage.profil_depuis_environnement()
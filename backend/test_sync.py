@@ -0,0 +1,49 @@
+"""
+Tests de la synchronisation incrémentale : révisions, traces de suppression et /sync.
+"""
+
+from models import User
+
+
+def _sync(client, depuis):
+    return client.get("/sync", params={"since": depuis}).json()
+
+
+def test_sync_ne_rend_que_les_changements(client_authentifie, db):
+    client_authentifie.post("/poids/", json={"valeur": 80, "date_mesure": "2024-01-01"})
+    client_authentifie.post("/supplements/", json={"nom": "Créatine", "dose": "5g", "frequence": "1x/jour"})
+    initiale = _sync(client_authentifie, 0)
+    assert initiale["revision"] == 2 and not initiale["complet"]
+    assert [p["valeur"] for p in initiale["modifies"]["poids"]] == [80]
+    assert len(initiale["modifies"]["supplements"]) == 1
+
+    # Rien de nouveau
+    vide = _sync(client_authentifie, initiale["revision"])
+    assert all(not lignes for lignes in vide["modifies"].values()) and all(not ids for ids in vide["supprimes"].values())
+
+    identifiant = initiale["modifies"]["poids"][0]["id"]
+    client_authentifie.put(f"/poids/{identifiant}", json={"valeur": 79.5, "date_mesure": "2024-01-01"})
+    client_authentifie.post("/poids/bulk", json=[{"valeur": 79, "date_mesure": "2024-01-02"}])
+    client_authentifie.delete(f"/supplements/{initiale['modifies']['supplements'][0]['id']}")
+
+    delta = _sync(client_authentifie, initiale["revision"])
+    assert delta["revision"] == 5
+    assert [(p["date"], p["valeur"], p["revision"]) for p in delta["modifies"]["poids"]] == [("2024-01-01", 79.5, 3), ("2024-01-02", 79, 4)]
+    assert delta["modifies"]["supplements"] == []
+    assert delta["supprimes"]["supplements"] == [initiale["modifies"]["supplements"][0]["id"]]
+    assert _sync(client_authentifie, 4)["modifies"]["poids"] == []
+
+    # Révisions propres à chaque utilisateur
+    db.expire_all()
+    assert db.get(User, 1).revision == 5 and db.get(User, 2).revision == 0
+
+
+def test_upsert_en_masse_et_revision_inconnue(client_authentifie):
+    client_authentifie.post("/mensurations/bulk", json=[{"date_mesure": "2024-01-01", "taille": 90}])
+    client_authentifie.post("/mensurations/bulk", json=[{"date_mesure": "2024-01-01", "cou": 40}])
+    mensurations = _sync(client_authentifie, 1)["modifies"]["mensurations"]
+    assert [(m["taille"], m["cou"], m["revision"]) for m in mensurations] == [(90, 40, 2)]
+
+    # Révision d'une autre base : resynchronisation complète
+    complete = _sync(client_authentifie, 99)
+    assert complete["complet"] and len(complete["modifies"]["mensurations"]) == 1
@@ -0,0 +1,35 @@
+"""
+Tests de /dashboard/ : données d'amorçage en une requête et réponse conditionnelle.
+"""
+
+from datetime import date, timedelta
+
+
+def test_tableau_de_bord(client_authentifie):
+    recente, ancienne = date.today() - timedelta(days=3), date.today() - timedelta(days=400)
+    for jour, valeur in [(ancienne, 85), (recente, 80)]:
+        client_authentifie.post("/poids/", json={"valeur": valeur, "date_mesure": jour.isoformat()})
+    client_authentifie.post("/entrainements/", json={"date": recente.isoformat(), "exercice": "Squat", "series": 3, "reps": 5, "charge": 100})
+    client_authentifie.post("/supplements/", json={"nom": "Créatine", "dose": "5g", "frequence": "1x/jour", "date_debut": ancienne.isoformat()})
+
+    reponse = client_authentifie.get("/dashboard/")
+    donnees = reponse.json()
+    assert donnees["revision"] == 4
+    # Fenêtre de 3 mois sur les collections datées, suppléments et routines complets
+    assert [p["valeur"] for p in donnees["poids"]] == [80]
+    assert len(donnees["entrainements"]) == 1 and len(donnees["supplements"]) == 1
+    assert donnees["mensurations"] == [] and donnees["journal"] == [] and donnees["routines"] == []
+    assert donnees["stats"]["poids"]["nombre"] == 1
+    assert donnees["tendance"]["actuelle"]["valeur"] == 80
+    assert donnees["records"][0]["exercice"] == "Squat"
+
+    complet = client_authentifie.get("/dashboard/", params={"period": "tout"}).json()
+    assert [p["valeur"] for p in complet["poids"]] == [85, 80]
+
+    # Inchangé : 304 ; après une écriture : nouvelle réponse
+    etag = reponse.headers["etag"]
+    assert client_authentifie.get("/dashboard/", headers={"If-None-Match": etag}).status_code == 304
+    client_authentifie.post("/journal/", json={"date": recente.isoformat(), "texte": "Bonne séance"})
+    assert client_authentifie.get("/dashboard/", headers={"If-None-Match": etag}).status_code == 200
+
+    assert client_authentifie.get("/dashboard/", params={"period": "hier"}).status_code == 400
@@ -0,0 +1,177 @@
+"""
+Tests de la file de tâches d'analyse (équité, reprise) et des endpoints /analyse/jobs.
+"""
+
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+
+import main
+import taches
+from client_llm import ClientLLM
+from conftest import AsyncSessionTest
+from models import TacheAnalyse
+
+
+async def _attendre(condition, delai=5.0):
+    fin = time.monotonic() + delai
+    while not condition():
+        assert time.monotonic() < fin, "délai dépassé"
+        await asyncio.sleep(0.01)
+
+
+def test_reprise_et_equite_entre_utilisateurs(db):
+    # Tâches laissées par un arrêt : trois pour l'utilisateur 1 soumises avant celle de l'utilisateur 2
+    debut = datetime(2024, 1, 1)
+    for i, (user_id, statut) in enumerate([(1, taches.EN_COURS), (1, taches.EN_ATTENTE), (1, taches.EN_ATTENTE), (2, taches.EN_ATTENTE)]):
+        db.add(TacheAnalyse(id=f"t{i}", user_id=user_id, statut=statut, type_analyse="general", user_prompt="?", cree_le=debut + timedelta(minutes=i)))
+    # Tâche terminée depuis longtemps : purgée au démarrage
+    db.add(TacheAnalyse(id="vieille", user_id=1, statut=taches.TERMINEE, type_analyse="general", user_prompt="?",
+                        cree_le=debut, termine_le=datetime(2000, 1, 1)))
+    db.commit()
+
+    ordre = []
+
+    async def calcul(session, tache):
+        ordre.append(tache.id)
+        return {"analyse": tache.id}
+
+    async def scenario():
+        file = taches.FileTaches(workers=1)
+        file.fabrique_sessions = AsyncSessionTest
+        file.calcul = calcul
+        await file.demarrer()
+        await _attendre(lambda: file.terminees == 4)
+        await file.arreter()
+
+    asyncio.run(scenario())
+    # L'utilisateur 2 passe dès le deuxième tour au lieu d'attendre les trois tâches de l'utilisateur 1
+    assert ordre == ["t0", "t3", "t1", "t2"]
+    db.expire_all()
+    assert {t.id: t.statut for t in db.query(TacheAnalyse)} == {f"t{i}": taches.TERMINEE for i in range(4)}
+    assert json.loads(db.get(TacheAnalyse, "t3").resultat) == {"analyse": "t3"}
+
+
+def test_taches_d_un_autre_processus_vivant_non_reprises(db):
+    # Deux tâches « en cours » : l'une avec un battement récent (autre worker vivant), l'autre abandonnée
+    recent = taches.maintenant()
+    db.add(TacheAnalyse(id="vivante", user_id=1, statut=taches.EN_COURS, type_analyse="general", user_prompt="?",
+                        cree_le=datetime(2024, 1, 1), demarre_le=recent, battement_le=recent))
+    db.add(TacheAnalyse(id="abandonnee", user_id=1, statut=taches.EN_COURS, type_analyse="general", user_prompt="?",
+                        cree_le=datetime(2024, 1, 1), demarre_le=datetime(2024, 1, 1), battement_le=datetime(2024, 1, 1)))
+    db.commit()
+    executees = []
+
+    async def calcul(session, tache):
+        executees.append(tache.id)
+        return {}
+
+    async def scenario():
+        file = taches.FileTaches(workers=1, intervalle_battement=60)
+        file.fabrique_sessions = AsyncSessionTest
+        file.calcul = calcul
+        await file.demarrer()
+        await _attendre(lambda: file.terminees == 1)
+        # La tâche vivante, même mise en file, n'est pas réservée une seconde fois
+        await file.executer("vivante")
+        await file.arreter()
+        assert file.metriques()["reprises"] == 1
+
+    asyncio.run(scenario())
+    assert executees == ["abandonnee"]
+    db.expire_all()
+    assert db.get(TacheAnalyse, "vivante").statut == taches.EN_COURS
+
+
+def test_battement_pendant_l_execution(db):
+    db.add(TacheAnalyse(id="longue", user_id=1, statut=taches.EN_ATTENTE, type_analyse="general", user_prompt="?", cree_le=datetime(2024, 1, 1)))
+    db.commit()
+
+    async def calcul(session, tache):
+        await asyncio.sleep(0.15)
+        return {}
+
+    async def scenario():
+        file = taches.FileTaches(workers=1, intervalle_battement=0.02)
+        file.fabrique_sessions = AsyncSessionTest
+        file.calcul = calcul
+        await file.executer("longue")
+
+    asyncio.run(scenario())
+    db.expire_all()
+    tache = db.get(TacheAnalyse, "longue")
+    assert tache.statut == taches.TERMINEE
+    assert tache.battement_le > tache.demarre_le
+
+
+@pytest.fixture
+def file_demarree(client_authentifie, monkeypatch):
+    """Client dont le cycle de vie démarre la file de tâches sur la base de test, Mistral simulé."""
+    appels = []
+
+    def repondre(request):
+        appels.append(request)
+        return httpx.Response(200, json={
+            "model": "mistral-small-latest",
+            "choices": [{"message": {"content": "Analyse en tâche de fond"}}],
+        })
+
+    async def sans_schema():
+        pass
+
+    monkeypatch.setattr(main, "initialiser_schema", sans_schema)
+    monkeypatch.setattr(main.file_taches, "fabrique_sessions", AsyncSessionTest)
+    monkeypatch.setattr(main, "INTERVALLE_SUIVI_TACHE", 0.02)
+    monkeypatch.setattr(main, "client_llm", ClientLLM(transport=httpx.MockTransport(repondre)))
+    monkeypatch.setenv("MISTRAL_API_KEY", "cle-de-test")
+    with client_authentifie as client:
+        yield client
+
+
+def _attendre_fin(client, job_id):
+    fin = time.monotonic() + 5
+    while (tache := client.get(f"/analyse/jobs/{job_id}").json())["statut"] not in taches.STATUTS_FINAUX:
+        assert time.monotonic() < fin, "délai dépassé"
+        time.sleep(0.02)
+    return tache
+
+
+def test_soumettre_puis_consulter(file_demarree):
+    reponse = file_demarree.post("/analyse/jobs", json={"type_analyse": "poids"})
+    assert reponse.status_code == 202
+    job_id = reponse.json()["job_id"]
+    assert reponse.headers["location"] == f"/analyse/jobs/{job_id}"
+
+    tache = _attendre_fin(file_demarree, job_id)
+    assert tache["statut"] == "terminee"
+    assert tache["type_analyse"] == "poids"
+    assert tache["resultat"]["analyse"] == "Analyse en tâche de fond"
+
+    # Suivi en flux d'une tâche déjà terminée : statut puis fin
+    flux = file_demarree.get(f"/analyse/jobs/{job_id}/stream").text
+    assert flux.index("event: statut") < flux.index("event: fin")
+    assert "Analyse en tâche de fond" in flux
+
+
+def test_echec_enregistre_avec_son_message(file_demarree, monkeypatch):
+    monkeypatch.delenv("MISTRAL_API_KEY")
+    job_id = file_demarree.post("/analyse/jobs", json={}).json()["job_id"]
+    tache = _attendre_fin(file_demarree, job_id)
+    assert tache["statut"] == "echec"
+    assert tache["erreur"] == "Clé API Mistral non configurée côté serveur."
+
+
+def test_tache_d_un_autre_utilisateur(client_authentifie, db):
+    db.add(TacheAnalyse(id="autre", user_id=2, statut=taches.EN_ATTENTE, type_analyse="general", user_prompt="?", cree_le=datetime(2024, 1, 1)))
+    db.commit()
+    assert client_authentifie.get("/analyse/jobs/autre").status_code == 404
+    assert client_authentifie.get("/analyse/jobs/autre/stream").status_code == 404
+
+
+def test_limite_par_utilisateur(client_authentifie, db, monkeypatch):
+    monkeypatch.setattr(main.file_taches, "max_par_utilisateur", 0)
+    assert client_authentifie.post("/analyse/jobs", json={}).status_code == 429
@@ -0,0 +1,63 @@
+"""
+Tests du filtre de tendance du poids et de sa mise à jour incrémentale.
+"""
+
+from datetime import date, timedelta
+
+import pytest
+
+from models import Poids, TendancePoids
+from tendance import filtrer, lignes_tendance
+
+
+def _etats(db):
+    db.expire_all()
+    return [(t.date, round(t.niveau, 6), round(t.vitesse, 6)) for t in db.query(TendancePoids).filter_by(user_id=1).order_by(TendancePoids.date)]
+
+
+def _recalcul_complet(db):
+    pesees = [(p.date, p.valeur) for p in db.query(Poids).filter_by(user_id=1).order_by(Poids.date)]
+    return [(l["date"], round(l["niveau"], 6), round(l["vitesse"], 6)) for l in lignes_tendance(1, pesees)]
+
+
+def test_filtre_suit_une_perte_reguliere():
+    debut = date(2024, 1, 1)
+    # -0,5 kg/semaine avec ±0,6 kg de bruit alterné, une pesée sur deux jours
+    pesees = [(debut + timedelta(days=j), 90 - j / 14 + (0.6 if j % 4 else -0.6)) for j in range(0, 120, 2)]
+    _, etat = filtrer(pesees)[-1]
+    assert etat.vitesse * 7 == pytest.approx(-0.5, abs=0.1)
+    assert etat.niveau == pytest.approx(90 - 118 / 14, abs=0.5)
+    # Le filtre s'affine : la variance du niveau passe sous celle d'une pesée
+    assert etat.var_niveau < filtrer(pesees[:1])[0][1].var_niveau
+
+
+def test_ecritures_recalculent_a_partir_de_la_date(client_authentifie, db):
+    for jour, valeur in [("2024-01-01", 80), ("2024-01-02", 79.6), ("2024-01-04", 79.9), ("2024-01-07", 79.1)]:
+        client_authentifie.post("/poids/", json={"valeur": valeur, "date_mesure": jour})
+    assert _etats(db) == _recalcul_complet(db)
+    anciens = _etats(db)
+
+    # Correction au milieu : les états antérieurs ne bougent pas
+    identifiant = db.query(Poids).filter_by(date=date(2024, 1, 4)).one().id
+    client_authentifie.put(f"/poids/{identifiant}", json={"valeur": 78.5, "date_mesure": "2024-01-05"})
+    assert _etats(db) == _recalcul_complet(db)
+    assert _etats(db)[:2] == anciens[:2]
+
+    client_authentifie.delete(f"/poids/{identifiant}")
+    client_authentifie.post("/poids/bulk", json=[{"valeur": 79.8, "date_mesure": "2024-01-03"}, {"valeur": 79, "date_mesure": "2024-01-08"}])
+    assert _etats(db) == _recalcul_complet(db)
+    assert len(_etats(db)) == 5
+
+
+def test_endpoint(client_authentifie):
+    assert client_authentifie.get("/tendance/").json() == {"period": "tout", "actuelle": None, "points": []}
+    client_authentifie.post("/poids/", json={"valeur": 80, "date_mesure": "2024-01-01"})
+    client_authentifie.post("/poids/", json={"valeur": 79, "date_mesure": "2024-01-08"})
+
+    reponse = client_authentifie.get("/tendance/").json()
+    actuelle = reponse["actuelle"]
+    assert actuelle == reponse["points"][-1]
+    assert actuelle["date"] == "2024-01-08" and actuelle["valeur"] == 79
+    assert 79 < actuelle["tendance"] < 80 and actuelle["vitesse_kg_semaine"] < 0
+    assert actuelle["bande_basse"] < actuelle["tendance"] < actuelle["bande_haute"]
+    assert client_authentifie.get("/tendance/", params={"period": "siecle"}).status_code == 400
@@ -0,0 +1,48 @@
+"""
+Tests des GET conditionnels : versions des collections, ETag et 304.
+"""
+
+from versions import correspond
+
+
+def test_correspond():
+    assert correspond('W/"poids-1-3"', 'W/"poids-1-3"')
+    assert correspond('"autre", "poids-1-3"', 'W/"poids-1-3"')
+    assert correspond("*", 'W/"poids-1-3"')
+    assert not correspond('W/"poids-1-2"', 'W/"poids-1-3"')
+    assert not correspond(None, 'W/"poids-1-3"')
+
+
+def test_304_tant_que_la_collection_ne_change_pas(client_authentifie):
+    reponse = client_authentifie.get("/poids/")
+    etag = reponse.headers["etag"]
+    assert reponse.status_code == 200 and "last-modified" not in reponse.headers
+
+    inchangee = client_authentifie.get("/poids/", headers={"If-None-Match": etag})
+    assert inchangee.status_code == 304 and inchangee.content == b""
+    assert inchangee.headers["etag"] == etag
+
+    # Chaque écriture change l'ETag, y compris une suppression
+    client_authentifie.post("/poids/", json={"valeur": 80, "date_mesure": "2024-01-01"})
+    reponse = client_authentifie.get("/poids/", headers={"If-None-Match": etag})
+    assert reponse.status_code == 200 and len(reponse.json()["poids"]) == 1
+    assert reponse.headers["etag"] != etag and "last-modified" in reponse.headers
+
+    etag = reponse.headers["etag"]
+    client_authentifie.delete(f"/poids/{reponse.json()['poids'][0]['id']}")
+    assert client_authentifie.get("/poids/", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_versions_par_collection(client_authentifie):
+    etags = {route: client_authentifie.get(route).headers["etag"] for route in ("/poids/", "/entrainements/", "/routines/")}
+
+    client_authentifie.post("/entrainements/bulk", json=[{"date": "2024-01-01", "exercice": "Squat", "series": 3, "reps": 5}])
+    assert client_authentifie.get("/entrainements/", headers={"If-None-Match": etags["/entrainements/"]}).status_code == 200
+    assert client_authentifie.get("/poids/", headers={"If-None-Match": etags["/poids/"]}).status_code == 304
+
+    etag = client_authentifie.get("/entrainements/").headers["etag"]
+    client_authentifie.post("/import/hevy", content="Jambes\nJan 5, 2024\nSquat\nSet 1: 100 kg x 5\n".encode())
+    assert client_authentifie.get("/entrainements/", headers={"If-None-Match": etag}).status_code == 200
+
+    client_authentifie.post("/routines/", json={"nom": "A", "exercices": "[]"})
+    assert client_authentifie.get("/routines/", headers={"If-None-Match": etags["/routines/"]}).status_code == 200
@@ -0,0 +1,32 @@
+"""
+Estimation du 1RM (charge maximale sur une seule répétition) à partir d'une série.
+
+Formules communes aux records personnels, à l'analytique d'entraînement et aux
+résumés envoyés à l'analyse IA. Ce ne sont que des opérations arithmétiques :
+elles s'appliquent à des nombres comme, élément par élément, à des tableaux NumPy.
+"""
+
+FORMULES = ["epley", "brzycki", "rpe"]
+
+# Au-delà, la formule de Brzycki n'est pas définie (dénominateur nul ou négatif)
+REPS_MAX_BRZYCKI = 36
+
+
+def epley(charge, reps):
+    """Une seule répétition : la charge est le 1RM (facteur `reps != 1`, valable aussi élément par élément)."""
+    return charge * (1 + (reps != 1) * reps / 30)
+
+
+def brzycki(charge, reps):
+    """À réserver aux séries d'au plus `REPS_MAX_BRZYCKI` répétitions."""
+    return charge * 36 / (37 - reps)
+
+
+def reps_possibles(reps, rpe):
+    """Répétitions possibles à cette charge : effectuées + en réserve (10 - RPE), pour la formule « rpe »."""
+    return reps + 10 - rpe
+
+
+def estimer(charge: float, reps: int) -> float:
+    """1RM estimé d'une série par la formule d'Epley, arrondi à 0,1 kg."""
+    return round(epley(charge, reps), 1)
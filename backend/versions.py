@@ -0,0 +1,144 @@
+"""
+Versions des collections de chaque utilisateur, pour les GET conditionnels.
+
+Chaque écriture d'une collection (ajout, modification, suppression, import)
+incrémente sa version dans la même transaction. Les routes de liste rendent un
+`ETag` construit sur cette version et répondent 304 à un `If-None-Match`
+identique après une seule lecture de `versions_collections`, sans requête sur
+la table ni corps de réponse.
+
+L'ETag porte l'identifiant de l'utilisateur : un navigateur partagé ne peut pas
+valider la liste d'un autre compte. Il ne dépend pas des paramètres de
+pagination, qui font déjà partie de l'URL mise en cache.
+
+La même écriture prend aussi la révision suivante de l'utilisateur
+(`users.revision`) et l'inscrit sur les lignes qu'elle a modifiées, ainsi que
+sur les traces de ses suppressions. `/sync?since=` rend alors les lignes et
+suppressions de révision supérieure, par l'index (utilisateur, révision) de
+chaque table : le coût suit la taille du changement, pas celle des données.
+L'incrément de `users.revision` verrouille la ligne de l'utilisateur jusqu'au
+commit : ses écritures sont sérialisées et les révisions suivent l'ordre des
+commits, si bien qu'un client ne peut pas sauter une écriture encore en cours.
+"""
+
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import insert_upsert
+from models import (
+    Entrainement, JournalPhysiologique, Mensuration, Poids, Routine, Supplement, Suppression, User, VersionCollection,
+)
+
+COLLECTIONS_VERSIONNEES = {
+    "poids": Poids,
+    "mensurations": Mensuration,
+    "entrainements": Entrainement,
+    "supplements": Supplement,
+    "journal": JournalPhysiologique,
+    "routines": Routine,
+}
+
+
+def _maintenant() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+async def incrementer(db: AsyncSession, user_id: int, collection: str) -> int:
+    """
+    Nouvelle version de la collection et nouvelle révision de l'utilisateur, à appeler avant le commit de l'écriture.
+
+    Inscrit la révision sur les lignes de la collection et les suppressions écrites
+    par la transaction (révision NULL) ; renvoie la révision.
+    """
+    await db.flush()
+    revision = await db.scalar(
+        update(User).where(User.id == user_id).values(revision=User.revision + 1).returning(User.revision),
+        execution_options={"synchronize_session": False},
+    )
+    modele = COLLECTIONS_VERSIONNEES[collection]
+    for table in (modele, Suppression):
+        await db.execute(
+            update(table).where(table.user_id == user_id, table.revision.is_(None)).values(revision=revision),
+            execution_options={"synchronize_session": False},
+        )
+
+    stmt = insert_upsert(db, VersionCollection).values(
+        user_id=user_id, collection=collection, version=1, modifie_le=_maintenant(),
+    )
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[VersionCollection.user_id, VersionCollection.collection],
+        set_={"version": VersionCollection.version + 1, "modifie_le": stmt.excluded.modifie_le},
+    ))
+    return revision
+
+
+def supprimer(db: AsyncSession, user_id: int, collection: str, entite_id: int) -> None:
+    """Trace de la suppression d'une ligne, datée par le prochain `incrementer`."""
+    db.add(Suppression(user_id=user_id, collection=collection, entite_id=entite_id))
+
+
+async def lire(db: AsyncSession, user_id: int, collection: str) -> Tuple[int, Optional[datetime]]:
+    """Version courante et date de dernière modification (0 et None si la collection n'a jamais été écrite)."""
+    ligne = (await db.execute(
+        select(VersionCollection.version, VersionCollection.modifie_le)
+        .where(VersionCollection.user_id == user_id, VersionCollection.collection == collection)
+    )).first()
+    return (ligne.version, ligne.modifie_le) if ligne else (0, None)
+
+
+def etag(user_id: int, collection: str, version: int) -> str:
+    return f'W/"{collection}-{user_id}-{version}"'
+
+
+def entetes(etiquette: str, modifie_le: Optional[datetime]) -> dict:
+    # no-cache : le navigateur garde la réponse mais la revalide à chaque requête
+    entetes = {"ETag": etiquette, "Cache-Control": "private, no-cache"}
+    if modifie_le is not None:
+        entetes["Last-Modified"] = format_datetime(modifie_le.replace(tzinfo=timezone.utc), usegmt=True)
+    return entetes
+
+
+def correspond(if_none_match: Optional[str], etiquette: str) -> bool:
+    """Comparaison faible de `If-None-Match` (liste d'ETags ou `*`) avec l'ETag courant."""
+    if not if_none_match:
+        return False
+    candidats = [valeur.strip() for valeur in if_none_match.split(",")]
+    return "*" in candidats or any(c.removeprefix("W/") == etiquette.removeprefix("W/") for c in candidats)
+
+
+async def revision_courante(db: AsyncSession, user_id: int) -> int:
+    return await db.scalar(select(User.revision).where(User.id == user_id)) or 0
+
+
+async def changements_depuis(db: AsyncSession, user_id: int, depuis: int) -> dict:
+    """
+    Lignes écrites et identifiants supprimés de chaque collection après la révision `depuis`.
+
+    Une révision supérieure à la révision courante (base restaurée, autre serveur)
+    donne une resynchronisation complète.
+    """
+    courante = await revision_courante(db, user_id)
+    complet = depuis > courante
+    if complet:
+        depuis = 0
+
+    modifies, supprimes = {}, {}
+    for collection, modele in COLLECTIONS_VERSIONNEES.items():
+        modifies[collection] = (await db.scalars(
+            select(modele)
+            .where(modele.user_id == user_id, modele.revision > depuis, modele.revision <= courante)
+            .order_by(modele.revision, modele.id)
+        )).all()
+        supprimes[collection] = []
+    if not complet:
+        for collection, entite_id in await db.execute(
+            select(Suppression.collection, Suppression.entite_id)
+            .where(Suppression.user_id == user_id, Suppression.revision > depuis, Suppression.revision <= courante)
+            .order_by(Suppression.revision, Suppression.id)
+        ):
+            supprimes[collection].append(entite_id)
+    return {"revision": courante, "complet": complet, "modifies": modifies, "supprimes": supprimes}
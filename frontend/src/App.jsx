@@ -15,6 +15,10 @@ import StatisticsPage from './StatisticsPage';
 import './StatisticsPage.css';
 import './responsive.css';
 
+// Fenêtre chargée par /dashboard/ et périodes de graphique qu'elle couvre
+const PERIODE_DASHBOARD = '3mois';
+const PERIODES_DASHBOARD = ['1mois', '3mois'];
+
 function App() {
   const [token, setToken] = useState(() => localStorage.getItem('token'));
   const [activeTab, setActiveTab] = useState('home');
@@ -22,6 +26,8 @@ function App() {
   const [mensurations, setMensurations] = useState([]);
   const [entrainements, setEntrainements] = useState([]);
   const [supplements, setSupplements] = useState([]);
+  const [revision, setRevision] = useState(0);
+  const [historiqueComplet, setHistoriqueComplet] = useState(false);
   const [showAIModal, setShowAIModal] = useState(false);
 
   const handleLogin = (accessToken) => {
@@ -36,6 +42,8 @@ function App() {
     setMensurations([]);
     setEntrainements([]);
     setSupplements([]);
+    setRevision(0);
+    setHistoriqueComplet(false);
   };
 
   // Écouter l'événement de déconnexion automatique (401)
@@ -45,49 +53,76 @@ function App() {
     return () => window.removeEventListener('auth:logout', onForceLogout);
   }, []);
 
-  const fetchPoids = async () => {
-    try {
-      const response = await api.get('/poids/');
-      setPoids(response.data.poids);
-    } catch (error) {
-      console.error("Erreur lors de la récupération des poids :", error);
-    }
+  // Collections affichées, avec le champ qui les ordonne comme /dashboard/
+  const collections = {
+    poids: [setPoids, 'date'],
+    mensurations: [setMensurations, 'date'],
+    entrainements: [setEntrainements, 'date'],
+    supplements: [setSupplements, null],
   };
 
-  const fetchMensurations = async () => {
+  const trier = (lignes, champ) => [...lignes].sort((a, b) =>
+    (champ && a[champ] !== b[champ] ? (a[champ] < b[champ] ? -1 : 1) : a.id - b.id));
+
+  const chargerDashboard = async () => {
     try {
-      const response = await api.get('/mensurations/');
-      setMensurations(response.data.mensurations);
+      const { data } = await api.get('/dashboard/', { params: { period: PERIODE_DASHBOARD } });
+      Object.entries(collections).forEach(([cle, [setter]]) => setter(data[cle]));
+      setRevision(data.revision);
     } catch (error) {
-      console.error("Erreur lors de la récupération des mensurations :", error);
+      console.error("Erreur lors du chargement du tableau de bord :", error);
     }
   };
 
-  const fetchEntrainements = async () => {
+  // Applique une réponse de /sync : remplace les données si `remplacer` ou resynchronisation complète, sinon fusionne
+  const appliquerSync = (data, remplacer) => {
+    Object.entries(collections).forEach(([cle, [setter, champ]]) => {
+      const modifies = data.modifies[cle];
+      if (remplacer || data.complet) {
+        setter(trier(modifies, champ));
+        return;
+      }
+      const supprimes = new Set(data.supprimes[cle]);
+      setter((actuelles) => {
+        const parId = new Map(actuelles.filter((ligne) => !supprimes.has(ligne.id)).map((ligne) => [ligne.id, ligne]));
+        modifies.forEach((ligne) => parId.set(ligne.id, ligne));
+        return trier([...parId.values()], champ);
+      });
+    });
+    setRevision(data.revision);
+  };
+
+  // Historique complet, lu une seule fois et seulement pour une période plus longue que la fenêtre du tableau de bord
+  const chargerHistorique = async () => {
+    if (historiqueComplet) return;
     try {
-      const response = await api.get('/entrainements/');
-      setEntrainements(response.data.entrainements);
+      const { data } = await api.get('/sync', { params: { since: 0 } });
+      appliquerSync(data, true);
+      setHistoriqueComplet(true);
     } catch (error) {
-      console.error("Erreur lors de la récupération des entraînements :", error);
+      console.error("Erreur lors du chargement de l'historique :", error);
     }
   };
 
-  const fetchSupplements = async () => {
+  const handlePeriodeChange = (periode) => {
+    if (!PERIODES_DASHBOARD.includes(periode)) chargerHistorique();
+  };
+
+  // Après une écriture : seulement les changements si l'historique est chargé, sinon la fenêtre du tableau de bord
+  const actualiser = async () => {
+    if (!historiqueComplet) return chargerDashboard();
     try {
-      const response = await api.get('/supplements/');
-      setSupplements(response.data.supplements);
+      const { data } = await api.get('/sync', { params: { since: revision } });
+      appliquerSync(data, false);
     } catch (error) {
-      console.error("Erreur lors de la récupération des suppléments :", error);
+      console.error("Erreur lors de la synchronisation :", error);
     }
   };
 
+  // Amorçage en une requête : fenêtre récente et suppléments, sans historique complet
   useEffect(() => {
-    if (token) {
-      fetchPoids();
-      fetchMensurations();
-      fetchEntrainements();
-      fetchSupplements();
-    }
+    if (!token) return;
+    chargerDashboard();
   }, [token]);
 
   const tabs = [
@@ -144,15 +179,16 @@ function App() {
               <HomePage
                 poids={poids}
                 mensurations={mensurations}
-                onPoidsAdded={fetchPoids}
-                onMensurationsAdded={fetchMensurations}
+                onPoidsAdded={actualiser}
+                onMensurationsAdded={actualiser}
+                onPeriodeChange={handlePeriodeChange}
               />
             )}
 
             {activeTab === 'entrainement' && (
               <EntrainementPage
                 entrainements={entrainements}
-                onEntrainementAdded={fetchEntrainements}
+                onEntrainementAdded={actualiser}
               />
             )}
 
@@ -160,7 +196,7 @@ function App() {
               <NutritionPage
                 supplements={supplements}
                 poids={poids}
-                onSupplementAdded={fetchSupplements}
+                onSupplementAdded={actualiser}
               />
             )}
 
@@ -4,9 +4,19 @@ import api from './api';
 import CompleteCharts from './components/CompleteCharts';
 import AIAnalysisModal from './components/AIAnalysisModal';
 
+// Métriques affichées dans les cartes de statistiques
+const STAT_METRICS = ['poids', 'taille', 'biceps_droit', 'cuisse_droite'];
+
+// Périodes du sélecteur des graphiques, de la plus courte à la plus longue ;
+// les mesures détaillées ne sont lues que sur la période affichée
+const PERIODES = ['1mois', '3mois', '6mois', '1an', 'tout'];
+const PERIODE_INITIALE = '3mois';
+
 const StatisticsPage = () => {
   const [poids, setPoids] = useState([]);
   const [mensurations, setMensurations] = useState([]);
+  const [stats, setStats] = useState({});
+  const [periodeChargee, setPeriodeChargee] = useState(PERIODE_INITIALE);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [isAIModalOpen, setIsAIModalOpen] = useState(false);
@@ -17,23 +27,19 @@ const StatisticsPage = () => {
     try {
       setLoading(true);
       
-      // Récupérer les poids
-      try {
-        const poidsResponse = await api.get('/poids/');
-        setPoids(poidsResponse.data.poids || []);
-      } catch (poidsError) {
-        console.error("Erreur lors de la récupération des poids :", poidsError);
-        setPoids([]);
-      }
-      
-      // Récupérer les mensurations
+      // Statistiques lues dans les agrégats maintenus par le serveur
       try {
-        const mensurationsResponse = await api.get('/mensurations/');
-        setMensurations(mensurationsResponse.data.mensurations || []);
-      } catch (mensurationsError) {
-        console.error("Erreur lors de la récupération des mensurations :", mensurationsError);
-        setMensurations([]);
+        const response = await api.get('/stats/', {
+          params: { metrics: STAT_METRICS.join(','), granularity: 'mois' },
+        });
+        setStats(response.data.metrics);
+      } catch (statsError) {
+        console.error("Erreur lors de la récupération des statistiques :", statsError);
+        setStats({});
       }
+
+      // Mesures détaillées de la période affichée, en une requête (fenêtre du tableau de bord)
+      await chargerMesures(PERIODE_INITIALE);
       
       setError(null);
     } catch (error) {
@@ -44,6 +50,24 @@ const StatisticsPage = () => {
     }
   };
 
+  const chargerMesures = async (periode) => {
+    try {
+      const { data } = await api.get('/dashboard/', { params: { period: periode } });
+      setPoids(data.poids);
+      setMensurations(data.mensurations);
+      setPeriodeChargee(periode);
+    } catch (mesuresError) {
+      console.error("Erreur lors de la récupération des mesures :", mesuresError);
+      setPoids([]);
+      setMensurations([]);
+    }
+  };
+
+  // Période plus longue que celle déjà chargée : on élargit la fenêtre
+  const handlePeriodeChange = (periode) => {
+    if (PERIODES.indexOf(periode) > PERIODES.indexOf(periodeChargee)) chargerMesures(periode);
+  };
+
   useEffect(() => {
     fetchData();
   }, []);
@@ -57,124 +81,33 @@ const StatisticsPage = () => {
     return isNaN(parsed) ? null : parsed;
   };
 
-  // Calculer la moyenne des poids
-  const calculateAveragePoids = () => {
-    if (poids.length === 0) return null;
-    
-    const validValues = poids
-      .map(p => parseValue(p.valeur))
-      .filter(val => val !== null);
-    
-    if (validValues.length === 0) return null;
-    
-    const sum = validValues.reduce((acc, val) => acc + val, 0);
-    return sum / validValues.length;
-  };
-
-  // Calculer la moyenne des mensurations
-  const calculateAverageMensurations = () => {
-    if (mensurations.length === 0) return { taille: null, bras: null, cuisses: null };
-    
-    const tailleValues = mensurations
-      .map(m => parseValue(m.taille))
-      .filter(val => val !== null);
-    
-    const brasValues = mensurations
-      .map(m => parseValue(m.bras))
-      .filter(val => val !== null);
-    
-    const cuissesValues = mensurations
-      .map(m => parseValue(m.cuisses))
-      .filter(val => val !== null);
-    
+  // Moyenne et évolution (première -> dernière mesure) d'une métrique
+  const average = (metric) => (stats[metric]?.nombre ? stats[metric].moyenne : null);
+  const evolutionOf = (metric) => {
+    const stat = stats[metric];
+    if (!stat?.nombre) return null;
     return {
-      taille: tailleValues.length > 0 
-        ? tailleValues.reduce((acc, val) => acc + val, 0) / tailleValues.length
-        : null,
-      bras: brasValues.length > 0 
-        ? brasValues.reduce((acc, val) => acc + val, 0) / brasValues.length
-        : null,
-      cuisses: cuissesValues.length > 0 
-        ? cuissesValues.reduce((acc, val) => acc + val, 0) / cuissesValues.length
-        : null
+      first: stat.premiere.valeur,
+      last: stat.derniere.valeur,
+      difference: stat.evolution.difference,
+      percentage: stat.evolution.pourcentage !== null ? stat.evolution.pourcentage.toFixed(2) : '-',
     };
   };
 
-  // Calculer l'évolution depuis la première mesure
-  const calculateEvolution = () => {
-    if (poids.length === 0 || mensurations.length === 0) {
-      return { poids: null, mensurations: null };
-    }
-    
-    // Tri par date pour obtenir la première et la dernière mesure
-    const sortedPoids = [...poids]
-      .filter(p => p.date && !isNaN(new Date(p.date)))
-      .sort((a, b) => new Date(a.date) - new Date(b.date));
-    
-    const sortedMensurations = [...mensurations]
-      .filter(m => m.date && !isNaN(new Date(m.date)))
-      .sort((a, b) => new Date(a.date) - new Date(b.date));
-    
-    if (sortedPoids.length === 0 || sortedMensurations.length === 0) {
-      return { poids: null, mensurations: null };
-    }
-    
-    const firstPoids = parseValue(sortedPoids[0]?.valeur);
-    const lastPoids = parseValue(sortedPoids[sortedPoids.length - 1]?.valeur);
-    
-    const firstMensuration = {
-      taille: parseValue(sortedMensurations[0]?.taille),
-      bras: parseValue(sortedMensurations[0]?.bras),
-      cuisses: parseValue(sortedMensurations[0]?.cuisses)
-    };
-    
-    const lastMensuration = {
-      taille: parseValue(sortedMensurations[sortedMensurations.length - 1]?.taille),
-      bras: parseValue(sortedMensurations[sortedMensurations.length - 1]?.bras),
-      cuisses: parseValue(sortedMensurations[sortedMensurations.length - 1]?.cuisses)
-    };
-    
-    return {
-      poids: firstPoids !== null && lastPoids !== null 
-        ? {
-            first: firstPoids,
-            last: lastPoids,
-            difference: lastPoids - firstPoids,
-            percentage: ((lastPoids - firstPoids) / firstPoids * 100).toFixed(2)
-          }
-        : null,
-      mensurations: {
-        taille: firstMensuration.taille !== null && lastMensuration.taille !== null
-          ? {
-              first: firstMensuration.taille,
-              last: lastMensuration.taille,
-              difference: lastMensuration.taille - firstMensuration.taille,
-              percentage: ((lastMensuration.taille - firstMensuration.taille) / firstMensuration.taille * 100).toFixed(2)
-            }
-          : null,
-        bras: firstMensuration.bras !== null && lastMensuration.bras !== null
-          ? {
-              first: firstMensuration.bras,
-              last: lastMensuration.bras,
-              difference: lastMensuration.bras - firstMensuration.bras,
-              percentage: ((lastMensuration.bras - firstMensuration.bras) / firstMensuration.bras * 100).toFixed(2)
-            }
-          : null,
-        cuisses: firstMensuration.cuisses !== null && lastMensuration.cuisses !== null
-          ? {
-              first: firstMensuration.cuisses,
-              last: lastMensuration.cuisses,
-              difference: lastMensuration.cuisses - firstMensuration.cuisses,
-              percentage: ((lastMensuration.cuisses - firstMensuration.cuisses) / firstMensuration.cuisses * 100).toFixed(2)
-            }
-          : null
-      }
-    };
+  const averagePoids = average('poids');
+  const averageMensurations = {
+    taille: average('taille'),
+    bras: average('biceps_droit'),
+    cuisses: average('cuisse_droite'),
+  };
+  const evolution = {
+    poids: evolutionOf('poids'),
+    mensurations: {
+      taille: evolutionOf('taille'),
+      bras: evolutionOf('biceps_droit'),
+      cuisses: evolutionOf('cuisse_droite'),
+    },
   };
-
-  const averagePoids = calculateAveragePoids();
-  const averageMensurations = calculateAverageMensurations();
-  const evolution = calculateEvolution();
 
   if (loading) {
     return (
@@ -203,7 +136,7 @@ const StatisticsPage = () => {
           <button
             onClick={() => setIsAIModalOpen(true)}
             className="ai-analysis-button"
-            disabled={loading || (poids.length === 0 && mensurations.length === 0)}
+            disabled={loading || !STAT_METRICS.some((metric) => stats[metric]?.nombre)}
           >
             🤖 Analyse IA
           </button>
@@ -325,6 +258,7 @@ const StatisticsPage = () => {
         <h3>Analyse visuelle complète</h3>
         <CompleteCharts 
           mensurations={mensurations}
+          onPeriodeChange={handlePeriodeChange}
         />
       </div>
       
@@ -374,8 +308,8 @@ const StatisticsPage = () => {
                     <tr key={m.id || index}>
                       <td>{m.date}</td>
                       <td>{parseValue(m.taille) !== null ? m.taille : '-'}</td>
-                      <td>{parseValue(m.bras) !== null ? m.bras : '-'}</td>
-                      <td>{parseValue(m.cuisses) !== null ? m.cuisses : '-'}</td>
+                      <td>{parseValue(m.biceps_droit) !== null ? m.biceps_droit : '-'}</td>
+                      <td>{parseValue(m.cuisse_droite) !== null ? m.cuisse_droite : '-'}</td>
                     </tr>
                   ))}
                 </tbody>
@@ -22,4 +22,62 @@ api.interceptors.response.use(
   },
 );
 
+// Parcourt toutes les pages d'un endpoint de liste paginé par curseur
+export const fetchAllPages = async (path, key, params = {}) => {
+  const items = [];
+  let cursor = null;
+  do {
+    const response = await api.get(path, {
+      params: { limit: 500, ...params, ...(cursor ? { cursor } : {}) },
+    });
+    items.push(...response.data[key]);
+    cursor = response.data.next_cursor;
+  } while (cursor);
+  return items;
+};
+
+// POST dont la réponse est un flux Server-Sent Events : onEvent(nom, données) à chaque événement
+export const postEventStream = async (path, body, onEvent) => {
+  const token = localStorage.getItem('token');
+  const response = await fetch(`${API_BASE_URL}${path}`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      Accept: 'text/event-stream',
+      ...(token ? { Authorization: `Bearer ${token}` } : {}),
+    },
+    body: JSON.stringify(body),
+  });
+  if (!response.ok) {
+    if (response.status === 401) {
+      localStorage.removeItem('token');
+      window.dispatchEvent(new Event('auth:logout'));
+    }
+    const data = await response.json().catch(() => ({}));
+    const error = new Error(data.detail || `HTTP ${response.status}`);
+    error.response = { status: response.status, data };
+    throw error;
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const blocks = buffer.split('\n\n');
+    buffer = blocks.pop();
+    for (const block of blocks) {
+      let name = 'message';
+      let data = '';
+      for (const line of block.split('\n')) {
+        if (line.startsWith('event:')) name = line.slice(6).trim();
+        else if (line.startsWith('data:')) data += line.slice(5).trim();
+      }
+      if (data) onEvent(name, JSON.parse(data));
+    }
+  }
+};
+
 export default api;
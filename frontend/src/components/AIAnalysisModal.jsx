@@ -1,5 +1,5 @@
 import { useState } from 'react';
-import api from '../api';
+import { postEventStream } from '../api';
 
 const ANALYSIS_TYPES = [
   {
@@ -38,12 +38,23 @@ const AIAnalysisModal = ({ isOpen, onClose }) => {
     setAnalysisResult(null);
 
     try {
-      const response = await api.post('/analyse/', {
+      // Le texte s'affiche au fil de la génération ; le spinner disparaît au premier fragment
+      let texte = '';
+      await postEventStream('/analyse/stream', {
         user_prompt: type.prompt,
+        type_analyse: type.id,
+      }, (event, data) => {
+        if (event === 'token') {
+          texte += data.texte;
+          setAnalysisResult(texte);
+          setIsLoading(false);
+        } else if (event === 'erreur') {
+          throw new Error(data.detail);
+        }
       });
-      setAnalysisResult(response.data.analyse);
     } catch (err) {
-      setError(err.response?.data?.detail || 'Erreur lors de l\'analyse. Veuillez réessayer.');
+      setAnalysisResult(null);
+      setError(err.response?.data?.detail || err.message || 'Erreur lors de l\'analyse. Veuillez réessayer.');
     } finally {
       setIsLoading(false);
     }
@@ -1,13 +1,36 @@
-import { useState } from 'react';
+import { useState, useEffect } from 'react';
 import { Line, Bar } from 'react-chartjs-2';
+import api from '../api';
 
 const CompleteCharts = ({
   poids = [],
   mensurations = [],
-  entrainements = [],
-  supplements = []
+  supplements = [],
+  onPeriodeChange
 }) => {
   const [periode, setPeriode] = useState('3mois'); // Période par défaut : 3 mois
+  const [volume, setVolume] = useState(null);
+  const [tendance, setTendance] = useState(null);
+
+  // Volume hebdomadaire et 1RM estimé calculés côté serveur
+  useEffect(() => {
+    api.get('/analytique/volume', { params: { period: periode } })
+      .then((response) => setVolume(response.data))
+      .catch((error) => {
+        console.error("Erreur lors de la récupération du volume d'entraînement :", error);
+        setVolume(null);
+      });
+  }, [periode]);
+
+  // Tendance du poids (poids lissé et bande de confiance) tenue à jour côté serveur
+  useEffect(() => {
+    api.get('/tendance/', { params: { period: periode } })
+      .then((response) => setTendance(response.data))
+      .catch((error) => {
+        console.error('Erreur lors de la récupération de la tendance du poids :', error);
+        setTendance(null);
+      });
+  }, [periode, poids]);
 
   // Filtrer les données en fonction de la période sélectionnée
   const filterDataByPeriod = (data, dateField = 'date') => {
@@ -58,27 +81,47 @@ const CompleteCharts = ({
     return isNaN(parsed) ? null : parsed;
   };
 
-  // Préparer les données pour le graphique du poids
+  // Préparer les données pour le graphique du poids : pesées, tendance et bande à 95 %
   const getPoidsChartData = () => {
-    const filteredData = filterDataByPeriod(poids);
-    if (filteredData.length === 0) return null;
+    const points = tendance?.points || [];
+    if (points.length === 0) return null;
 
-    const sorted = [...filteredData].sort((a, b) => new Date(a.date) - new Date(b.date));
     return {
-      labels: sorted.map(p => formatDate(p.date)),
+      labels: points.map(p => formatDate(p.date)),
       datasets: [
+        {
+          label: 'Bande haute',
+          data: points.map(p => p.bande_haute),
+          borderColor: 'transparent',
+          backgroundColor: 'rgba(54, 162, 235, 0.15)',
+          pointRadius: 0,
+          fill: '+1'
+        },
+        {
+          label: 'Bande basse',
+          data: points.map(p => p.bande_basse),
+          borderColor: 'transparent',
+          pointRadius: 0,
+          fill: false
+        },
+        {
+          label: 'Tendance (kg)',
+          data: points.map(p => p.tendance),
+          borderColor: '#36A2EB',
+          borderWidth: 3,
+          pointRadius: 0,
+          tension: 0.3,
+          fill: false
+        },
         {
           label: 'Poids (kg)',
-          data: sorted.map(p => p.valeur),
+          data: points.map(p => p.valeur),
           borderColor: '#FF6384',
-          backgroundColor: 'rgba(255, 99, 132, 0.1)',
-          tension: 0.4,
-          borderWidth: 2,
-          pointRadius: 5,
-          pointBackgroundColor: '#FF6384',
+          backgroundColor: '#FF6384',
+          showLine: false,
+          pointRadius: 4,
           pointBorderColor: '#fff',
-          pointBorderWidth: 2,
-          fill: true
+          pointBorderWidth: 2
         }
       ]
     };
@@ -134,48 +177,61 @@ const CompleteCharts = ({
     };
   };
 
-  // Préparer les données pour le graphique des entraînements par exercice
+  // Meilleur 1RM estimé par semaine, un dataset par exercice (les plus travaillés)
   const getEntrainementsChartData = () => {
-    const filteredData = filterDataByPeriod(entrainements);
-    if (filteredData.length === 0) return null;
-    
-    // Regrouper les entraînements par exercice
-    const exercices = {};
-    filteredData.forEach(entrainement => {
-      if (!exercices[entrainement.exercice]) {
-        exercices[entrainement.exercice] = [];
-      }
-      exercices[entrainement.exercice].push(entrainement);
+    if (!volume || volume.par_exercice.length === 0) return null;
+
+    const semaines = volume.total.map(t => t.semaine);
+    const seriesParExercice = {};
+    volume.par_exercice.forEach(v => {
+      seriesParExercice[v.exercice] = (seriesParExercice[v.exercice] || 0) + v.series;
     });
-    
-    // Préparer les datasets pour chaque exercice
-    const datasets = Object.keys(exercices).map((exercice, index) => {
-      const color = `hsl(${index * 30}, 70%, 50%)`;
+    const exercices = Object.keys(seriesParExercice)
+      .sort((a, b) => seriesParExercice[b] - seriesParExercice[a])
+      .slice(0, 8);
+
+    const datasets = exercices.map((exercice, index) => {
+      const color = `hsl(${index * 45}, 70%, 50%)`;
+      const parSemaine = Object.fromEntries(
+        volume.par_exercice.filter(v => v.exercice === exercice).map(v => [v.semaine, v.un_rm_max])
+      );
       return {
         label: exercice,
-        data: exercices[exercice].map(e => ({
-          x: formatDate(e.date),
-          y: e.charge || 0
-        })),
+        data: semaines.map(semaine => parSemaine[semaine] ?? null),
         borderColor: color,
         backgroundColor: color + '20',
         tension: 0.3,
         borderWidth: 2,
         pointRadius: 4,
         pointStyle: 'rect',
+        spanGaps: true,
         fill: false
       };
     });
-    
-    // Obtenir toutes les dates uniques
-    const allDates = [...new Set(filteredData.map(e => formatDate(e.date)))].sort();
-    
+
     return {
-      labels: allDates,
+      labels: semaines.map(formatDate),
       datasets: datasets
     };
   };
 
+  // Tonnage total par semaine
+  const getTonnageChartData = () => {
+    if (!volume || volume.total.length === 0) return null;
+    return {
+      labels: volume.total.map(t => formatDate(t.semaine)),
+      datasets: [
+        {
+          label: 'Tonnage (kg)',
+          data: volume.total.map(t => t.tonnage_kg),
+          backgroundColor: 'rgba(54, 162, 235, 0.6)',
+          borderColor: '#36A2EB',
+          borderWidth: 1
+        }
+      ]
+    };
+  };
+
   // Préparer les données pour le graphique des suppléments
   const getSupplementsChartData = () => {
     const filteredData = filterDataByPeriod(supplements, 'date_debut');
@@ -293,7 +349,7 @@ const CompleteCharts = ({
         ...commonOptions.scales.y,
         title: {
           display: true,
-          text: 'Charge (kg)',
+          text: '1RM estimé (kg)',
           font: { size: 14, weight: '500' },
           padding: { top: 10, bottom: 10 }
         }
@@ -309,7 +365,11 @@ const CompleteCharts = ({
         <span style={{ fontWeight: '500' }}>Période :</span>
         <select
           value={periode}
-          onChange={(e) => setPeriode(e.target.value)}
+          onChange={(e) => {
+            setPeriode(e.target.value);
+            // Au-delà de la fenêtre du tableau de bord, le parent charge l'historique
+            if (onPeriodeChange) onPeriodeChange(e.target.value);
+          }}
           className="form-input"
           style={{ width: 'auto', cursor: 'pointer' }}
         >
@@ -322,7 +382,14 @@ const CompleteCharts = ({
 
       {/* Graphique du poids */}
       <div className="chart-card">
-        <h3 style={{ marginBottom: '15px', color: '#444' }}>Évolution du poids</h3>
+        <h3 style={{ marginBottom: '15px', color: '#444' }}>
+          Évolution du poids
+          {tendance?.actuelle && (
+            <span style={{ marginLeft: '10px', fontSize: '14px', color: '#666' }}>
+              {tendance.actuelle.tendance} kg ({tendance.actuelle.vitesse_kg_semaine > 0 ? '+' : ''}{tendance.actuelle.vitesse_kg_semaine} kg/semaine)
+            </span>
+          )}
+        </h3>
         <div className="chart-container">
           {poids.length > 0 && getPoidsChartData() ? (
             <Line data={getPoidsChartData()} options={{
@@ -369,9 +436,9 @@ const CompleteCharts = ({
 
       {/* Graphique des entrainements */}
       <div className="chart-card">
-        <h3 style={{ marginBottom: '15px', color: '#444' }}>Progression des entraînements par exercice</h3>
+        <h3 style={{ marginBottom: '15px', color: '#444' }}>Progression du 1RM estimé par exercice</h3>
         <div className="chart-container">
-          {entrainements.length > 0 ? (
+          {getEntrainementsChartData() ? (
             <Line data={getEntrainementsChartData()} options={entrainementsOptions} />
           ) : (
             <div style={{ textAlign: 'center', padding: '40px', color: '#666' }}>
@@ -381,6 +448,20 @@ const CompleteCharts = ({
         </div>
       </div>
 
+      {/* Tonnage hebdomadaire */}
+      <div className="chart-card">
+        <h3 style={{ marginBottom: '15px', color: '#444' }}>Tonnage hebdomadaire</h3>
+        <div className="chart-container">
+          {getTonnageChartData() ? (
+            <Bar data={getTonnageChartData()} options={commonOptions} />
+          ) : (
+            <div style={{ textAlign: 'center', padding: '40px', color: '#666' }}>
+              <p>Aucun entraînement enregistré pour cette période.</p>
+            </div>
+          )}
+        </div>
+      </div>
+
       {/* Graphique des supplements */}
       <div className="chart-card">
         <h3 style={{ marginBottom: '15px', color: '#444' }}>Tendances des suppléments</h3>
@@ -3,7 +3,7 @@ import api from '../api';
 import MensurationsForm from '../components/MensurationsForm';
 import CompleteCharts from '../components/CompleteCharts';
 
-const HomePage = ({ poids, mensurations, onPoidsAdded, onMensurationsAdded }) => {
+const HomePage = ({ poids, mensurations, onPoidsAdded, onMensurationsAdded, onPeriodeChange }) => {
   const [poidsValue, setPoidsValue] = useState('');
   const [poidsDate, setPoidsDate] = useState('');
   const [poidsMsg, setPoidsMsg] = useState('');
@@ -36,9 +36,14 @@ const HomePage = ({ poids, mensurations, onPoidsAdded, onMensurationsAdded }) =>
         texte: seanceTexte,
         date: seanceDate
       });
+      // Convertit aussi le texte Hevy en entraînements structurés
+      const importResponse = await api.post('/import/hevy', seanceTexte, {
+        params: { date: seanceDate },
+        headers: { 'Content-Type': 'text/plain' },
+      });
       setSeanceTexte('');
       setSeanceDate('');
-      setSeanceMsg('Séance enregistrée !');
+      setSeanceMsg(`Séance enregistrée ! (${importResponse.data.series_importees} série(s) importée(s))`);
       setTimeout(() => setSeanceMsg(''), 3000);
     } catch (error) {
       console.error('Erreur journal:', error);
@@ -102,7 +107,7 @@ const HomePage = ({ poids, mensurations, onPoidsAdded, onMensurationsAdded }) =>
       </div>
 
       {/* Charts below */}
-      <CompleteCharts poids={poids} mensurations={mensurations} />
+      <CompleteCharts poids={poids} mensurations={mensurations} onPeriodeChange={onPeriodeChange} />
     </div>
   );
 };